@@ -1,13 +1,16 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import Usuario
+from .pagination import EstimatedCountPaginator
 
 @admin.register(Usuario)
 class UsuarioAdmin(UserAdmin):
-    list_display = ('username', 'email', 'nombre_completo', 'rol', 'activo', 'fecha_registro')
+    list_display = ('username', 'email', 'nombre_completo_display', 'rol', 'activo', 'fecha_registro')
     list_filter = ('rol', 'activo', 'is_staff', 'fecha_registro')
     search_fields = ('username', 'email', 'first_name', 'last_name')
     ordering = ('-fecha_registro',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = UserAdmin.fieldsets + (
         ('Información Adicional', {
@@ -19,4 +22,22 @@ class UsuarioAdmin(UserAdmin):
         ('Información Adicional', {
             'fields': ('rol', 'activo')
         }),
-    )
\ No newline at end of file
+    )
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        # En el listado solo se cargan las columnas que se muestran
+        match = request.resolver_match
+        if match and match.url_name == 'users_usuario_changelist':
+            qs = qs.only(
+                'id', 'username', 'email', 'first_name', 'last_name',
+                'rol', 'activo', 'fecha_registro'
+            )
+        # El autocompletado de otros admins solo necesita lo que usa __str__
+        elif match and match.url_name == 'autocomplete':
+            qs = qs.only('id', 'first_name', 'last_name', 'email')
+        return qs
+    
+    @admin.display(description='Nombre Completo', ordering='first_name')
+    def nombre_completo_display(self, obj):
+        return f"{obj.first_name} {obj.last_name}".strip()
\ No newline at end of file
@@ -0,0 +1,60 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from apps.users.tokens import ROL_CLAIM
+
+# Columnas que usan las vistas y serializers de la API sobre request.user
+CAMPOS_USUARIO_AUTH = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'rol', 'activo', 'fecha_registro', 'ultimo_acceso', 'is_active',
+)
+
+
+class JWTRolAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication que deja en el request el contexto de autenticación
+    (user_id, rol, is_active), con el rol tomado del token, para que los
+    permisos no tengan que resolverlo desde request.user
+    """
+
+    def authenticate(self, request):
+        resultado = super().authenticate(request)
+        if resultado is None:
+            return None
+
+        user, validated_token = resultado
+        # Tokens emitidos antes de incluir el claim usan el rol del usuario
+        request.auth_ctx = (
+            user.pk,
+            validated_token.get(ROL_CLAIM, user.rol),
+            user.is_active
+        )
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        """
+        Igual que JWTAuthentication.get_user pero cargando solo las
+        columnas que usa la API en lugar de la fila completa
+        """
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # La verificación de revocación necesita el hash de la contraseña
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        try:
+            user = self.user_model.objects.only(*CAMPOS_USUARIO_AUTH).get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
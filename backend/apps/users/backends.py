@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+Usuario = get_user_model()
+
+# Campos necesarios para autenticar y para serializar el usuario en el login
+CAMPOS_LOGIN = (
+    'id', 'password', 'is_active', 'username', 'email',
+    'first_name', 'last_name', 'rol', 'activo',
+    'fecha_registro', 'ultimo_acceso',
+)
+
+
+class UsuarioLoginBackend(ModelBackend):
+    """
+    ModelBackend que carga solo las columnas necesarias para el login
+    en lugar de SELECT * sobre la tabla de usuarios
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(Usuario.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        try:
+            usuario = Usuario._default_manager.only(*CAMPOS_LOGIN).get(
+                **{Usuario.USERNAME_FIELD: username}
+            )
+        except Usuario.DoesNotExist:
+            # Hashear igual para no revelar por tiempo si el usuario existe
+            Usuario().set_password(password)
+            return None
+
+        if usuario.check_password(password) and self.user_can_authenticate(usuario):
+            return usuario
+        return None
@@ -43,6 +43,17 @@ class Usuario(AbstractUser):
         verbose_name = 'Usuario'
         verbose_name_plural = 'Usuarios'
         ordering = ['-fecha_registro']
+        indexes = [
+            models.Index(fields=['-fecha_registro'], name='usuario_fecha_desc_idx'),
+            models.Index(fields=['rol', 'activo'], name='usuario_rol_activo_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Email con el que se cargó; las señales invalidan su caché si cambia
+        instance._email_original = instance.__dict__.get('email')
+        return instance
     
     def __str__(self):
         return f"{self.get_full_name()} ({self.email})"
@@ -0,0 +1,37 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador para el admin que usa el conteo estimado de PostgreSQL
+    (pg_class.reltuples) en lugar de un COUNT(*) sobre toda la tabla
+    """
+    # Por debajo de esta cantidad de filas el COUNT(*) exacto es barato
+    umbral_estimado = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+
+        # Con filtros o búsqueda aplicados se mantiene el conteo exacto
+        if queryset.query.where:
+            return super().count
+
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+
+        # reltuples es -1/0 si la tabla nunca se analizó
+        if not row or row[0] < self.umbral_estimado:
+            return super().count
+
+        return row[0]
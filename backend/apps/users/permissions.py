@@ -1,27 +1,62 @@
 from rest_framework import permissions
 
+ROLES_DOCENTE_ADMIN = frozenset(('docente', 'admin'))
 
-class IsDocente(permissions.BasePermission):
+
+def get_auth_ctx(request):
+    """
+    Contexto de autenticación (user_id, rol, is_active) del request,
+    resuelto una sola vez por petición
+    
+    JWTRolAuthentication lo deja listo al autenticar; para otros
+    autenticadores se calcula aquí a partir de request.user.
+    """
+    try:
+        return request.auth_ctx
+    except AttributeError:
+        pass
+    
+    user = request.user
+    if user and user.is_authenticated:
+        auth_ctx = (user.pk, getattr(user, 'rol', None), user.is_active)
+    else:
+        auth_ctx = None
+    request.auth_ctx = auth_ctx
+    return auth_ctx
+
+
+class RolCacheMixin:
+    """
+    Mixin que lee el rol del contexto de autenticación del request para
+    que los distintos permisos de una misma petición no lo recalculen
+    """
+    
+    def _get_rol(self, request):
+        auth_ctx = get_auth_ctx(request)
+        return auth_ctx[1] if auth_ctx else None
+
+
+class IsDocente(RolCacheMixin, permissions.BasePermission):
     """
     Permiso personalizado para permitir solo a docentes
     """
     message = 'Solo los docentes pueden acceder a este recurso.'
     
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.rol == 'docente'
+        return self._get_rol(request) == 'docente'
 
 
-class IsAdmin(permissions.BasePermission):
+class IsAdmin(RolCacheMixin, permissions.BasePermission):
     """
     Permiso personalizado para permitir solo a administradores
     """
     message = 'Solo los administradores pueden acceder a este recurso.'
     
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.rol == 'admin'
+        return self._get_rol(request) == 'admin'
 
 
-class IsOwnerOrAdmin(permissions.BasePermission):
+class IsOwnerOrAdmin(RolCacheMixin, permissions.BasePermission):
     """
     Permiso personalizado para permitir acceso al propietario o admin
     """
@@ -29,26 +64,25 @@ class IsOwnerOrAdmin(permissions.BasePermission):
     
     def has_object_permission(self, request, view, obj):
         # Admin tiene acceso total
-        if request.user.rol == 'admin':
+        if self._get_rol(request) == 'admin':
             return True
         
-        # Verificar si el objeto tiene un campo 'usuario'
-        if hasattr(obj, 'usuario'):
-            return obj.usuario == request.user
+        auth_ctx = get_auth_ctx(request)
+        user_id = auth_ctx[0] if auth_ctx else None
+        
+        # Comparar por ID para no cargar la relación 'usuario'
+        if hasattr(obj, 'usuario_id'):
+            return obj.usuario_id == user_id
         
         # Verificar si el objeto es el propio usuario
-        return obj == request.user
+        return obj.pk == user_id
 
 
-class IsDocenteOrAdmin(permissions.BasePermission):
+class IsDocenteOrAdmin(RolCacheMixin, permissions.BasePermission):
     """
     Permiso para docentes y administradores
     """
     message = 'Solo los docentes y administradores pueden acceder a este recurso.'
     
     def has_permission(self, request, view):
-        return (
-            request.user and 
-            request.user.is_authenticated and 
-            request.user.rol in ['docente', 'admin']
-        )
\ No newline at end of file
+        return self._get_rol(request) in ROLES_DOCENTE_ADMIN
\ No newline at end of file
@@ -0,0 +1,32 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+import orjson
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON basado en orjson, usado por defecto en toda la API
+    
+    Las respuestas más pesadas (p. ej. transcripcion_con_timestamps de
+    videos largos) se codifican en C en lugar de con el json de la
+    biblioteca estándar.
+
+    Los tipos que orjson no conoce (traducciones perezosas, Decimal, etc.)
+    se delegan en el JSONEncoder de DRF. Como en json, las claves que no
+    son str (enteros, UUID) se convierten a texto.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return orjson.dumps(
+            data,
+            default=_encoder.default,
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        )
@@ -2,6 +2,7 @@ from .auth_serializers import (
     RegistroSerializer,
     LoginSerializer,
     UsuarioSerializer,
+    usuario_payload,
     CambioPasswordSerializer,
     ActualizarPerfilSerializer
 )
@@ -10,6 +11,7 @@ __all__ = [
     'RegistroSerializer',
     'LoginSerializer',
     'UsuarioSerializer',
+    'usuario_payload',
     'CambioPasswordSerializer',
     'ActualizarPerfilSerializer',
 ]
\ No newline at end of file
@@ -1,20 +1,53 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
+from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
 from django.contrib.auth.password_validation import validate_password
-from rest_framework.validators import UniqueValidator
+from apps.users.validators import CachedUniqueValidator
 from rest_framework_simplejwt.tokens import RefreshToken
 
+import copy
+import logging
+
+logger = logging.getLogger(__name__)
+
 Usuario = get_user_model()
 
 
+def _campo_duplicado(error):
+    """Campo único que provocó el IntegrityError, si se puede determinar"""
+    # PostgreSQL informa el nombre de la restricción (p. ej. usuarios_email_key)
+    diag = getattr(error.__cause__, 'diag', None)
+    referencia = getattr(diag, 'constraint_name', None) or str(error)
+    for campo in ('email', 'username'):
+        if campo in referencia:
+            return campo
+    return None
+
+
+def _error_campo_duplicado(error):
+    """
+    ValidationError equivalente a un IntegrityError de campo único; si no
+    se puede determinar el campo se devuelve el propio IntegrityError
+    """
+    campo = _campo_duplicado(error)
+    if campo is None:
+        return error
+    return serializers.ValidationError({
+        campo: Usuario._meta.get_field(campo).error_messages['unique']
+    })
+
+
 class RegistroSerializer(serializers.ModelSerializer):
     """
     Serializer para el registro de nuevos usuarios
     """
-    email = serializers.EmailField(
-        required=True,
-        validators=[UniqueValidator(queryset=Usuario.objects.all())]
-    )
+    # La unicidad de email y username la garantizan las restricciones de la
+    # base de datos; create() traduce el IntegrityError a un error de validación
+    email = serializers.EmailField(required=True)
     password = serializers.CharField(
         write_only=True,
         required=True,
@@ -34,6 +67,7 @@ class RegistroSerializer(serializers.ModelSerializer):
             'first_name', 'last_name', 'rol'
         )
         extra_kwargs = {
+            'username': {'validators': [UnicodeUsernameValidator()]},
             'first_name': {'required': True},
             'last_name': {'required': True}
         }
@@ -50,14 +84,18 @@ class RegistroSerializer(serializers.ModelSerializer):
         """Crear usuario con contraseña hasheada"""
         validated_data.pop('password_confirmacion')
         
-        usuario = Usuario.objects.create_user(
-            username=validated_data['username'],
-            email=validated_data['email'],
-            first_name=validated_data['first_name'],
-            last_name=validated_data['last_name'],
-            rol=validated_data.get('rol', 'docente'),
-            password=validated_data['password']
-        )
+        try:
+            with transaction.atomic():
+                usuario = Usuario.objects.create_user(
+                    username=validated_data['username'],
+                    email=validated_data['email'],
+                    first_name=validated_data['first_name'],
+                    last_name=validated_data['last_name'],
+                    rol=validated_data.get('rol', 'docente'),
+                    password=validated_data['password']
+                )
+        except IntegrityError as e:
+            raise _error_campo_duplicado(e)
         
         return usuario
 
@@ -73,12 +111,42 @@ class LoginSerializer(serializers.Serializer):
         style={'input_type': 'password'}
     )
     
+    def _intentos_key(self, username):
+        """Clave de caché del contador de intentos fallidos"""
+        request = self.context.get('request')
+        ip = request.META.get('REMOTE_ADDR', '') if request else ''
+        return f'login_fail:{ip}:{username}'
+    
+    def _intentos_fallidos(self, key):
+        try:
+            return cache.get(key, 0)
+        except Exception as e:
+            logger.warning(f'Caché no disponible: {str(e)}')
+            return 0
+    
+    def _registrar_intento_fallido(self, key):
+        try:
+            # add no pisa un contador existente; incr es atómico en Redis
+            cache.add(key, 0, settings.LOGIN_BLOQUEO_SEGUNDOS)
+            cache.incr(key)
+        except Exception as e:
+            logger.warning(f'No se pudo registrar el intento fallido: {str(e)}')
+    
     def validate(self, attrs):
         """Validar credenciales del usuario"""
         username = attrs.get('username')
         password = attrs.get('password')
         
         if username and password:
+            key = self._intentos_key(username)
+            
+            # Bloquear antes de pagar el costo del hash de la contraseña
+            if self._intentos_fallidos(key) >= settings.LOGIN_MAX_INTENTOS_FALLIDOS:
+                raise serializers.ValidationError(
+                    'Demasiados intentos fallidos. Intente nuevamente más tarde.',
+                    code='throttled'
+                )
+            
             usuario = authenticate(
                 request=self.context.get('request'),
                 username=username,
@@ -86,6 +154,7 @@ class LoginSerializer(serializers.Serializer):
             )
             
             if not usuario:
+                self._registrar_intento_fallido(key)
                 raise serializers.ValidationError(
                     'No se pudo iniciar sesión con las credenciales proporcionadas.',
                     code='authorization'
@@ -106,7 +175,21 @@ class LoginSerializer(serializers.Serializer):
             )
 
 
-class UsuarioSerializer(serializers.ModelSerializer):
+class CamposCacheadosMixin:
+    """
+    Mixin para ModelSerializer que construye los campos a partir de Meta
+    y del modelo una sola vez por clase; cada instancia recibe una copia
+    """
+    _campos_cache = None
+    
+    def get_fields(self):
+        cls = type(self)
+        if cls.__dict__.get('_campos_cache') is None:
+            cls._campos_cache = super().get_fields()
+        return copy.deepcopy(cls._campos_cache)
+
+
+class UsuarioSerializer(CamposCacheadosMixin, serializers.ModelSerializer):
     """
     Serializer para mostrar información del usuario
     """
@@ -122,6 +205,37 @@ class UsuarioSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'fecha_registro', 'ultimo_acceso')
 
 
+def _fecha_iso(valor):
+    """Misma representación que DateTimeField de DRF (zona local, 'Z' para UTC)"""
+    if not valor:
+        return None
+    valor = timezone.localtime(valor).isoformat()
+    if valor.endswith('+00:00'):
+        valor = valor[:-6] + 'Z'
+    return valor
+
+
+def usuario_payload(usuario) -> dict:
+    """
+    Representación del usuario para las respuestas de registro y login
+    
+    Equivale a UsuarioSerializer(usuario).data pero sin el costo de la
+    serialización campo a campo de DRF en endpoints muy transitados.
+    """
+    return {
+        'id': usuario.id,
+        'username': usuario.username,
+        'email': usuario.email,
+        'first_name': usuario.first_name,
+        'last_name': usuario.last_name,
+        'nombre_completo': f'{usuario.first_name} {usuario.last_name}'.strip(),
+        'rol': usuario.rol,
+        'activo': usuario.activo,
+        'fecha_registro': _fecha_iso(usuario.fecha_registro),
+        'ultimo_acceso': _fecha_iso(usuario.ultimo_acceso),
+    }
+
+
 class CambioPasswordSerializer(serializers.Serializer):
     """
     Serializer para cambiar contraseña
@@ -175,6 +289,18 @@ class ActualizarPerfilSerializer(serializers.ModelSerializer):
         fields = ('first_name', 'last_name', 'email')
         extra_kwargs = {
             'email': {
-                'validators': [UniqueValidator(queryset=Usuario.objects.all())]
+                'validators': [
+                    CachedUniqueValidator(queryset=Usuario.objects.all(), lookup='iexact')
+                ]
             }
-        }
\ No newline at end of file
+        }
+    
+    def update(self, instance, validated_data):
+        """Actualizar el perfil; un email tomado a la vez por otro usuario es un 400"""
+        # El validador cachea la existencia unos segundos: la restricción
+        # única de la base de datos decide en caso de carrera
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError as e:
+            raise _error_campo_duplicado(e)
\ No newline at end of file
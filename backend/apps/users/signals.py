@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.users.validators import email_existe_cache_key
+import logging
+
+logger = logging.getLogger(__name__)
+
+Usuario = get_user_model()
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_cache_email(sender, instance, **kwargs):
+    """
+    Invalidar la verificación cacheada de email existente, tanto del email
+    actual como del anterior si cambió (queda libre para otro registro)
+    """
+    email = instance.__dict__.get('email')
+    email_original = getattr(instance, '_email_original', None)
+    cambio_email = email_original is not None and email_original != email
+    
+    update_fields = kwargs.get('update_fields')
+    guarda_email = update_fields is None or 'email' in update_fields
+    if not guarda_email and not cambio_email:
+        return
+    
+    emails = {email, email_original} - {None}
+    try:
+        cache.delete_many([email_existe_cache_key(e) for e in emails])
+    except Exception as e:
+        logger.warning(f'No se pudo invalidar la caché de email: {str(e)}')
+    
+    if guarda_email and kwargs.get('signal') is post_save:
+        instance._email_original = email
@@ -0,0 +1,11 @@
+from .tasks import (
+    registrar_ultimo_acceso_task,
+    volcar_ultimos_accesos_task,
+    invalidar_refresh_token_task,
+)
+
+__all__ = [
+    'registrar_ultimo_acceso_task',
+    'volcar_ultimos_accesos_task',
+    'invalidar_refresh_token_task',
+]
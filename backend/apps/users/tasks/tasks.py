@@ -0,0 +1,88 @@
+from datetime import datetime, timezone as dt_timezone
+from celery import shared_task
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.dateparse import parse_datetime
+from rest_framework_simplejwt.tokens import RefreshToken
+import redis
+
+logger = get_task_logger(__name__)
+
+Usuario = get_user_model()
+
+# Sorted set usuario_id -> timestamp del último acceso pendiente de volcar
+ULTIMO_ACCESO_KEY = 'usuarios:ultimo_acceso'
+
+
+def _get_redis() -> redis.Redis:
+    """Cliente Redis donde se acumulan los últimos accesos"""
+    return redis.Redis.from_url(settings.ULTIMO_ACCESO_REDIS_URL)
+
+
+@shared_task(ignore_result=True)
+def registrar_ultimo_acceso_task(usuario_id: int, timestamp: str):
+    """
+    Registrar el último acceso de un usuario en el buffer de Redis
+
+    Args:
+        usuario_id: ID del usuario
+        timestamp: Fecha del acceso en formato ISO 8601
+    """
+    fecha = parse_datetime(timestamp)
+
+    try:
+        _get_redis().zadd(ULTIMO_ACCESO_KEY, {usuario_id: fecha.timestamp()})
+    except redis.RedisError as e:
+        # Sin Redis se actualiza directamente para no perder el acceso
+        logger.warning(f'Redis no disponible, actualizando último acceso de {usuario_id}: {str(e)}')
+        Usuario.objects.filter(pk=usuario_id).update(ultimo_acceso=fecha)
+
+
+@shared_task(ignore_result=True)
+def volcar_ultimos_accesos_task():
+    """
+    Tarea periódica que vuelca los últimos accesos acumulados en Redis
+    a la base de datos con un único bulk_update
+
+    Returns:
+        int: Cantidad de usuarios actualizados
+    """
+    with _get_redis().pipeline() as pipe:
+        # Leer y vaciar el buffer de forma atómica (MULTI/EXEC)
+        pipe.zrange(ULTIMO_ACCESO_KEY, 0, -1, withscores=True)
+        pipe.delete(ULTIMO_ACCESO_KEY)
+        entradas, _ = pipe.execute()
+
+    if not entradas:
+        return 0
+
+    # bulk_update solo necesita la PK, no hace falta leer las filas
+    usuarios = [
+        Usuario(
+            pk=int(usuario_id),
+            ultimo_acceso=datetime.fromtimestamp(score, tz=dt_timezone.utc)
+        )
+        for usuario_id, score in entradas
+    ]
+    Usuario.objects.bulk_update(usuarios, ['ultimo_acceso'], batch_size=500)
+
+    logger.info(f'Último acceso actualizado para {len(usuarios)} usuarios')
+
+    return len(usuarios)
+
+
+@shared_task(ignore_result=True)
+def invalidar_refresh_token_task(refresh_token: str):
+    """
+    Agregar un refresh token a la blacklist fuera del ciclo de la petición
+
+    La firma ya se verificó en LogoutView, aquí solo se registra el token.
+
+    Args:
+        refresh_token: Refresh token codificado
+    """
+    token = RefreshToken(refresh_token, verify=False)
+    token.blacklist()
+
+    logger.info(f'Refresh token {token["jti"]} agregado a la blacklist')
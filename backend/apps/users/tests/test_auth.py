@@ -1,20 +1,46 @@
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.state import token_backend
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.renderers import ORJSONRenderer
+from apps.users.serializers import UsuarioSerializer, usuario_payload
+from apps.users.tokens import generar_tokens
 
 Usuario = get_user_model()
 
+# Hasher rápido: el KDF de producción domina el tiempo de los tests
+HASHERS_TESTS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Caché en memoria: los tests no deben depender de Redis ni vaciar la
+# base de caché compartida de settings.CACHES
+CACHE_TESTS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Login y logout encolan tareas (último acceso, blacklist);
+# en modo eager se ejecutan en el propio test sin broker ni worker
+AJUSTES_TESTS = {
+    'PASSWORD_HASHERS': HASHERS_TESTS,
+    'CACHES': CACHE_TESTS,
+    'CELERY_TASK_ALWAYS_EAGER': True,
+}
+
 
+@override_settings(**AJUSTES_TESTS)
 class RegistroTestCase(TestCase):
     """Tests para el registro de usuarios"""
     
-    def setUp(self):
-        self.client = APIClient()
-        self.registro_url = reverse('users:registro')
+    @classmethod
+    def setUpTestData(cls):
+        cls.registro_url = reverse('users:registro')
         
-        self.datos_validos = {
+        cls.datos_validos = {
             'username': 'nuevouser',
             'email': 'nuevo@test.com',
             'password': 'TestPassword123!',
@@ -24,6 +50,9 @@ class RegistroTestCase(TestCase):
             'rol': 'docente'
         }
     
+    def setUp(self):
+        self.client = APIClient()
+    
     def test_registro_exitoso(self):
         """Test de registro exitoso de usuario"""
         response = self.client.post(
@@ -72,17 +101,37 @@ class RegistroTestCase(TestCase):
         )
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+    
+    def test_registro_username_duplicado(self):
+        """Test cuando el username ya está registrado"""
+        Usuario.objects.create_user(
+            username='nuevouser',
+            email='otro@test.com',
+            password='TestPass123!'
+        )
+        
+        response = self.client.post(
+            self.registro_url,
+            self.datos_validos,
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('username', response.data)
 
 
+@override_settings(**AJUSTES_TESTS)
 class LoginTestCase(TestCase):
     """Tests para el inicio de sesión"""
     
-    def setUp(self):
-        self.client = APIClient()
-        self.login_url = reverse('users:login')
+    @classmethod
+    def setUpTestData(cls):
+        cls.login_url = reverse('users:login')
+        cls.perfil_url = reverse('users:perfil')
         
-        # Crear usuario de prueba
-        self.usuario = Usuario.objects.create_user(
+        # Crear usuario de prueba (una sola vez por clase)
+        cls.usuario = Usuario.objects.create_user(
             username='testuser',
             email='test@test.com',
             password='TestPassword123!',
@@ -91,6 +140,11 @@ class LoginTestCase(TestCase):
             rol='docente'
         )
     
+    def setUp(self):
+        # Los intentos fallidos se cuentan en caché
+        cache.clear()
+        self.client = APIClient()
+    
     def test_login_exitoso(self):
         """Test de login exitoso"""
         datos = {
@@ -108,6 +162,37 @@ class LoginTestCase(TestCase):
         self.assertIn('usuario', response.data)
         self.assertIn('tokens', response.data)
         self.assertEqual(response.data['usuario']['username'], 'testuser')
+        self.assertEqual(response.json()['usuario']['username'], 'testuser')
+    
+    def test_login_payload_igual_a_serializer(self):
+        """Test que el payload del login coincide con UsuarioSerializer"""
+        self.usuario.ultimo_acceso = timezone.now()
+        
+        self.assertEqual(
+            usuario_payload(self.usuario),
+            dict(UsuarioSerializer(self.usuario).data)
+        )
+    
+    def test_login_tokens_validos(self):
+        """Test que los tokens emitidos coinciden con los de simplejwt"""
+        response = self.client.post(
+            self.login_url,
+            {'username': 'testuser', 'password': 'TestPassword123!'},
+            format='json'
+        )
+        
+        access = response.data['tokens']['access']
+        token = AccessToken(access)
+        self.assertEqual(token['user_id'], str(self.usuario.id))
+        self.assertEqual(token['rol'], 'docente')
+        self.assertEqual(token_backend.encode(token.payload), access)
+        
+        refresh = response.data['tokens']['refresh']
+        self.assertEqual(OutstandingToken.objects.get(token=refresh).user, self.usuario)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        response = self.client.get(self.perfil_url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
     
     def test_login_credenciales_invalidas(self):
         """Test con credenciales inválidas"""
@@ -124,6 +209,24 @@ class LoginTestCase(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
+    @override_settings(LOGIN_MAX_INTENTOS_FALLIDOS=2)
+    def test_login_bloqueo_intentos_fallidos(self):
+        """Test de bloqueo tras varios intentos fallidos"""
+        datos = {
+            'username': 'testuser',
+            'password': 'PasswordIncorrecta'
+        }
+        
+        for _ in range(2):
+            self.client.post(self.login_url, datos, format='json')
+        
+        # Incluso con la contraseña correcta queda bloqueado
+        datos['password'] = 'TestPassword123!'
+        response = self.client.post(self.login_url, datos, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Demasiados intentos', response.json()['non_field_errors'][0])
+    
     def test_login_usuario_inactivo(self):
         """Test con usuario inactivo"""
         self.usuario.is_active = False
@@ -143,15 +246,16 @@ class LoginTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+@override_settings(**AJUSTES_TESTS)
 class PerfilTestCase(TestCase):
     """Tests para el perfil de usuario"""
     
-    def setUp(self):
-        self.client = APIClient()
-        self.perfil_url = reverse('users:perfil')
+    @classmethod
+    def setUpTestData(cls):
+        cls.perfil_url = reverse('users:perfil')
         
-        # Crear usuario y autenticar
-        self.usuario = Usuario.objects.create_user(
+        # Crear usuario y obtener token
+        cls.usuario = Usuario.objects.create_user(
             username='testuser',
             email='test@test.com',
             password='TestPassword123!',
@@ -159,15 +263,11 @@ class PerfilTestCase(TestCase):
             last_name='User',
             rol='docente'
         )
-        
-        # Obtener token
-        login_url = reverse('users:login')
-        response = self.client.post(
-            login_url,
-            {'username': 'testuser', 'password': 'TestPassword123!'},
-            format='json'
-        )
-        self.token = response.data['tokens']['access']
+        cls.token = generar_tokens(cls.usuario)['access']
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
     
     def test_obtener_perfil_autenticado(self):
         """Test obtener perfil con autenticación"""
@@ -178,6 +278,15 @@ class PerfilTestCase(TestCase):
         self.assertEqual(response.data['username'], 'testuser')
         self.assertEqual(response.data['email'], 'test@test.com')
     
+    def test_obtener_perfil_una_consulta(self):
+        """Test que el perfil se sirve con la consulta de autenticación"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(self.perfil_url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
     def test_obtener_perfil_sin_autenticacion(self):
         """Test obtener perfil sin autenticación"""
         response = self.client.get(self.perfil_url)
@@ -203,32 +312,122 @@ class PerfilTestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.usuario.refresh_from_db()
         self.assertEqual(self.usuario.first_name, 'NuevoNombre')
+    
+    def test_actualizar_perfil_mismo_email(self):
+        """Test actualizar perfil conservando el mismo email"""
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        
+        response = self.client.patch(
+            self.perfil_url,
+            {'first_name': 'OtroNombre', 'email': 'test@test.com'},
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_cambio_email_libera_email_anterior(self):
+        """Test que tras cambiar el email otro usuario puede usar el anterior"""
+        otro = Usuario.objects.create_user(
+            username='otrouser',
+            email='otro@test.com',
+            password='TestPassword123!'
+        )
+        token_otro = generar_tokens(otro)['access']
+        
+        # Deja cacheado que test@test.com existe
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_otro}')
+        response = self.client.patch(self.perfil_url, {'email': 'test@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = self.client.patch(self.perfil_url, {'email': 'cambiado@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token_otro}')
+        response = self.client.patch(self.perfil_url, {'email': 'test@test.com'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_email_existente_con_otras_mayusculas(self):
+        """Test que el email de otro usuario no se acepta cambiando mayúsculas"""
+        otro = Usuario.objects.create_user(
+            username='otrouser',
+            email='otro@test.com',
+            password='TestPassword123!'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generar_tokens(otro)["access"]}')
+        
+        for email in ('test@test.com', 'TEST@Test.com'):
+            response = self.client.patch(self.perfil_url, {'email': email}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn('email', response.data)
+    
+    def test_email_tomado_en_carrera_responde_400(self):
+        """Test que si el validador no ve el duplicado la restricción única da un 400"""
+        otro = Usuario.objects.create_user(
+            username='otrouser',
+            email='otro@test.com',
+            password='TestPassword123!'
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {generar_tokens(otro)["access"]}')
+        
+        # Simula que el otro usuario tomó el email tras la validación
+        with mock.patch('apps.users.validators.qs_exists', return_value=False):
+            response = self.client.patch(self.perfil_url, {'email': 'test@test.com'}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
 
 
-class CambioPasswordTestCase(TestCase):
-    """Tests para cambio de contraseña"""
+@override_settings(**AJUSTES_TESTS)
+class LogoutTestCase(TestCase):
+    """Tests para el cierre de sesión"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.logout_url = reverse('users:logout')
+        
+        cls.usuario = Usuario.objects.create_user(
+            username='testuser',
+            email='test@test.com',
+            password='TestPassword123!'
+        )
+        cls.token = generar_tokens(cls.usuario)['access']
     
     def setUp(self):
         self.client = APIClient()
-        self.cambio_password_url = reverse('users:cambio_password')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+    
+    def test_logout_token_invalido(self):
+        """Test logout con refresh token inválido"""
+        response = self.client.post(
+            self.logout_url,
+            {'refresh': 'token-invalido'},
+            format='json'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Token inválido o expirado')
+
+@override_settings(**AJUSTES_TESTS)
+class CambioPasswordTestCase(TestCase):
+    """Tests para cambio de contraseña"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.cambio_password_url = reverse('users:cambio_password')
         
-        # Crear usuario y autenticar
-        self.usuario = Usuario.objects.create_user(
+        # Crear usuario y obtener token
+        cls.usuario = Usuario.objects.create_user(
             username='testuser',
             email='test@test.com',
             password='TestPassword123!',
             first_name='Test',
             last_name='User'
         )
-        
-        # Obtener token
-        login_url = reverse('users:login')
-        response = self.client.post(
-            login_url,
-            {'username': 'testuser', 'password': 'TestPassword123!'},
-            format='json'
-        )
-        self.token = response.data['tokens']['access']
+        cls.token = generar_tokens(cls.usuario)['access']
+    
+    def setUp(self):
+        self.client = APIClient()
         self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
     
     def test_cambio_password_exitoso(self):
@@ -267,4 +466,13 @@ class CambioPasswordTestCase(TestCase):
             format='json'
         )
         
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ORJSONRendererTestCase(TestCase):
+    """Tests para el renderer JSON por defecto"""
+    
+    def test_claves_no_str(self):
+        """Test que las claves enteras se serializan como texto, igual que con json"""
+        contenido = ORJSONRenderer().render({1: 'uno', 'total': 1})
+        self.assertEqual(contenido, b'{"1":"uno","total":1}')
@@ -0,0 +1,136 @@
+from rest_framework_simplejwt.backends import TokenBackend
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch, get_md5_hash_password
+from jwt.utils import base64url_encode
+import hashlib
+import hmac
+import json
+
+ROL_CLAIM = 'rol'
+
+HMAC_DIGESTS = {
+    'HS256': hashlib.sha256,
+    'HS384': hashlib.sha384,
+    'HS512': hashlib.sha512,
+}
+
+
+class TokenBackendPrecalculado(TokenBackend):
+    """
+    TokenBackend que precalcula la cabecera JWT y el estado HMAC de la
+    clave de firma, de modo que cada encode solo serializa el payload
+
+    Para algoritmos que no son HMAC se delega en el encode de simplejwt.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cabecera = None
+        self._hmac = None
+
+        digest = HMAC_DIGESTS.get(self.algorithm)
+        if digest is None or not self.signing_key:
+            return
+
+        # Misma serialización que PyJWT (claves ordenadas, sin espacios)
+        cabecera = json.dumps(
+            {'alg': self.algorithm, 'typ': 'JWT'},
+            separators=(',', ':'),
+            sort_keys=True
+        ).encode('utf-8')
+        self._cabecera = base64url_encode(cabecera)
+        self._hmac = hmac.new(self.prepared_signing_key, digestmod=digest)
+
+    def encode(self, payload):
+        if self._hmac is None:
+            return super().encode(payload)
+
+        jwt_payload = payload.copy()
+        if self.audience is not None:
+            jwt_payload['aud'] = self.audience
+        if self.issuer is not None:
+            jwt_payload['iss'] = self.issuer
+
+        contenido = json.dumps(
+            jwt_payload,
+            separators=(',', ':'),
+            cls=self.json_encoder
+        ).encode('utf-8')
+        mensaje = self._cabecera + b'.' + base64url_encode(contenido)
+
+        # copy() reutiliza los pads de la clave ya procesados
+        firma = self._hmac.copy()
+        firma.update(mensaje)
+
+        return (mensaje + b'.' + base64url_encode(firma.digest())).decode('utf-8')
+
+
+token_backend = TokenBackendPrecalculado(
+    api_settings.ALGORITHM,
+    api_settings.SIGNING_KEY,
+    api_settings.VERIFYING_KEY,
+    api_settings.AUDIENCE,
+    api_settings.ISSUER,
+    api_settings.JWK_URL,
+    api_settings.LEEWAY,
+    api_settings.JSON_ENCODER,
+)
+
+
+class BackendPrecalculadoMixin:
+    """Usa el backend de módulo en lugar de resolverlo en cada token"""
+
+    def get_token_backend(self):
+        return token_backend
+
+
+class AccessTokenPrecalculado(BackendPrecalculadoMixin, AccessToken):
+    pass
+
+
+class RefreshTokenPrecalculado(BackendPrecalculadoMixin, RefreshToken):
+    access_token_class = AccessTokenPrecalculado
+
+    @classmethod
+    def for_user(cls, user):
+        """
+        Igual que RefreshToken.for_user pero sin el INSERT en
+        OutstandingToken, que generar_tokens hace con el token ya firmado
+        """
+        token = cls()
+        token[api_settings.USER_ID_CLAIM] = str(getattr(user, api_settings.USER_ID_FIELD))
+        if api_settings.CHECK_REVOKE_TOKEN:
+            token[api_settings.REVOKE_TOKEN_CLAIM] = get_md5_hash_password(user.password)
+        # El rol viaja en el token (y se copia al access token)
+        token[ROL_CLAIM] = user.rol
+        return token
+
+
+def generar_tokens(usuario) -> dict:
+    """
+    Generar el par de tokens JWT de un usuario
+
+    El refresh token se registra en OutstandingToken dentro de la petición:
+    si el registro fuera en segundo plano, un logout previo crearía la fila
+    sin usuario al hacer blacklist.
+
+    Returns:
+        dict: {'refresh': str, 'access': str}
+    """
+    refresh = RefreshTokenPrecalculado.for_user(usuario)
+    tokens = {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    }
+
+    OutstandingToken.objects.create(
+        user=usuario,
+        jti=refresh[api_settings.JTI_CLAIM],
+        token=tokens['refresh'],
+        created_at=refresh.current_time,
+        expires_at=datetime_from_epoch(refresh['exp']),
+    )
+
+    return tokens
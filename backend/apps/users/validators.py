@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from rest_framework.exceptions import ValidationError
+from rest_framework.validators import UniqueValidator, qs_exists
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMAIL_EXISTE_PREFIX = 'email_exists'
+
+
+def email_existe_cache_key(email: str) -> str:
+    """
+    Clave de caché para la verificación de email existente; el email se
+    normaliza para que las variantes de mayúsculas y espacios compartan clave
+    """
+    return f'{EMAIL_EXISTE_PREFIX}:{email.strip().lower()}'
+
+
+class CachedUniqueValidator(UniqueValidator):
+    """
+    UniqueValidator de email que cachea por unos segundos el resultado de
+    la consulta de existencia para no repetir el SELECT en cada petición
+
+    La clave se normaliza con email_existe_cache_key, así que conviene
+    usarlo con lookup='iexact'. La invalidación se hace con las señales de
+    apps.users.signals.
+    """
+    timeout = 30
+
+    def __call__(self, value, serializer_field):
+        field_name = serializer_field.source_attrs[-1]
+        instance = getattr(serializer_field.parent, 'instance', None)
+
+        # El propio registro que se actualiza no cuenta como duplicado
+        if instance is not None and getattr(instance, field_name) == value:
+            return
+
+        key = email_existe_cache_key(value)
+        try:
+            existe = cache.get(key)
+        except Exception as e:
+            logger.warning(f'Caché no disponible: {str(e)}')
+            existe = None
+
+        if existe is None:
+            queryset = self.filter_queryset(value, self.queryset, field_name)
+            existe = qs_exists(queryset)
+            try:
+                cache.set(key, existe, self.timeout)
+            except Exception as e:
+                logger.warning(f'Caché no disponible: {str(e)}')
+
+        if existe:
+            raise ValidationError(self.message, code='unique')
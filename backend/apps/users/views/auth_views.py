@@ -1,18 +1,25 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError, InvalidToken
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.contrib.auth import get_user_model
-from datetime import datetime
+from django.utils import timezone
+import logging
 
 from apps.users.serializers import (
     RegistroSerializer,
     LoginSerializer,
     UsuarioSerializer,
     CambioPasswordSerializer,
-    ActualizarPerfilSerializer
+    ActualizarPerfilSerializer,
+    usuario_payload
 )
+from apps.users.tasks import registrar_ultimo_acceso_task, invalidar_refresh_token_task
+from apps.users.tokens import generar_tokens
+
+logger = logging.getLogger(__name__)
 
 Usuario = get_user_model()
 
@@ -33,17 +40,14 @@ class RegistroView(generics.CreateAPIView):
         usuario = serializer.save()
         
         # Generar tokens JWT
-        refresh = RefreshToken.for_user(usuario)
+        tokens = generar_tokens(usuario)
         
         # Serializar datos del usuario
-        usuario_data = UsuarioSerializer(usuario).data
+        usuario_data = usuario_payload(usuario)
         
         return Response({
             'usuario': usuario_data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': tokens,
             'message': 'Usuario registrado exitosamente'
         }, status=status.HTTP_201_CREATED)
 
@@ -66,22 +70,28 @@ class LoginView(APIView):
         
         usuario = serializer.validated_data['usuario']
         
-        # Actualizar último acceso
-        usuario.ultimo_acceso = datetime.now()
-        usuario.save(update_fields=['ultimo_acceso'])
+        # Actualizar último acceso (se registra en segundo plano)
+        usuario.ultimo_acceso = timezone.now()
+        try:
+            registrar_ultimo_acceso_task.delay(
+                usuario.pk,
+                usuario.ultimo_acceso.isoformat()
+            )
+        except Exception as e:
+            logger.error(f'Error al encolar último acceso: {str(e)}')
+            Usuario.objects.filter(pk=usuario.pk).update(
+                ultimo_acceso=usuario.ultimo_acceso
+            )
         
         # Generar tokens JWT
-        refresh = RefreshToken.for_user(usuario)
+        tokens = generar_tokens(usuario)
         
         # Serializar datos del usuario
-        usuario_data = UsuarioSerializer(usuario).data
+        usuario_data = usuario_payload(usuario)
         
         return Response({
             'usuario': usuario_data,
-            'tokens': {
-                'refresh': str(refresh),
-                'access': str(refresh.access_token),
-            },
+            'tokens': tokens,
             'message': 'Inicio de sesión exitoso'
         }, status=status.HTTP_200_OK)
 
@@ -95,25 +105,31 @@ class LogoutView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def post(self, request):
+        refresh_token = request.data.get("refresh")
+        if not refresh_token:
+            return Response(
+                {"error": "Refresh token es requerido"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Verificar la firma ahora; el registro en la blacklist va en segundo plano
         try:
-            refresh_token = request.data.get("refresh")
-            if not refresh_token:
-                return Response(
-                    {"error": "Refresh token es requerido"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
             token = RefreshToken(refresh_token)
-            token.blacklist()
-            
-            return Response({
-                "message": "Sesión cerrada exitosamente"
-            }, status=status.HTTP_200_OK)
-        except Exception as e:
+        except (TokenError, InvalidToken):
             return Response(
                 {"error": "Token inválido o expirado"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        try:
+            invalidar_refresh_token_task.delay(refresh_token)
+        except Exception as e:
+            logger.error(f'Error al encolar blacklist del token: {str(e)}')
+            token.blacklist()
+        
+        return Response({
+            "message": "Sesión cerrada exitosamente"
+        }, status=status.HTTP_200_OK)
 
 
 class PerfilUsuarioView(generics.RetrieveUpdateAPIView):
@@ -126,6 +142,8 @@ class PerfilUsuarioView(generics.RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_object(self):
+        # JWTRolAuthentication ya carga el usuario solo con las columnas
+        # del perfil, volver a consultarlo agregaría un SELECT
         return self.request.user
     
     def get_serializer_class(self):
@@ -164,7 +182,7 @@ class VerificarTokenView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        usuario_data = UsuarioSerializer(request.user).data
+        usuario_data = usuario_payload(request.user)
         return Response({
             "valid": True,
             "usuario": usuario_data
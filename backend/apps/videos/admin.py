@@ -1,9 +1,97 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Length, Substr
+from apps.users.pagination import EstimatedCountPaginator
 from .models import (
     Video, Transcripcion, ResumenEjecutivo, Segmento,
     EtiquetaVideo, EtiquetaSegmento, LogProcesamiento,
     ConfiguracionSistema
 )
+import re
+
+Usuario = get_user_model()
+
+class ForeignKeyLigeroMixin:
+    """
+    Mixin que acota los querysets de los desplegables de FK a las columnas
+    que usa su __str__; Video.__str__ lee usuario.username, así que sin el
+    JOIN cada opción del desplegable dispara una consulta
+    """
+    querysets_fk = {
+        'video': lambda: Video.objects.select_related('usuario').only(
+            'id', 'titulo', 'usuario__username'
+        ),
+        'segmento': lambda: Segmento.objects.only(
+            'id', 'titulo', 'timestamp_inicio_seg', 'timestamp_fin_seg'
+        ),
+        'usuario': lambda: Usuario.objects.only(
+            'id', 'first_name', 'last_name', 'email'
+        ),
+        'modificado_por': lambda: Usuario.objects.only(
+            'id', 'first_name', 'last_name', 'email'
+        ),
+    }
+    
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.querysets_fk and 'queryset' not in kwargs:
+            kwargs['queryset'] = self.querysets_fk[db_field.name]()
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+class ChangelistDeferMixin:
+    """
+    Mixin que omite en el listado las columnas grandes (JSON/TEXT) que no
+    se muestran; el formulario de edición sigue cargando la fila completa
+    """
+    changelist_defer = ()
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        if self.changelist_defer and match and match.url_name.endswith('_changelist'):
+            qs = qs.defer(*self.changelist_defer)
+        return qs
+
+class AutocompleteLigeroMixin:
+    """
+    Mixin que, en el endpoint de autocompletado del admin (usado por los
+    autocomplete_fields de otros modelos), carga solo las columnas que
+    necesita el __str__ de cada opción
+    """
+    autocomplete_only = ()
+    autocomplete_select_related = ()
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        match = request.resolver_match
+        if self.autocomplete_only and match and match.url_name == 'autocomplete':
+            qs = qs.select_related(*self.autocomplete_select_related).only(
+                *self.autocomplete_only
+            )
+        return qs
+
+class BusquedaTextoMixin:
+    """
+    Mixin que busca en columnas de texto largo solo con términos de al
+    menos 3 caracteres, el mínimo con el que PostgreSQL puede usar los
+    índices trigram (pg_trgm) en lugar de recorrer toda la tabla
+    """
+    search_fields_texto = ()
+    min_largo_busqueda_texto = 3
+    
+    def get_search_results(self, request, queryset, search_term):
+        qs, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        
+        termino = search_term.strip()
+        if self.search_fields_texto and len(termino) >= self.min_largo_busqueda_texto:
+            filtro = Q()
+            for campo in self.search_fields_texto:
+                filtro |= Q(**{f'{campo}__icontains': termino})
+            qs = qs | queryset.filter(filtro)
+        
+        return qs, may_have_duplicates
 
 class EtiquetaVideoInline(admin.TabularInline):
     model = EtiquetaVideo
@@ -14,18 +102,51 @@ class SegmentoInline(admin.TabularInline):
     extra = 0
     fields = ('titulo', 'timestamp_inicio_seg', 'timestamp_fin_seg', 'orden', 'relevancia_score')
     readonly_fields = ('fecha_creacion',)
+    
+    def get_queryset(self, request):
+        # Solo las columnas del formulario (descripcion y rutas quedan fuera)
+        return super().get_queryset(request).order_by('orden').only(
+            'id', 'video', 'titulo', 'timestamp_inicio_seg',
+            'timestamp_fin_seg', 'orden', 'relevancia_score'
+        )
 
 class LogProcesamientoInline(admin.TabularInline):
+    """
+    Logs de solo lectura; se muestran únicamente los más recientes para
+    que la página del video no crezca con cada reprocesamiento
+    """
     model = LogProcesamiento
     extra = 0
-    readonly_fields = ('timestamp',)
+    max_num = 0
     can_delete = False
+    max_logs = 25
+    fields = ('etapa', 'estado', 'mensaje', 'duracion_ms', 'timestamp')
+    readonly_fields = fields
+    
+    def get_queryset(self, request):
+        qs = super().get_queryset(request).order_by('-timestamp')
+        
+        # El formset filtra por video después, así que el límite va en una
+        # subconsulta (no se puede filtrar un queryset ya recortado)
+        match = request.resolver_match
+        object_id = match.kwargs.get('object_id') if match else None
+        if object_id and str(object_id).isdigit():
+            recientes = qs.filter(video_id=object_id).values('pk')[:self.max_logs]
+            qs = qs.filter(pk__in=recientes)
+        return qs
 
 @admin.register(Video)
-class VideoAdmin(admin.ModelAdmin):
+class VideoAdmin(AutocompleteLigeroMixin, ChangelistDeferMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('titulo', 'usuario', 'fuente', 'estado', 'duracion_formateada', 'fecha_subida')
+    list_select_related = ('usuario',)
+    changelist_defer = ('metadata_json', 'vector_busqueda')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('estado', 'fuente', 'fecha_subida')
     search_fields = ('titulo', 'usuario__username', 'usuario__email')
+    autocomplete_fields = ('usuario',)
+    autocomplete_select_related = ('usuario',)
+    autocomplete_only = ('id', 'titulo', 'usuario__username')
     readonly_fields = ('fecha_subida', 'fecha_procesamiento', 'duracion_formateada')
     date_hierarchy = 'fecha_subida'
     inlines = [EtiquetaVideoInline, SegmentoInline, LogProcesamientoInline]
@@ -45,12 +166,33 @@ class VideoAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        En PostgreSQL busca sobre el tsvector indexado (título, username y
+        email) con coincidencia por prefijo de cada palabra, en lugar del OR
+        de ILIKE sobre videos y usuarios
+        """
+        palabras = re.findall(r'\w+', search_term)
+        if not palabras or connection.vendor != 'postgresql':
+            return super().get_search_results(request, queryset, search_term)
+        
+        consulta = SearchQuery(
+            ' & '.join(f'{palabra}:*' for palabra in palabras),
+            config='simple',
+            search_type='raw'
+        )
+        return queryset.filter(vector_busqueda=consulta), False
 
 @admin.register(Transcripcion)
-class TranscripcionAdmin(admin.ModelAdmin):
+class TranscripcionAdmin(ChangelistDeferMixin, BusquedaTextoMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('video', 'idioma_detectado', 'precision_estimada', 'modelo_utilizado', 'fecha_generacion')
+    list_select_related = ('video__usuario',)
+    changelist_defer = ('contenido_completo', 'transcripcion_con_timestamps', 'video__metadata_json')
     list_filter = ('idioma_detectado', 'fecha_generacion')
-    search_fields = ('video__titulo', 'contenido_completo')
+    search_fields = ('video__titulo',)
+    search_fields_texto = ('contenido_completo',)
+    autocomplete_fields = ('video',)
     readonly_fields = ('fecha_generacion',)
     
     fieldsets = (
@@ -66,11 +208,18 @@ class TranscripcionAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ResumenEjecutivo)
-class ResumenEjecutivoAdmin(admin.ModelAdmin):
+class ResumenEjecutivoAdmin(ChangelistDeferMixin, BusquedaTextoMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('video', 'cantidad_palabras', 'modelo_ia_utilizado', 'fecha_generacion')
+    list_select_related = ('video__usuario',)
+    changelist_defer = (
+        'resumen_completo', 'temas_principales', 'conclusiones_clave',
+        'puntos_importantes', 'video__metadata_json'
+    )
     list_filter = ('fecha_generacion', 'modelo_ia_utilizado')
-    search_fields = ('video__titulo', 'resumen_completo', 'temas_principales')
-    readonly_fields = ('fecha_generacion',)
+    search_fields = ('video__titulo',)
+    search_fields_texto = ('resumen_completo', 'temas_principales')
+    autocomplete_fields = ('video',)
+    readonly_fields = ('fecha_generacion', 'cantidad_palabras')
     
     fieldsets = (
         ('Video', {
@@ -89,10 +238,16 @@ class EtiquetaSegmentoInline(admin.TabularInline):
     extra = 1
 
 @admin.register(Segmento)
-class SegmentoAdmin(admin.ModelAdmin):
+class SegmentoAdmin(AutocompleteLigeroMixin, ChangelistDeferMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('titulo', 'video', 'timestamp_inicio_formateado', 'timestamp_fin_formateado', 'duracion_seg', 'orden', 'relevancia_score', 'tipo_contenido')
+    list_select_related = ('video__usuario',)
+    changelist_defer = ('descripcion', 'video__metadata_json')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('tipo_contenido', 'fecha_creacion')
     search_fields = ('titulo', 'descripcion', 'video__titulo')
+    autocomplete_fields = ('video',)
+    autocomplete_only = ('id', 'titulo', 'timestamp_inicio_seg', 'timestamp_fin_seg')
     readonly_fields = ('fecha_creacion', 'timestamp_inicio_formateado', 'timestamp_fin_formateado')
     inlines = [EtiquetaSegmentoInline]
     
@@ -115,24 +270,35 @@ class SegmentoAdmin(admin.ModelAdmin):
     )
 
 @admin.register(EtiquetaVideo)
-class EtiquetaVideoAdmin(admin.ModelAdmin):
+class EtiquetaVideoAdmin(ChangelistDeferMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('etiqueta', 'video', 'categoria', 'fecha_asignacion')
+    list_select_related = ('video__usuario',)
+    changelist_defer = ('video__metadata_json',)
     list_filter = ('categoria', 'fecha_asignacion')
     search_fields = ('etiqueta', 'video__titulo')
+    autocomplete_fields = ('video',)
     readonly_fields = ('fecha_asignacion',)
 
 @admin.register(EtiquetaSegmento)
-class EtiquetaSegmentoAdmin(admin.ModelAdmin):
+class EtiquetaSegmentoAdmin(ChangelistDeferMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('etiqueta', 'segmento', 'confianza', 'fecha_asignacion')
+    list_select_related = ('segmento',)
+    changelist_defer = ('segmento__descripcion',)
     list_filter = ('fecha_asignacion',)
     search_fields = ('etiqueta', 'segmento__titulo')
+    autocomplete_fields = ('segmento',)
     readonly_fields = ('fecha_asignacion',)
 
 @admin.register(LogProcesamiento)
-class LogProcesamientoAdmin(admin.ModelAdmin):
+class LogProcesamientoAdmin(ChangelistDeferMixin, ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('video', 'etapa', 'estado', 'timestamp', 'duracion_ms')
+    list_select_related = ('video__usuario',)
+    changelist_defer = ('mensaje', 'error_detalle', 'video__metadata_json')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     list_filter = ('estado', 'etapa', 'timestamp')
     search_fields = ('video__titulo', 'mensaje', 'error_detalle')
+    autocomplete_fields = ('video',)
     readonly_fields = ('timestamp',)
     date_hierarchy = 'timestamp'
     
@@ -149,12 +315,31 @@ class LogProcesamientoAdmin(admin.ModelAdmin):
     )
 
 @admin.register(ConfiguracionSistema)
-class ConfiguracionSistemaAdmin(admin.ModelAdmin):
+class ConfiguracionSistemaAdmin(ForeignKeyLigeroMixin, admin.ModelAdmin):
     list_display = ('parametro', 'valor_truncado', 'modificado_por', 'fecha_modificacion')
+    list_select_related = ('modificado_por',)
     search_fields = ('parametro', 'descripcion', 'valor')
+    autocomplete_fields = ('modificado_por',)
     readonly_fields = ('fecha_modificacion',)
     
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        # En el listado el recorte de 'valor' se hace en la base de datos
+        match = request.resolver_match
+        if match and match.url_name == 'videos_configuracionsistema_changelist':
+            qs = qs.annotate(
+                _valor_truncado=Substr('valor', 1, 50),
+                _valor_largo=Length('valor')
+            ).only(
+                'id', 'parametro', 'fecha_modificacion', 'modificado_por',
+                'modificado_por__first_name', 'modificado_por__last_name',
+                'modificado_por__email'
+            )
+        return qs
+    
     def valor_truncado(self, obj):
+        if hasattr(obj, '_valor_truncado'):
+            return obj._valor_truncado + '...' if obj._valor_largo > 50 else obj._valor_truncado
         return obj.valor[:50] + '...' if len(obj.valor) > 50 else obj.valor
     valor_truncado.short_description = 'Valor'
     
@@ -5,3 +5,6 @@ class VideosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.videos'
     verbose_name = 'Videos'
+
+    def ready(self):
+        from apps.videos import signals  # noqa: F401
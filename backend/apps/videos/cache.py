@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def video_completo_cache_key(video_id) -> str:
+    """Clave de caché del detalle completo serializado de un video"""
+    return f'video_completo:{video_id}'
+
+
+def video_completo_pendiente_key(video_id) -> str:
+    """Clave que marca un detalle completo en proceso de serialización"""
+    return f'video_completo_pendiente:{video_id}'
+
+
+def leer_video_completo(video_id):
+    """Detalle completo cacheado de un video, o None si no está"""
+    try:
+        return cache.get(video_completo_cache_key(video_id))
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+        return None
+
+
+def guardar_video_completo(video_id, data):
+    """Cachear el detalle completo serializado de un video"""
+    try:
+        cache.set(
+            video_completo_cache_key(video_id),
+            data,
+            settings.VIDEO_COMPLETO_CACHE_SEGUNDOS
+        )
+        cache.delete(video_completo_pendiente_key(video_id))
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+
+
+def marcar_video_completo_pendiente(video_id) -> bool:
+    """
+    Marcar que el detalle completo se está serializando en segundo plano
+    
+    Returns:
+        bool: False si ya estaba marcado (no hace falta encolar otra tarea)
+    """
+    try:
+        return cache.add(
+            video_completo_pendiente_key(video_id),
+            True,
+            settings.VIDEO_COMPLETO_PENDIENTE_SEGUNDOS
+        )
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+        return True
+
+
+def invalidar_video_completo(video_id):
+    """Descartar el detalle completo cacheado de un video"""
+    try:
+        cache.delete(video_completo_cache_key(video_id))
+    except Exception as e:
+        logger.warning(f'No se pudo invalidar la caché del video: {str(e)}')
+
+
+def transcripcion_parcial_key(video_id) -> str:
+    """Clave de caché de la transcripción en curso de un video"""
+    return f'transcripcion_parcial:{video_id}'
+
+
+def guardar_transcripcion_parcial(video_id, segmentos):
+    """Publicar los segmentos ya transcritos mientras sigue la transcripción"""
+    try:
+        cache.set(
+            transcripcion_parcial_key(video_id),
+            segmentos,
+            settings.TRANSCRIPCION_PARCIAL_SEGUNDOS
+        )
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+
+
+def leer_transcripcion_parcial(video_id):
+    """Segmentos de la transcripción en curso, o None si no hay"""
+    try:
+        return cache.get(transcripcion_parcial_key(video_id))
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+        return None
+
+
+def borrar_transcripcion_parcial(video_id):
+    """Descartar la transcripción parcial al terminar"""
+    try:
+        cache.delete(transcripcion_parcial_key(video_id))
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
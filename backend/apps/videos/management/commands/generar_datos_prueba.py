@@ -1,48 +1,128 @@
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
 from apps.videos.models import (
     Video, Transcripcion, ResumenEjecutivo, Segmento,
-    EtiquetaVideo, LogProcesamiento, ConfiguracionSistema
+    EtiquetaVideo, ConfiguracionSistema
 )
-from datetime import datetime, timedelta
-import random
+from apps.videos.services import LogBuffer
+from django.utils import timezone
+from datetime import timedelta
+from itertools import islice
+import numpy as np
 
 Usuario = get_user_model()
 
+# Videos leídos (y filas insertadas) por lote al generar su contenido
+TAMANO_LOTE = 500
+
+# Datos fijos compartidos por todas las filas generadas; los JSONField se
+# serializan al insertar, así que el mismo objeto sirve para todas
+METADATA_VIDEO = {
+    'resolucion': '1920x1080',
+    'fps': 30,
+    'codec': 'h264'
+}
+ETIQUETAS = ['programación', 'tutorial', 'universidad', 'educación']
+ETAPAS = ['descarga', 'extraccion_audio', 'transcripcion']
+TIPOS_SEGMENTO = ['introduccion', 'concepto_clave', 'ejemplo', 'demostracion', 'conclusion']
+NOMBRES_TIPO_SEGMENTO = [tipo.replace('_', ' ').title() for tipo in TIPOS_SEGMENTO]
+
+PLANTILLA_TRANSCRIPCION = (
+    'Esta es la transcripción completa del video "{titulo}". '
+    'En esta clase aprenderemos conceptos fundamentales sobre el tema. '
+    'Comenzaremos con una introducción general, luego veremos ejemplos prácticos '
+    'y finalmente realizaremos ejercicios de aplicación.'
+)
+TRANSCRIPCION_CON_TIMESTAMPS = [
+    {'inicio': 0, 'fin': 30, 'texto': 'Bienvenidos a esta clase...'},
+    {'inicio': 30, 'fin': 120, 'texto': 'Hoy veremos los conceptos principales...'},
+    {'inicio': 120, 'fin': 300, 'texto': 'Comenzaremos con un ejemplo...'}
+]
+
+PLANTILLA_RESUMEN = (
+    'Este video presenta una introducción completa a {titulo}. '
+    'Se cubren los conceptos fundamentales necesarios para comprender el tema, '
+    'se presentan ejemplos prácticos y se proponen ejercicios de aplicación.'
+)
+TEMAS_PRINCIPALES = ['Introducción al tema', 'Conceptos básicos', 'Ejemplos prácticos', 'Ejercicios']
+CONCLUSIONES_CLAVE = [
+    'El tema es fundamental para el desarrollo profesional',
+    'Es importante practicar con ejemplos reales',
+    'Los ejercicios ayudan a consolidar el conocimiento',
+]
+PUNTOS_IMPORTANTES = [
+    'Definiciones clave explicadas',
+    'Ejemplos del mundo real',
+    'Buenas prácticas recomendadas',
+]
+
+PLANTILLA_DESCRIPCION_SEGMENTO = (
+    'Descripción del segmento importante número {numero}. '
+    'Este segmento contiene información relevante para el aprendizaje.'
+)
+
 class Command(BaseCommand):
     help = 'Genera datos de prueba para el sistema'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--semilla',
+            type=int,
+            default=None,
+            help='Semilla del generador aleatorio para obtener datos reproducibles'
+        )
+
+    @transaction.atomic
     def handle(self, *args, **kwargs):
-        self.stdout.write('Generando datos de prueba...')
+        # Verbosidad 1: un resumen por paso; 2: una línea por objeto creado
+        self.verbosity = kwargs.get('verbosity', 1)
+        self.log('Generando datos de prueba...')
         
-        # Crear usuarios de prueba
-        usuarios = self.crear_usuarios()
+        # Un único generador: los valores aleatorios se calculan por lotes
+        self.rng = np.random.default_rng(kwargs.get('semilla'))
+        
+        # Crear usuarios de prueba (solo se necesitan sus IDs)
+        ids_usuarios = self.crear_usuarios()
         
         # Crear videos de prueba
-        videos = self.crear_videos(usuarios)
+        ids_videos = self.crear_videos(ids_usuarios)
         
         # Crear transcripciones
-        self.crear_transcripciones(videos)
+        self.crear_transcripciones(ids_videos)
         
         # Crear resúmenes ejecutivos
-        self.crear_resumenes(videos)
+        self.crear_resumenes(ids_videos)
         
         # Crear segmentos
-        self.crear_segmentos(videos)
+        self.crear_segmentos(ids_videos)
         
         # Crear configuraciones
-        self.crear_configuraciones(usuarios)
+        self.crear_configuraciones(ids_usuarios)
         
-        self.stdout.write(self.style.SUCCESS('¡Datos de prueba generados exitosamente!'))
+        self.log(self.style.SUCCESS('¡Datos de prueba generados exitosamente!'))
+    
+    def log(self, mensaje, nivel=1):
+        if self.verbosity >= nivel:
+            self.stdout.write(mensaje)
+    
+    def lotes_videos_completados(self, ids_videos):
+        """
+        Recorre los videos completados recién creados en lotes de
+        TAMANO_LOTE, con memoria acotada sin importar cuántos sean
+        """
+        videos = Video.objects.filter(
+            pk__in=ids_videos,
+            estado='completado'
+        ).only('id', 'titulo', 'duracion_segundos').order_by('pk').iterator(
+            chunk_size=TAMANO_LOTE
+        )
+        while lote := list(islice(videos, TAMANO_LOTE)):
+            yield lote
     
     def crear_usuarios(self):
-        self.stdout.write('Creando usuarios...')
-        usuarios = []
-        
-        # Verificar si ya existen
-        if Usuario.objects.filter(username='docente1').exists():
-            self.stdout.write(self.style.WARNING('Los usuarios ya existen, omitiendo...'))
-            return Usuario.objects.filter(rol='docente')[:3]
+        self.log('Creando usuarios...')
         
         usuarios_data = [
             {
@@ -68,22 +148,37 @@ class Command(BaseCommand):
             }
         ]
         
-        for data in usuarios_data:
-            usuario = Usuario.objects.create_user(
+        # Verificar si ya existen (una sola consulta que trae solo sus IDs)
+        existentes = list(Usuario.objects.filter(
+            username__in=[data['username'] for data in usuarios_data]
+        ).values_list('id', flat=True))
+        if existentes:
+            self.log(self.style.WARNING('Los usuarios ya existen, omitiendo...'))
+            return existentes
+        
+        # Todos comparten contraseña: se hashea una sola vez
+        password = make_password('password123')
+        
+        usuarios = Usuario.objects.bulk_create([
+            Usuario(
                 username=data['username'],
-                email=data['email'],
-                password='password123',
+                email=Usuario.objects.normalize_email(data['email']),
+                password=password,
                 first_name=data['first_name'],
                 last_name=data['last_name'],
                 rol=data['rol']
             )
-            usuarios.append(usuario)
-            self.stdout.write(f'  ✓ Usuario creado: {usuario.username}')
+            for data in usuarios_data
+        ])
+        
+        for usuario in usuarios:
+            self.log(f'  ✓ Usuario creado: {usuario.username}', nivel=2)
+        self.log(f'  ✓ {len(usuarios)} usuarios creados')
         
-        return usuarios
+        return [usuario.pk for usuario in usuarios]
     
-    def crear_videos(self, usuarios):
-        self.stdout.write('Creando videos...')
+    def crear_videos(self, ids_usuarios):
+        self.log('Creando videos...')
         videos = []
         
         videos_data = [
@@ -124,126 +219,156 @@ class Command(BaseCommand):
             }
         ]
         
+        # Precalcular todos los valores aleatorios de una vez
+        n = len(videos_data)
+        ahora = timezone.now()
+        idx_usuarios = self.rng.integers(0, len(ids_usuarios), n).tolist()
+        tamanos = self.rng.uniform(100, 500, n).round(2).tolist()
+        dias_subida = self.rng.integers(1, 31, n).tolist()
+        dias_procesamiento = self.rng.integers(0, 16, n).tolist()
+        
+        # Dos etiquetas distintas por video: se permuta cada fila de una
+        # matriz (n, len(ETIQUETAS)) y las etiquetas se resuelven con un
+        # único indexado sobre el arreglo
+        idx_etiquetas = self.rng.permuted(
+            np.tile(np.arange(len(ETIQUETAS)), (n, 1)), axis=1
+        )[:, :2]
+        etiquetas_por_video = np.array(ETIQUETAS)[idx_etiquetas].tolist()
+        duraciones_ms = self.rng.integers(1000, 10001, (n, len(ETAPAS))).tolist()
+        
         for i, data in enumerate(videos_data):
-            video = Video.objects.create(
-                usuario=random.choice(usuarios),
+            videos.append(Video(
+                usuario_id=ids_usuarios[idx_usuarios[i]],
                 titulo=data['titulo'],
                 url_original=data['url_original'],
                 fuente=data['fuente'],
                 duracion_segundos=data['duracion_segundos'],
                 formato='mp4',
-                tamano_mb=round(random.uniform(100, 500), 2),
+                tamano_mb=tamanos[i],
                 estado=data['estado'],
-                fecha_subida=datetime.now() - timedelta(days=random.randint(1, 30)),
-                fecha_procesamiento=datetime.now() - timedelta(days=random.randint(0, 15)) if data['estado'] == 'completado' else None,
-                metadata_json={
-                    'resolucion': '1920x1080',
-                    'fps': 30,
-                    'codec': 'h264'
-                }
+                fecha_subida=ahora - timedelta(days=dias_subida[i]),
+                fecha_procesamiento=ahora - timedelta(days=dias_procesamiento[i]) if data['estado'] == 'completado' else None,
+                metadata_json=METADATA_VIDEO
+            ))
+        
+        # bulk_create asigna las PKs (PostgreSQL), necesarias para las FKs
+        videos = Video.objects.bulk_create(videos)
+        
+        for video in videos:
+            self.log(f'  ✓ Video creado: {video.titulo}', nivel=2)
+        
+        # Etiquetas y logs de todos los videos en un único INSERT por tabla
+        EtiquetaVideo.objects.bulk_create([
+            EtiquetaVideo(
+                video_id=video.pk,
+                etiqueta=etiqueta,
+                categoria='general'
             )
-            videos.append(video)
-            self.stdout.write(f'  ✓ Video creado: {video.titulo}')
-            
-            # Crear etiquetas para el video
-            etiquetas = ['programación', 'tutorial', 'universidad', 'educación']
-            for etiqueta in random.sample(etiquetas, 2):
-                EtiquetaVideo.objects.create(
-                    video=video,
-                    etiqueta=etiqueta,
-                    categoria='general'
-                )
-            
-            # Crear logs de procesamiento
-            if video.estado != 'pendiente':
-                etapas = ['descarga', 'extraccion_audio', 'transcripcion']
-                for etapa in etapas:
-                    LogProcesamiento.objects.create(
-                        video=video,
+            for video, seleccion in zip(videos, etiquetas_por_video)
+            for etiqueta in seleccion
+        ], batch_size=1000)
+        
+        # Los logs se insertan a medida que se generan, sin armar la lista completa
+        with LogBuffer(tamano_lote=TAMANO_LOTE) as logs:
+            for video, duraciones in zip(videos, duraciones_ms):
+                if video.estado == 'pendiente':
+                    continue
+                for etapa, duracion_ms in zip(ETAPAS, duraciones):
+                    logs.add(
+                        video_id=video.pk,
                         etapa=etapa,
                         estado='completado',
                         mensaje=f'Etapa {etapa} completada exitosamente',
-                        duracion_ms=random.randint(1000, 10000)
+                        duracion_ms=duracion_ms
                     )
+        self.log(f'  ✓ {len(videos)} videos creados')
         
-        return videos
+        return [video.pk for video in videos]
     
-    def crear_transcripciones(self, videos):
-        self.stdout.write('Creando transcripciones...')
+    def crear_transcripciones(self, ids_videos):
+        self.log('Creando transcripciones...')
+        total = 0
         
-        for video in videos:
-            if video.estado == 'completado':
-                transcripcion = Transcripcion.objects.create(
+        for lote in self.lotes_videos_completados(ids_videos):
+            transcripciones = []
+            for video in lote:
+                transcripciones.append(Transcripcion(
                     video=video,
-                    contenido_completo=f'Esta es la transcripción completa del video "{video.titulo}". '
-                                     'En esta clase aprenderemos conceptos fundamentales sobre el tema. '
-                                     'Comenzaremos con una introducción general, luego veremos ejemplos prácticos '
-                                     'y finalmente realizaremos ejercicios de aplicación.',
+                    contenido_completo=PLANTILLA_TRANSCRIPCION.format(titulo=video.titulo),
                     idioma_detectado='es',
                     precision_estimada=95.5,
-                    transcripcion_con_timestamps=[
-                        {'inicio': 0, 'fin': 30, 'texto': 'Bienvenidos a esta clase...'},
-                        {'inicio': 30, 'fin': 120, 'texto': 'Hoy veremos los conceptos principales...'},
-                        {'inicio': 120, 'fin': 300, 'texto': 'Comenzaremos con un ejemplo...'}
-                    ],
+                    transcripcion_con_timestamps=TRANSCRIPCION_CON_TIMESTAMPS,
                     modelo_utilizado='whisper-large-v3'
-                )
-                self.stdout.write(f'  ✓ Transcripción creada para: {video.titulo}')
+                ))
+                self.log(f'  ✓ Transcripción creada para: {video.titulo}', nivel=2)
+            
+            Transcripcion.objects.bulk_create(transcripciones, batch_size=TAMANO_LOTE)
+            total += len(transcripciones)
+        
+        self.log(f'  ✓ {total} transcripciones creadas')
     
-    def crear_resumenes(self, videos):
-        self.stdout.write('Creando resúmenes ejecutivos...')
+    def crear_resumenes(self, ids_videos):
+        self.log('Creando resúmenes ejecutivos...')
+        total = 0
         
-        for video in videos:
-            if video.estado == 'completado':
-                resumen = ResumenEjecutivo.objects.create(
+        for lote in self.lotes_videos_completados(ids_videos):
+            resumenes = []
+            palabras = self.rng.integers(200, 501, len(lote)).tolist()
+            for video, cantidad_palabras in zip(lote, palabras):
+                resumenes.append(ResumenEjecutivo(
                     video=video,
-                    resumen_completo=f'Este video presenta una introducción completa a {video.titulo}. '
-                                    'Se cubren los conceptos fundamentales necesarios para comprender el tema, '
-                                    'se presentan ejemplos prácticos y se proponen ejercicios de aplicación.',
-                    temas_principales='1. Introducción al tema\n2. Conceptos básicos\n3. Ejemplos prácticos\n4. Ejercicios',
-                    conclusiones_clave='- El tema es fundamental para el desarrollo profesional\n'
-                                      '- Es importante practicar con ejemplos reales\n'
-                                      '- Los ejercicios ayudan a consolidar el conocimiento',
-                    puntos_importantes='• Definiciones clave explicadas\n'
-                                      '• Ejemplos del mundo real\n'
-                                      '• Buenas prácticas recomendadas',
-                    cantidad_palabras=random.randint(200, 500),
+                    resumen_completo=PLANTILLA_RESUMEN.format(titulo=video.titulo),
+                    temas_principales=TEMAS_PRINCIPALES,
+                    conclusiones_clave=CONCLUSIONES_CLAVE,
+                    puntos_importantes=PUNTOS_IMPORTANTES,
+                    cantidad_palabras=cantidad_palabras,
                     modelo_ia_utilizado='gpt-4'
-                )
-                self.stdout.write(f'  ✓ Resumen creado para: {video.titulo}')
+                ))
+                self.log(f'  ✓ Resumen creado para: {video.titulo}', nivel=2)
+            
+            ResumenEjecutivo.objects.bulk_create(resumenes, batch_size=TAMANO_LOTE)
+            total += len(resumenes)
+        
+        self.log(f'  ✓ {total} resúmenes creados')
     
-    def crear_segmentos(self, videos):
-        self.stdout.write('Creando segmentos...')
+    def crear_segmentos(self, ids_videos):
+        self.log('Creando segmentos...')
+        total = 0
         
-        for video in videos:
-            if video.estado == 'completado':
-                # Crear entre 3 y 5 segmentos por video
-                num_segmentos = random.randint(3, 5)
+        for lote in self.lotes_videos_completados(ids_videos):
+            segmentos = []
+            # Crear entre 3 y 5 segmentos por video
+            cantidades = self.rng.integers(3, 6, len(lote)).tolist()
+            for video, num_segmentos in zip(lote, cantidades):
+                relevancias = self.rng.uniform(7.0, 10.0, num_segmentos).round(1).tolist()
                 duracion_total = video.duracion_segundos
                 segmento_duracion = duracion_total // num_segmentos
                 
-                tipos = ['introduccion', 'concepto_clave', 'ejemplo', 'demostracion', 'conclusion']
-                
                 for i in range(num_segmentos):
                     inicio = i * segmento_duracion
                     fin = inicio + segmento_duracion if i < num_segmentos - 1 else duracion_total
                     
-                    segmento = Segmento.objects.create(
+                    segmento = Segmento(
                         video=video,
-                        titulo=f'Segmento {i+1}: {tipos[i % len(tipos)].replace("_", " ").title()}',
-                        descripcion=f'Descripción del segmento importante número {i+1}. '
-                                   'Este segmento contiene información relevante para el aprendizaje.',
+                        titulo=f'Segmento {i+1}: {NOMBRES_TIPO_SEGMENTO[i % len(TIPOS_SEGMENTO)]}',
+                        descripcion=PLANTILLA_DESCRIPCION_SEGMENTO.format(numero=i + 1),
                         timestamp_inicio_seg=inicio,
                         timestamp_fin_seg=fin,
                         duracion_seg=fin - inicio,
                         orden=i + 1,
-                        relevancia_score=round(random.uniform(7.0, 10.0), 1),
-                        tipo_contenido=tipos[i % len(tipos)]
+                        relevancia_score=relevancias[i],
+                        tipo_contenido=TIPOS_SEGMENTO[i % len(TIPOS_SEGMENTO)]
                     )
-                    self.stdout.write(f'  ✓ Segmento creado: {segmento.titulo}')
+                    segmentos.append(segmento)
+                    self.log(f'  ✓ Segmento creado: {segmento.titulo}', nivel=2)
+            
+            Segmento.objects.bulk_create(segmentos, batch_size=TAMANO_LOTE)
+            total += len(segmentos)
+        
+        self.log(f'  ✓ {total} segmentos creados')
     
-    def crear_configuraciones(self, usuarios):
-        self.stdout.write('Creando configuraciones del sistema...')
+    def crear_configuraciones(self, ids_usuarios):
+        self.log('Creando configuraciones del sistema...')
         
         configuraciones = [
             {
@@ -273,11 +398,19 @@ class Command(BaseCommand):
             }
         ]
         
-        for config in configuraciones:
-            ConfiguracionSistema.objects.create(
+        idx_usuarios = self.rng.integers(0, len(ids_usuarios), len(configuraciones)).tolist()
+        
+        # ignore_conflicts: 'parametro' es único y el comando puede re-ejecutarse
+        ConfiguracionSistema.objects.bulk_create([
+            ConfiguracionSistema(
                 parametro=config['parametro'],
                 valor=config['valor'],
                 descripcion=config['descripcion'],
-                modificado_por=random.choice(usuarios)
+                modificado_por_id=ids_usuarios[idx]
             )
-            self.stdout.write(f'  ✓ Configuración creada: {config["parametro"]}')
\ No newline at end of file
+            for config, idx in zip(configuraciones, idx_usuarios)
+        ], ignore_conflicts=True)
+        
+        for config in configuraciones:
+            self.log(f'  ✓ Configuración creada: {config["parametro"]}', nivel=2)
+        self.log(f'  ✓ {len(configuraciones)} configuraciones creadas')
\ No newline at end of file
@@ -1,14 +1,49 @@
 from django.core.management.base import BaseCommand
 from apps.videos.services.file_cleaner import clean_temp_files
+import json
+import time
 
 
 class Command(BaseCommand):
-    help = 'Limpia archivos temporales antiguos'
+    help = (
+        'Limpia archivos temporales antiguos. Con --interval el proceso queda '
+        'activo y repite la limpieza, evitando arrancar Django en cada ejecución '
+        '(p. ej. un servicio de systemd con --interval 3600 en lugar de un cron por minuto)'
+    )
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=0,
+            help='Segundos entre limpiezas; 0 ejecuta una sola vez'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Emitir el resultado de cada limpieza como JSON en una línea'
+        )
     
     def handle(self, *args, **options):
-        self.stdout.write('Iniciando limpieza de archivos temporales...')
+        intervalo = options['interval']
+        como_json = options['json']
+        
+        if not como_json:
+            self.stdout.write('Iniciando limpieza de archivos temporales...')
         
-        result = clean_temp_files()
+        try:
+            while True:
+                self.escribir_resultado(clean_temp_files(), como_json)
+                if intervalo <= 0:
+                    break
+                time.sleep(intervalo)
+        except KeyboardInterrupt:
+            pass
+    
+    def escribir_resultado(self, result, como_json):
+        if como_json:
+            self.stdout.write(json.dumps(result))
+            return
         
         self.stdout.write(
             self.style.SUCCESS(
@@ -16,4 +51,4 @@ class Command(BaseCommand):
                 f"  - Archivos eliminados: {result['deleted_count']}\n"
                 f"  - Espacio liberado: {result['freed_space_mb']} MB"
             )
-        )
\ No newline at end of file
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.25 on 2026-10-15 22:35
+
+from django.db import migrations
+
+# icontains genera UPPER(columna::text) LIKE UPPER(%s), así que los índices
+# se crean sobre esa misma expresión para que el planner pueda usarlos
+INDICES_TRIGRAM = [
+    ('transcripciones_contenido_upper_trgm', 'transcripciones', 'UPPER(contenido_completo::text)'),
+    ('resumenes_resumen_upper_trgm', 'resumenes_ejecutivos', 'UPPER(resumen_completo::text)'),
+    ('resumenes_temas_upper_trgm', 'resumenes_ejecutivos', 'UPPER(temas_principales::text)'),
+]
+
+
+def crear_indices_trigram(apps, schema_editor):
+    # Índices GIN de pg_trgm para las búsquedas icontains del admin;
+    # solo existen en PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nombre, tabla, expresion in INDICES_TRIGRAM:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} '
+            f'USING gin (({expresion}) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices_trigram(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES_TRIGRAM:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_trigram, eliminar_indices_trigram),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-15 22:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0002_indices_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logprocesamiento',
+            index=models.Index(fields=['etapa', 'estado'], name='logs_proces_etapa_1ae91a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logprocesamiento',
+            index=models.Index(fields=['timestamp'], name='logs_proces_timesta_349634_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='segmento',
+            index=models.Index(fields=['tipo_contenido'], name='segmentos_tipo_co_1e75d0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='segmento',
+            index=models.Index(fields=['fecha_creacion'], name='segmentos_fecha_c_7b0d19_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['estado', 'fecha_subida'], name='videos_estado_ef8533_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['fuente'], name='videos_fuente_c9f0fb_idx'),
+        ),
+    ]
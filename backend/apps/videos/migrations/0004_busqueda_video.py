@@ -0,0 +1,86 @@
+# Generated by Django 4.2.25 on 2026-10-15 22:45
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# El vector combina título, username y email del propietario; el email se
+# indexa también partido por '@' y '.' para poder buscar por dominio
+SQL_CREAR_BUSQUEDA = [
+    """
+    CREATE OR REPLACE FUNCTION videos_vector_busqueda() RETURNS trigger AS $$
+    BEGIN
+        NEW.vector_busqueda :=
+            setweight(to_tsvector('simple', coalesce(NEW.titulo, '')), 'A') ||
+            to_tsvector('simple', coalesce((
+                SELECT username || ' ' || email || ' ' || translate(email, '@.', '  ')
+                FROM usuarios WHERE id = NEW.usuario_id
+            ), ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER videos_vector_busqueda_trg
+    BEFORE INSERT OR UPDATE OF titulo, usuario_id ON videos
+    FOR EACH ROW EXECUTE FUNCTION videos_vector_busqueda()
+    """,
+    # Si cambia el username o el email se recalculan los videos del usuario
+    """
+    CREATE OR REPLACE FUNCTION usuarios_vector_busqueda_videos() RETURNS trigger AS $$
+    BEGIN
+        UPDATE videos SET titulo = titulo WHERE usuario_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER usuarios_vector_busqueda_videos_trg
+    AFTER UPDATE OF username, email ON usuarios
+    FOR EACH ROW
+    WHEN (OLD.username IS DISTINCT FROM NEW.username OR OLD.email IS DISTINCT FROM NEW.email)
+    EXECUTE FUNCTION usuarios_vector_busqueda_videos()
+    """,
+    'CREATE INDEX IF NOT EXISTS videos_vector_busqueda_gin ON videos USING gin (vector_busqueda)',
+    # Poblar los videos existentes a través del trigger
+    'UPDATE videos SET titulo = titulo',
+]
+
+SQL_ELIMINAR_BUSQUEDA = [
+    'DROP INDEX IF EXISTS videos_vector_busqueda_gin',
+    'DROP TRIGGER IF EXISTS usuarios_vector_busqueda_videos_trg ON usuarios',
+    'DROP FUNCTION IF EXISTS usuarios_vector_busqueda_videos()',
+    'DROP TRIGGER IF EXISTS videos_vector_busqueda_trg ON videos',
+    'DROP FUNCTION IF EXISTS videos_vector_busqueda()',
+]
+
+
+def crear_busqueda(apps, schema_editor):
+    # Trigger e índice GIN del tsvector; solo existen en PostgreSQL
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_CREAR_BUSQUEDA:
+        schema_editor.execute(sql)
+
+
+def eliminar_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_ELIMINAR_BUSQUEDA:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_usuario_indexes'),
+        ('videos', '0003_indices_filtros_admin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(crear_busqueda, eliminar_busqueda),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-15 22:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_busqueda_video'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='segmento',
+            index=models.Index(fields=['video', '-relevancia_score'], name='segmentos_video_i_8351b5_idx'),
+        ),
+    ]
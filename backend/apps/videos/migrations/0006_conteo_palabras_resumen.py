@@ -0,0 +1,62 @@
+# Generated by Django 4.2.25 on 2026-10-15 22:54
+
+import apps.videos.models
+import django.core.validators
+from django.db import migrations
+
+# Mismo criterio que str.split(): secuencias sin espacios en blanco
+SQL_CREAR_CONTEO = [
+    """
+    CREATE OR REPLACE FUNCTION resumenes_cantidad_palabras() RETURNS trigger AS $$
+    BEGIN
+        NEW.cantidad_palabras := (
+            SELECT count(*) FROM regexp_matches(coalesce(NEW.resumen_completo, ''), '\\S+', 'g')
+        );
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER resumenes_cantidad_palabras_trg
+    BEFORE INSERT OR UPDATE OF resumen_completo ON resumenes_ejecutivos
+    FOR EACH ROW EXECUTE FUNCTION resumenes_cantidad_palabras()
+    """,
+    # Recalcular los resúmenes existentes a través del trigger
+    'UPDATE resumenes_ejecutivos SET resumen_completo = resumen_completo',
+]
+
+SQL_ELIMINAR_CONTEO = [
+    'DROP TRIGGER IF EXISTS resumenes_cantidad_palabras_trg ON resumenes_ejecutivos',
+    'DROP FUNCTION IF EXISTS resumenes_cantidad_palabras()',
+]
+
+
+def crear_conteo_palabras(apps, schema_editor):
+    # Solo PostgreSQL; en otros motores el serializer calcula el conteo
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_CREAR_CONTEO:
+        schema_editor.execute(sql)
+
+
+def eliminar_conteo_palabras(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in SQL_ELIMINAR_CONTEO:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_indice_segmento_relevancia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumenejecutivo',
+            name='cantidad_palabras',
+            field=apps.videos.models.ConteoPalabrasField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Cantidad de Palabras'),
+        ),
+        migrations.RunPython(crear_conteo_palabras, eliminar_conteo_palabras),
+    ]
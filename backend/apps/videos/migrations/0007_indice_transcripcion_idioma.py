@@ -0,0 +1,46 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:00
+
+from django.db import migrations, models
+
+INDICE_IDIOMA = models.Index(fields=['idioma_detectado'], name='transcripci_idioma__0b84df_idx')
+
+
+def crear_indice(apps, schema_editor):
+    # En PostgreSQL el índice se crea sin bloquear escrituras en la tabla
+    Transcripcion = apps.get_model('videos', 'Transcripcion')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(Transcripcion, INDICE_IDIOMA, concurrently=True)
+    else:
+        schema_editor.add_index(Transcripcion, INDICE_IDIOMA)
+
+
+def eliminar_indice(apps, schema_editor):
+    Transcripcion = apps.get_model('videos', 'Transcripcion')
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(Transcripcion, INDICE_IDIOMA, concurrently=True)
+    else:
+        schema_editor.remove_index(Transcripcion, INDICE_IDIOMA)
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('videos', '0006_conteo_palabras_resumen'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='transcripcion',
+                    index=INDICE_IDIOMA,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(crear_indice, eliminar_indice),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:10
+
+from django.db import migrations
+
+# SearchFilter del listado de videos genera
+#   UPPER(titulo::text) LIKE UPPER(%s) OR UPPER(metadata_json::text) LIKE UPPER(%s)
+# así que los índices trigram se crean sobre esas mismas expresiones; con
+# ambos lados del OR indexados la búsqueda deja de recorrer la tabla
+INDICES_BUSQUEDA = [
+    ('videos_titulo_upper_trgm', 'videos', 'UPPER(titulo::text)'),
+    ('videos_metadata_upper_trgm', 'videos', 'UPPER(metadata_json::text)'),
+]
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    # Solo existen en PostgreSQL; CONCURRENTLY evita bloquear escrituras
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nombre, tabla, expresion in INDICES_BUSQUEDA:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla} '
+            f'USING gin (({expresion}) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices_busqueda(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES_BUSQUEDA:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY no puede ejecutarse dentro de una transacción
+    atomic = False
+
+    dependencies = [
+        ('videos', '0007_indice_transcripcion_idioma'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices_busqueda),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_indices_busqueda_api'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheSemanticaResumen',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo_ia', models.CharField(max_length=100, verbose_name='Modelo IA')),
+                ('embedding', models.BinaryField(help_text='Vector float32 normalizado de la transcripción', verbose_name='Embedding')),
+                ('resumen_json', models.JSONField(help_text='Respuesta de GPT tal como la usa AnalysisService', verbose_name='Resumen')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Creación')),
+            ],
+            options={
+                'verbose_name': 'Caché Semántica de Resumen',
+                'verbose_name_plural': 'Caché Semántica de Resúmenes',
+                'db_table': 'cache_semantica_resumenes',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['modelo_ia', '-fecha_creacion'], name='cache_seman_modelo__199c59_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_cache_semantica_resumen'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logprocesamiento',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Timestamp'),
+        ),
+    ]
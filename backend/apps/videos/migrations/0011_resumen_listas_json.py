@@ -0,0 +1,73 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:15
+
+import json
+import re
+
+from django.db import migrations, models
+
+CAMPOS_LISTA = ('temas_principales', 'conclusiones_clave', 'puntos_importantes')
+
+
+# Marcadores de lista del formato anterior: "• ", "- ", "* ", "1. " o "1) "
+MARCADOR_LISTA = re.compile(r'^\s*(?:[•\-*]|\d+[.)])\s*')
+
+
+def texto_a_lista(texto):
+    # Formato anterior: una línea por elemento, con o sin marcador de lista
+    elementos = []
+    for linea in (texto or '').split('\n'):
+        linea = MARCADOR_LISTA.sub('', linea).strip()
+        if linea:
+            elementos.append(linea)
+    return elementos
+
+
+def listas_a_json(apps, schema_editor):
+    # Las columnas aún son de texto: se reescriben como JSON válido para que
+    # el cambio de tipo posterior pueda convertirlas directamente
+    ResumenEjecutivo = apps.get_model('videos', 'ResumenEjecutivo')
+    resumenes = ResumenEjecutivo.objects.only('id', *CAMPOS_LISTA)
+    for resumen in resumenes.iterator():
+        for campo in CAMPOS_LISTA:
+            lista = texto_a_lista(getattr(resumen, campo))
+            setattr(resumen, campo, json.dumps(lista, ensure_ascii=False))
+        resumen.save(update_fields=CAMPOS_LISTA)
+
+
+def json_a_listas(apps, schema_editor):
+    ResumenEjecutivo = apps.get_model('videos', 'ResumenEjecutivo')
+    resumenes = ResumenEjecutivo.objects.only('id', *CAMPOS_LISTA)
+    for resumen in resumenes.iterator():
+        for campo in CAMPOS_LISTA:
+            lista = json.loads(getattr(resumen, campo) or '[]')
+            setattr(resumen, campo, '\n'.join(f'• {elemento}' for elemento in lista))
+        resumen.save(update_fields=CAMPOS_LISTA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_timestamp_log_default'),
+    ]
+
+    # El índice trigram de temas (0002) está sobre UPPER(temas_principales::text),
+    # expresión válida también para jsonb: PostgreSQL lo reconstruye al cambiar
+    # el tipo de la columna
+    operations = [
+        migrations.RunPython(listas_a_json, json_a_listas),
+        migrations.AlterField(
+            model_name='resumenejecutivo',
+            name='conclusiones_clave',
+            field=models.JSONField(default=list, help_text='Lista de conclusiones más importantes', verbose_name='Conclusiones Clave'),
+        ),
+        migrations.AlterField(
+            model_name='resumenejecutivo',
+            name='puntos_importantes',
+            field=models.JSONField(default=list, help_text='Lista de puntos destacados del contenido', verbose_name='Puntos Importantes'),
+        ),
+        migrations.AlterField(
+            model_name='resumenejecutivo',
+            name='temas_principales',
+            field=models.JSONField(default=list, help_text='Lista de temas principales identificados', verbose_name='Temas Principales'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0011_resumen_listas_json'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='logprocesamiento',
+            name='estado',
+            field=models.CharField(choices=[('iniciado', 'Iniciado'), ('en_progreso', 'En Progreso'), ('completado', 'Completado'), ('error', 'Error'), ('cancelado', 'Cancelado'), ('omitido', 'Omitido')], max_length=20, verbose_name='Estado'),
+        ),
+    ]
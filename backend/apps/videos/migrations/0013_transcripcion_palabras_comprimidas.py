@@ -0,0 +1,61 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:28
+
+import apps.videos.models
+from django.db import migrations
+
+
+def extraer_palabras(apps, schema_editor):
+    # Las palabras salen de cada segmento a columnas paralelas comprimidas
+    Transcripcion = apps.get_model('videos', 'Transcripcion')
+    transcripciones = Transcripcion.objects.only('id', 'transcripcion_con_timestamps')
+    for transcripcion in transcripciones.iterator():
+        segmentos = transcripcion.transcripcion_con_timestamps or []
+        palabras = {'segmento': [], 'palabra': [], 'inicio': [], 'fin': [], 'probabilidad': []}
+        for indice, segmento in enumerate(segmentos):
+            for palabra in segmento.pop('palabras', None) or []:
+                palabras['segmento'].append(indice)
+                palabras['palabra'].append(palabra.get('palabra', ''))
+                palabras['inicio'].append(palabra.get('inicio', 0))
+                palabras['fin'].append(palabra.get('fin', 0))
+                palabras['probabilidad'].append(palabra.get('probabilidad', 0))
+        Transcripcion.objects.filter(pk=transcripcion.pk).update(
+            transcripcion_con_timestamps=segmentos,
+            palabras=palabras if palabras['palabra'] else None
+        )
+
+
+def reintegrar_palabras(apps, schema_editor):
+    Transcripcion = apps.get_model('videos', 'Transcripcion')
+    transcripciones = Transcripcion.objects.only('id', 'transcripcion_con_timestamps', 'palabras')
+    for transcripcion in transcripciones.iterator():
+        segmentos = transcripcion.transcripcion_con_timestamps or []
+        for segmento in segmentos:
+            segmento['palabras'] = []
+        palabras = transcripcion.palabras or {}
+        for indice, palabra, inicio, fin, probabilidad in zip(
+            palabras.get('segmento', []), palabras.get('palabra', []),
+            palabras.get('inicio', []), palabras.get('fin', []),
+            palabras.get('probabilidad', [])
+        ):
+            segmentos[indice]['palabras'].append({
+                'palabra': palabra, 'inicio': inicio, 'fin': fin, 'probabilidad': probabilidad
+            })
+        Transcripcion.objects.filter(pk=transcripcion.pk).update(
+            transcripcion_con_timestamps=segmentos
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0012_log_estado_omitido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transcripcion',
+            name='palabras',
+            field=apps.videos.models.JSONComprimidoField(blank=True, help_text='Palabras con marcas de tiempo en columnas paralelas (comprimido)', null=True, verbose_name='Palabras'),
+        ),
+        migrations.RunPython(extraer_palabras, reintegrar_palabras),
+    ]
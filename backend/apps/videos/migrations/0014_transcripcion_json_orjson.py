@@ -0,0 +1,19 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:31
+
+import apps.videos.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0013_transcripcion_palabras_comprimidas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transcripcion',
+            name='transcripcion_con_timestamps',
+            field=apps.videos.models.JSONOrjsonField(help_text='Transcripción segmentada con marcas de tiempo', verbose_name='Transcripción con Timestamps'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.25 on 2026-10-15 23:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0014_transcripcion_json_orjson'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='segmento',
+            name='generado_por_ia',
+            field=models.BooleanField(default=False, help_text='Segmento creado por el análisis IA; un reanálisis lo reemplaza', verbose_name='Generado por IA'),
+        ),
+    ]
@@ -1,6 +1,143 @@
-from django.db import models
+from django.db import models, router, connections
 from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator, FileExtensionValidator
+from django.contrib.postgres.search import SearchVectorField
+from django.db.backends.postgresql.psycopg_any import Jsonb
+from django.db.models.fields.json import KeyTransform
+from functools import cached_property, lru_cache
+import zlib
+import orjson
+
+
+# Los listados formatean muchas veces los mismos segundos (duraciones y
+# timestamps de segmentos), así que el texto resultante se memoriza
+@lru_cache(maxsize=4096)
+def formatear_hhmmss(segundos):
+    """Formatea segundos como HH:MM:SS"""
+    horas, resto = divmod(segundos, 3600)
+    minutos, segundos = divmod(resto, 60)
+    return f"{horas:02d}:{minutos:02d}:{segundos:02d}"
+
+
+@lru_cache(maxsize=4096)
+def formatear_mmss(segundos):
+    """Formatea segundos como MM:SS"""
+    minutos, segundos = divmod(segundos, 60)
+    return f"{minutos:02d}:{segundos:02d}"
+
+
+class ConteoPalabrasField(models.IntegerField):
+    """
+    Conteo de palabras que calcula un trigger de PostgreSQL (migración
+    0006); el valor se lee de vuelta con RETURNING al insertar y
+    ResumenEjecutivo.save() lo refresca tras un UPDATE
+    """
+    db_returning = True
+
+
+def _orjson_dumps(valor):
+    return orjson.dumps(valor).decode()
+
+
+class JSONOrjsonField(models.JSONField):
+    """
+    JSONField que serializa con orjson al guardar en PostgreSQL y al leer;
+    para columnas grandes de datos simples (listas de dicts con números y
+    textos), que orjson procesa varias veces más rápido que json
+    """
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        # SQLite devuelve las claves extraídas con su tipo SQL
+        if isinstance(expression, KeyTransform) and not isinstance(value, str):
+            return value
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
+    
+    def get_db_prep_save(self, value, connection):
+        if value is None or hasattr(value, 'as_sql') or connection.vendor != 'postgresql':
+            return super().get_db_prep_save(value, connection)
+        return Jsonb(value, dumps=_orjson_dumps)
+
+
+class JSONComprimidoField(models.BinaryField):
+    """
+    JSON serializado con orjson y comprimido con zlib; pensado para datos
+    voluminosos que solo se leen enteros (p. ej. las palabras de Whisper)
+    """
+    
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        return zlib.compress(orjson.dumps(value), 6)
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return orjson.loads(zlib.decompress(bytes(value)))
+    
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return orjson.loads(zlib.decompress(bytes(value)))
+        if isinstance(value, str):
+            # Formato de value_to_string (dumpdata / loaddata)
+            return orjson.loads(value)
+        return value
+    
+    def value_to_string(self, obj):
+        return orjson.dumps(self.value_from_object(obj)).decode()
+
+
+class VideoQuerySet(models.QuerySet):
+    """QuerySet de videos con las cargas de relaciones más usadas"""
+    
+    def con_detalle_completo(self):
+        """
+        Carga en un número fijo de consultas todo lo que serializa
+        VideoCompleteSerializer: usuario, transcripción y resumen por JOIN;
+        etiquetas y segmentos con un prefetch cada uno
+        
+        Los segmentos prefetcheados quedan enlazados a su video, así que
+        leer segmento.video no dispara consultas.
+        """
+        return self.select_related(
+            'usuario', 'transcripcion', 'resumen_ejecutivo'
+        ).prefetch_related(
+            'etiquetas',
+            models.Prefetch(
+                'segmentos',
+                queryset=Segmento.objects.order_by('orden').only(
+                    'id', 'video_id', 'titulo', 'descripcion',
+                    'timestamp_inicio_seg', 'timestamp_fin_seg', 'duracion_seg',
+                    'orden', 'relevancia_score', 'tipo_contenido', 'miniatura_url'
+                )
+            )
+        )
+    
+    def con_estado_procesado(self):
+        """
+        Anota tiene_transcripcion y tiene_resumen con subconsultas EXISTS,
+        sin traer las filas relacionadas
+        """
+        return self.annotate(
+            tiene_transcripcion=models.Exists(
+                Transcripcion.objects.filter(video=models.OuterRef('pk'))
+            ),
+            tiene_resumen=models.Exists(
+                ResumenEjecutivo.objects.filter(video=models.OuterRef('pk'))
+            )
+        )
+    
+    def pendientes_de_transcripcion(self):
+        """Videos que todavía no tienen transcripción"""
+        return self.filter(
+            ~models.Exists(Transcripcion.objects.filter(video=models.OuterRef('pk')))
+        )
+
 
 class Video(models.Model):
     """
@@ -96,6 +233,14 @@ class Video(models.Model):
         blank=True,
         help_text='Información adicional en formato JSON'
     )
+    # Título, usuario y email del propietario; lo mantiene un trigger de
+    # PostgreSQL (migración 0004) para la búsqueda del admin
+    vector_busqueda = SearchVectorField(
+        null=True,
+        editable=False
+    )
+    
+    objects = VideoQuerySet.as_manager()
     
     class Meta:
         db_table = 'videos'
@@ -105,20 +250,17 @@ class Video(models.Model):
         indexes = [
             models.Index(fields=['usuario', 'estado']),
             models.Index(fields=['fecha_subida']),
+            models.Index(fields=['estado', 'fecha_subida']),
+            models.Index(fields=['fuente']),
         ]
     
     def __str__(self):
         return f"{self.titulo} - {self.usuario.username}"
     
-    @property
+    @cached_property
     def duracion_formateada(self):
         """Retorna la duración en formato HH:MM:SS"""
-        if self.duracion_segundos:
-            horas = self.duracion_segundos // 3600
-            minutos = (self.duracion_segundos % 3600) // 60
-            segundos = self.duracion_segundos % 60
-            return f"{horas:02d}:{minutos:02d}:{segundos:02d}"
-        return "00:00:00"
+        return formatear_hhmmss(self.duracion_segundos or 0)
 
 
 class Transcripcion(models.Model):
@@ -147,10 +289,16 @@ class Transcripcion(models.Model):
         blank=True,
         help_text='Porcentaje de precisión de la transcripción'
     )
-    transcripcion_con_timestamps = models.JSONField(
+    transcripcion_con_timestamps = JSONOrjsonField(
         'Transcripción con Timestamps',
         help_text='Transcripción segmentada con marcas de tiempo'
     )
+    palabras = JSONComprimidoField(
+        'Palabras',
+        null=True,
+        blank=True,
+        help_text='Palabras con marcas de tiempo en columnas paralelas (comprimido)'
+    )
     fecha_generacion = models.DateTimeField(
         'Fecha de Generación',
         auto_now_add=True
@@ -166,6 +314,9 @@ class Transcripcion(models.Model):
         verbose_name = 'Transcripción'
         verbose_name_plural = 'Transcripciones'
         ordering = ['-fecha_generacion']
+        indexes = [
+            models.Index(fields=['idioma_detectado']),
+        ]
     
     def __str__(self):
         return f"Transcripción de: {self.video.titulo}"
@@ -185,19 +336,22 @@ class ResumenEjecutivo(models.Model):
         'Resumen Completo',
         help_text='Resumen ejecutivo del contenido del video'
     )
-    temas_principales = models.TextField(
+    temas_principales = models.JSONField(
         'Temas Principales',
+        default=list,
         help_text='Lista de temas principales identificados'
     )
-    conclusiones_clave = models.TextField(
+    conclusiones_clave = models.JSONField(
         'Conclusiones Clave',
-        help_text='Conclusiones más importantes'
+        default=list,
+        help_text='Lista de conclusiones más importantes'
     )
-    puntos_importantes = models.TextField(
+    puntos_importantes = models.JSONField(
         'Puntos Importantes',
-        help_text='Puntos destacados del contenido'
+        default=list,
+        help_text='Lista de puntos destacados del contenido'
     )
-    cantidad_palabras = models.IntegerField(
+    cantidad_palabras = ConteoPalabrasField(
         'Cantidad de Palabras',
         validators=[MinValueValidator(0)],
         null=True,
@@ -221,6 +375,28 @@ class ResumenEjecutivo(models.Model):
     
     def __str__(self):
         return f"Resumen de: {self.video.titulo}"
+    
+    def save(self, *args, **kwargs):
+        """
+        Mantener cantidad_palabras al día: en PostgreSQL la escribe el
+        trigger (RETURNING solo la devuelve en el INSERT, así que tras un
+        UPDATE se vuelve a leer); en otros motores se calcula aquí
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'resumen_completo' not in update_fields:
+            return super().save(*args, **kwargs)
+        
+        db = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        es_postgresql = connections[db].vendor == 'postgresql'
+        if not es_postgresql:
+            self.cantidad_palabras = len(self.resumen_completo.split())
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'cantidad_palabras'}
+        
+        actualizacion = not self._state.adding
+        super().save(*args, **kwargs)
+        if es_postgresql and actualizacion:
+            self.refresh_from_db(using=db, fields=['cantidad_palabras'])
 
 
 class Segmento(models.Model):
@@ -298,6 +474,11 @@ class Segmento(models.Model):
         null=True,
         blank=True
     )
+    generado_por_ia = models.BooleanField(
+        'Generado por IA',
+        default=False,
+        help_text='Segmento creado por el análisis IA; un reanálisis lo reemplaza'
+    )
     
     class Meta:
         db_table = 'segmentos'
@@ -307,24 +488,23 @@ class Segmento(models.Model):
         indexes = [
             models.Index(fields=['video', 'orden']),
             models.Index(fields=['relevancia_score']),
+            models.Index(fields=['video', '-relevancia_score']),
+            models.Index(fields=['tipo_contenido']),
+            models.Index(fields=['fecha_creacion']),
         ]
     
     def __str__(self):
         return f"{self.titulo} ({self.timestamp_inicio_seg}s - {self.timestamp_fin_seg}s)"
     
-    @property
+    @cached_property
     def timestamp_inicio_formateado(self):
         """Retorna el timestamp de inicio en formato MM:SS"""
-        minutos = self.timestamp_inicio_seg // 60
-        segundos = self.timestamp_inicio_seg % 60
-        return f"{minutos:02d}:{segundos:02d}"
+        return formatear_mmss(self.timestamp_inicio_seg)
     
-    @property
+    @cached_property
     def timestamp_fin_formateado(self):
         """Retorna el timestamp de fin en formato MM:SS"""
-        minutos = self.timestamp_fin_seg // 60
-        segundos = self.timestamp_fin_seg % 60
-        return f"{minutos:02d}:{segundos:02d}"
+        return formatear_mmss(self.timestamp_fin_seg)
 
 
 class EtiquetaVideo(models.Model):
@@ -407,6 +587,7 @@ class LogProcesamiento(models.Model):
         ('completado', 'Completado'),
         ('error', 'Error'),
         ('cancelado', 'Cancelado'),
+        ('omitido', 'Omitido'),
     ]
     
     video = models.ForeignKey(
@@ -435,9 +616,12 @@ class LogProcesamiento(models.Model):
         blank=True,
         help_text='Información detallada del error si existe'
     )
+    # default en lugar de auto_now_add: los servicios insertan sus logs por
+    # lotes y cada uno debe conservar el momento en que se registró
     timestamp = models.DateTimeField(
         'Timestamp',
-        auto_now_add=True
+        default=timezone.now,
+        editable=False
     )
     duracion_ms = models.IntegerField(
         'Duración (ms)',
@@ -455,6 +639,8 @@ class LogProcesamiento(models.Model):
         indexes = [
             models.Index(fields=['video', 'timestamp']),
             models.Index(fields=['estado']),
+            models.Index(fields=['etapa', 'estado']),
+            models.Index(fields=['timestamp']),
         ]
     
     def __str__(self):
@@ -496,4 +682,39 @@ class ConfiguracionSistema(models.Model):
         ordering = ['parametro']
     
     def __str__(self):
-        return f"{self.parametro}: {self.valor[:50]}"
\ No newline at end of file
+        return f"{self.parametro}: {self.valor[:50]}"
+
+class CacheSemanticaResumen(models.Model):
+    """
+    Resúmenes ejecutivos generados por GPT junto con el embedding de la
+    transcripción que los originó, para reutilizarlos en clases casi
+    idénticas (ver services/semantic_cache.py)
+    """
+    modelo_ia = models.CharField(
+        'Modelo IA',
+        max_length=100
+    )
+    embedding = models.BinaryField(
+        'Embedding',
+        help_text='Vector float32 normalizado de la transcripción'
+    )
+    resumen_json = models.JSONField(
+        'Resumen',
+        help_text='Respuesta de GPT tal como la usa AnalysisService'
+    )
+    fecha_creacion = models.DateTimeField(
+        'Fecha de Creación',
+        auto_now_add=True
+    )
+    
+    class Meta:
+        db_table = 'cache_semantica_resumenes'
+        verbose_name = 'Caché Semántica de Resumen'
+        verbose_name_plural = 'Caché Semántica de Resúmenes'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['modelo_ia', '-fecha_creacion']),
+        ]
+    
+    def __str__(self):
+        return f"{self.modelo_ia} ({self.fecha_creacion})"
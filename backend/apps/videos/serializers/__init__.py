@@ -7,6 +7,7 @@ from .video_serializers import (
     SegmentoListSerializer,
     SegmentoDetailSerializer,
     SegmentoCreateSerializer,
+    SegmentoBulkCreateSerializer,
     TranscripcionSerializer,
     ResumenEjecutivoSerializer,
     EtiquetaVideoSerializer,
@@ -22,6 +23,7 @@ __all__ = [
     'SegmentoListSerializer',
     'SegmentoDetailSerializer',
     'SegmentoCreateSerializer',
+    'SegmentoBulkCreateSerializer',
     'TranscripcionSerializer',
     'ResumenEjecutivoSerializer',
     'EtiquetaVideoSerializer',
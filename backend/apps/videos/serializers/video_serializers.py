@@ -3,10 +3,26 @@ from apps.videos.models import (
     Video, Segmento, Transcripcion, ResumenEjecutivo,
     EtiquetaVideo, EtiquetaSegmento
 )
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 
 Usuario = get_user_model()
 
+# Mensajes de error de las opciones, calculados una sola vez
+MENSAJE_FUENTE_INVALIDA = (
+    f"Fuente inválida. Opciones: {', '.join(choice[0] for choice in Video.FUENTE_CHOICES)}"
+)
+MENSAJE_ESTADO_INVALIDO = (
+    f"Estado inválido. Opciones: {', '.join(choice[0] for choice in Video.ESTADO_CHOICES)}"
+)
+
+# Campos de solo lectura compartidos por los serializers de segmento
+CAMPOS_SOLO_LECTURA_SEGMENTO = (
+    'id', 'duracion_seg', 'timestamp_inicio_formateado',
+    'timestamp_fin_formateado'
+)
+
 
 class UsuarioSimpleSerializer(serializers.ModelSerializer):
     """Serializer simple para mostrar info básica del usuario"""
@@ -14,6 +30,16 @@ class UsuarioSimpleSerializer(serializers.ModelSerializer):
         model = Usuario
         fields = ('id', 'username', 'nombre_completo', 'email')
         read_only_fields = fields
+    
+    def to_representation(self, instance):
+        # Se anida en cada fila de los listados; construir el dict
+        # directamente evita recorrer los campos de DRF por fila
+        return {
+            'id': instance.id,
+            'username': instance.username,
+            'nombre_completo': instance.nombre_completo,
+            'email': instance.email,
+        }
 
 
 class EtiquetaVideoSerializer(serializers.ModelSerializer):
@@ -25,12 +51,17 @@ class EtiquetaVideoSerializer(serializers.ModelSerializer):
 
 
 class VideoListSerializer(serializers.ModelSerializer):
-    """Serializer para listar videos (vista resumida)"""
+    """
+    Serializer para listar videos (vista resumida)
+    
+    cantidad_segmentos, tiene_transcripcion y tiene_resumen son
+    anotaciones del queryset (ver VideoViewSet.get_queryset).
+    """
     usuario = UsuarioSimpleSerializer(read_only=True)
     duracion_formateada = serializers.CharField(read_only=True)
-    cantidad_segmentos = serializers.SerializerMethodField()
-    tiene_transcripcion = serializers.SerializerMethodField()
-    tiene_resumen = serializers.SerializerMethodField()
+    cantidad_segmentos = serializers.IntegerField(read_only=True)
+    tiene_transcripcion = serializers.BooleanField(read_only=True)
+    tiene_resumen = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = Video
@@ -42,36 +73,44 @@ class VideoListSerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
     
-    def get_cantidad_segmentos(self, obj):
-        """Retorna la cantidad de segmentos del video"""
-        return obj.segmentos.count()
-    
-    def get_tiene_transcripcion(self, obj):
-        """Verifica si el video tiene transcripción"""
-        return hasattr(obj, 'transcripcion')
-    
-    def get_tiene_resumen(self, obj):
-        """Verifica si el video tiene resumen ejecutivo"""
-        return hasattr(obj, 'resumen_ejecutivo')
+    def to_representation(self, instance):
+        # Endpoint de listado muy transitado: se arma el dict directamente
+        # en lugar de recorrer los campos de DRF por fila; fecha_subida y
+        # miniatura_url usan sus campos para respetar formato y URL absoluta
+        fields = self.fields
+        miniatura_url = instance.miniatura_url
+        return {
+            'id': instance.id,
+            'titulo': instance.titulo,
+            'usuario': fields['usuario'].to_representation(instance.usuario),
+            'fuente': instance.fuente,
+            'estado': instance.estado,
+            'duracion_segundos': instance.duracion_segundos,
+            'duracion_formateada': instance.duracion_formateada,
+            'fecha_subida': fields['fecha_subida'].to_representation(instance.fecha_subida),
+            'miniatura_url': (
+                fields['miniatura_url'].to_representation(miniatura_url)
+                if miniatura_url else None
+            ),
+            'cantidad_segmentos': instance.cantidad_segmentos,
+            'tiene_transcripcion': bool(instance.tiene_transcripcion),
+            'tiene_resumen': bool(instance.tiene_resumen),
+        }
 
 
 class VideoCreateSerializer(serializers.ModelSerializer):
     """Serializer para crear videos"""
+    fuente = serializers.ChoiceField(
+        choices=Video.FUENTE_CHOICES,
+        error_messages={'invalid_choice': MENSAJE_FUENTE_INVALIDA}
+    )
+    
     class Meta:
         model = Video
         fields = (
             'titulo', 'url_original', 'fuente', 'ruta_video_completo'
         )
     
-    def validate_fuente(self, value):
-        """Validar que la fuente sea válida"""
-        fuentes_validas = [choice[0] for choice in Video.FUENTE_CHOICES]
-        if value not in fuentes_validas:
-            raise serializers.ValidationError(
-                f"Fuente inválida. Opciones: {', '.join(fuentes_validas)}"
-            )
-        return value
-    
     def validate(self, attrs):
         """Validar que se proporcione URL o archivo"""
         url_original = attrs.get('url_original')
@@ -114,19 +153,16 @@ class VideoDetailSerializer(serializers.ModelSerializer):
 
 class VideoUpdateSerializer(serializers.ModelSerializer):
     """Serializer para actualizar videos"""
+    estado = serializers.ChoiceField(
+        choices=Video.ESTADO_CHOICES,
+        required=False,
+        error_messages={'invalid_choice': MENSAJE_ESTADO_INVALIDO}
+    )
+    
     class Meta:
         model = Video
         fields = ('titulo', 'estado')
     
-    def validate_estado(self, value):
-        """Validar que el estado sea válido"""
-        estados_validos = [choice[0] for choice in Video.ESTADO_CHOICES]
-        if value not in estados_validos:
-            raise serializers.ValidationError(
-                f"Estado inválido. Opciones: {', '.join(estados_validos)}"
-            )
-        return value
-    
 class EtiquetaSegmentoSerializer(serializers.ModelSerializer):
     """Serializer para etiquetas de segmento"""
     class Meta:
@@ -150,10 +186,7 @@ class SegmentoListSerializer(serializers.ModelSerializer):
             'duracion_seg', 'orden', 'relevancia_score', 'tipo_contenido',
             'miniatura_url'
         )
-        read_only_fields = (
-            'id', 'duracion_seg', 'timestamp_inicio_formateado',
-            'timestamp_fin_formateado'
-        )
+        read_only_fields = CAMPOS_SOLO_LECTURA_SEGMENTO
 
 
 class SegmentoDetailSerializer(serializers.ModelSerializer):
@@ -173,10 +206,7 @@ class SegmentoDetailSerializer(serializers.ModelSerializer):
             'relevancia_score', 'tipo_contenido', 'fecha_creacion',
             'miniatura_url', 'etiquetas'
         )
-        read_only_fields = (
-            'id', 'duracion_seg', 'timestamp_inicio_formateado',
-            'timestamp_fin_formateado', 'fecha_creacion'
-        )
+        read_only_fields = CAMPOS_SOLO_LECTURA_SEGMENTO + ('fecha_creacion',)
     
     def validate(self, attrs):
         """Validar que el timestamp de fin sea mayor al de inicio"""
@@ -195,8 +225,29 @@ class SegmentoDetailSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class SegmentoBulkCreateSerializer(serializers.ListSerializer):
+    """
+    Crear una lista de segmentos con INSERTs por lotes
+    
+    bulk_create no llama a save() ni emite post_save; quien lo use debe
+    invalidar la caché del video.
+    """
+    def create(self, validated_data):
+        segmentos = [Segmento(**attrs) for attrs in validated_data]
+        with transaction.atomic():
+            return Segmento.objects.bulk_create(
+                segmentos,
+                batch_size=settings.SEGMENTO_BULK_BATCH_SIZE
+            )
+
+
 class SegmentoCreateSerializer(serializers.ModelSerializer):
-    """Serializer para crear segmentos"""
+    """
+    Serializer para crear segmentos
+    
+    Si el contexto trae 'video' (carga masiva de un video), el campo se
+    toma de ahí en lugar de buscar el video por cada segmento.
+    """
     class Meta:
         model = Segmento
         fields = (
@@ -204,6 +255,14 @@ class SegmentoCreateSerializer(serializers.ModelSerializer):
             'timestamp_fin_seg', 'orden', 'relevancia_score',
             'tipo_contenido'
         )
+        list_serializer_class = SegmentoBulkCreateSerializer
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        video = self.context.get('video')
+        if video is not None:
+            fields['video'] = serializers.HiddenField(default=video)
+        return fields
     
     def validate(self, attrs):
         """Validaciones de segmento"""
@@ -259,18 +318,13 @@ class ResumenEjecutivoSerializer(serializers.ModelSerializer):
     
     def validate_resumen_completo(self, value):
         """Validar longitud mínima del resumen"""
-        if len(value.split()) < 10:
+        # Basta con partir hasta la décima palabra, no el texto completo
+        if len(value.split(None, 9)) < 10:
             raise serializers.ValidationError(
                 'El resumen debe tener al menos 10 palabras.'
             )
         return value
     
-    def create(self, validated_data):
-        """Calcular cantidad de palabras al crear"""
-        resumen = validated_data.get('resumen_completo', '')
-        validated_data['cantidad_palabras'] = len(resumen.split())
-        return super().create(validated_data)
-    
 class VideoCompleteSerializer(serializers.ModelSerializer):
     """Serializer completo con todas las relaciones"""
     usuario = UsuarioSimpleSerializer(read_only=True)
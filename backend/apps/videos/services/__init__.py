@@ -17,6 +17,7 @@ from .file_cleaner import (
     FileCleaner,
     clean_temp_files
 )
+from .log_buffer import LogBuffer
 
 from .transcription_service import (
     TranscriptionService,
@@ -48,6 +49,7 @@ __all__ = [
     'generate_thumbnail',
     'FileCleaner',
     'clean_temp_files',
+    'LogBuffer',
     'TranscriptionService',
     'TranscriptionError',
     'transcribe_audio',
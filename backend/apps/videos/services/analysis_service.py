@@ -1,13 +1,25 @@
-from openai import OpenAI
 from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+import heapq
 from django.conf import settings
-from apps.videos.models import Video, ResumenEjecutivo, Transcripcion, LogProcesamiento
+from django.db import connection, transaction
+from apps.videos.models import (
+    Video, ResumenEjecutivo, Segmento, formatear_mmss
+)
+from apps.videos.cache import invalidar_video_completo
+from apps.videos.services import llm_cache
+from apps.videos.services.openai_cliente import obtener_cliente
+from apps.videos.services.semantic_cache import SemanticCache
+from apps.videos.services.log_buffer import LogBuffer
 import logging
 import json
-import re
 
 logger = logging.getLogger(__name__)
 
+# Caracteres de transcripción enviados en cada prompt
+MAX_CARACTERES_RESUMEN = 8000
+MAX_CARACTERES_SEGMENTOS = 10000
+
 
 class AnalysisError(Exception):
     """Excepción personalizada para errores de análisis"""
@@ -21,24 +33,47 @@ class AnalysisService:
     
     def __init__(self, video: Video):
         self.video = video
+        self._logs = LogBuffer()
         
         # Validar API key
         if not settings.OPENAI_API_KEY:
             raise AnalysisError("OPENAI_API_KEY no configurada")
         
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = obtener_cliente(settings.OPENAI_API_KEY)
         self.model = settings.GPT_MODEL
+        
+        # Relaciones uno a uno leídas una sola vez; analyze_video las trae
+        # ya cargadas con select_related
+        self._transcripcion = getattr(video, 'transcripcion', None)
+        self._resumen = getattr(video, 'resumen_ejecutivo', None)
     
-    def analyze(self) -> Dict:
+    def analyze(self, forzar: bool = False) -> Dict:
         """
         Analizar transcripción del video y generar resumen ejecutivo
         
+        Si el video ya tiene resumen y segmentos generados con el modelo
+        actual (p. ej. en un reintento de la tarea), se devuelven sin volver
+        a llamar a OpenAI salvo que se indique `forzar`; si solo tiene el
+        resumen, se regeneran únicamente los segmentos.
+        
+        Args:
+            forzar: Repetir el análisis aunque ya exista
+        
         Returns:
             Dict: Análisis completo del video
         
         Raises:
             AnalysisError: Si hay error en el análisis
         """
+        resumen_existente = None
+        if not forzar:
+            analisis_existente = self._get_existing_analysis()
+            if analisis_existente is not None:
+                if analisis_existente['segmentos_importantes']:
+                    logger.info(f'Video {self.video.id} ya analizado con {self.model}')
+                    return analisis_existente
+                resumen_existente = analisis_existente['resumen']
+        
         try:
             self._log_progress('analisis_ia', 'iniciado', 'Iniciando análisis con IA')
             
@@ -49,11 +84,20 @@ class AnalysisService:
             
             logger.info(f'Analizando video {self.video.id} con {self.model}')
             
-            # Generar resumen ejecutivo
-            resumen_data = self._generate_executive_summary(transcripcion)
-            
-            # Identificar segmentos importantes
-            segmentos_importantes = self._identify_important_segments(transcripcion)
+            if resumen_existente is not None:
+                # El resumen ya está guardado: solo faltan los segmentos
+                resumen_data = resumen_existente
+                segmentos_importantes = self._identify_important_segments(transcripcion)
+            else:
+                # Las dos llamadas a GPT no dependen entre sí: el resumen
+                # ejecutivo (o el de una clase casi idéntica) se pide en un
+                # hilo mientras se identifican los segmentos importantes
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    futuro_resumen = executor.submit(
+                        self._en_hilo, self._get_or_generate_summary, transcripcion
+                    )
+                    segmentos_importantes = self._identify_important_segments(transcripcion)
+                    resumen_data = futuro_resumen.result()
             
             # Combinar resultados
             analysis_result = {
@@ -61,8 +105,12 @@ class AnalysisService:
                 'segmentos_importantes': segmentos_importantes
             }
             
-            # Guardar en base de datos
-            self._save_analysis(resumen_data)
+            # Guardar resumen y segmentos juntos: si algo falla no queda un
+            # análisis a medias que obligue a repetir las llamadas a GPT
+            with transaction.atomic():
+                if resumen_existente is None:
+                    self._save_analysis(resumen_data)
+                self._save_segments(segmentos_importantes)
             
             self._log_progress(
                 'analisis_ia',
@@ -79,15 +127,23 @@ class AnalysisService:
             self._log_progress('analisis_ia', 'error', error_msg, str(e))
             logger.error(error_msg)
             raise AnalysisError(error_msg)
+        
+        finally:
+            self.flush_logs()
+    
+    @staticmethod
+    def _en_hilo(funcion, *args):
+        """Ejecutar `funcion` en un hilo y cerrar la conexión a BD que abra"""
+        try:
+            return funcion(*args)
+        finally:
+            connection.close()
     
     def _get_transcription(self) -> Optional[str]:
         """Obtener transcripción del video"""
-        try:
-            if hasattr(self.video, 'transcripcion'):
-                return self.video.transcripcion.contenido_completo
-            return None
-        except Transcripcion.DoesNotExist:
-            return None
+        if self._transcripcion is not None:
+            return self._transcripcion.contenido_completo
+        return None
     
     def _generate_executive_summary(self, transcription: str) -> Dict:
         """
@@ -123,24 +179,15 @@ Enfócate en:
             user_prompt = f"""Analiza la siguiente transcripción de una clase universitaria y genera un resumen ejecutivo:
 
 TRANSCRIPCIÓN:
-{transcription[:8000]}
+{self._canonicalizar(transcription, MAX_CARACTERES_RESUMEN)}
 
 Genera el resumen en formato JSON."""
 
             # Llamar a GPT
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=settings.GPT_TEMPERATURE,
-                max_tokens=settings.GPT_MAX_TOKENS,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parsear respuesta
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(self._chat_json(
+                'gpt:sum:', system_prompt, user_prompt,
+                max_tokens=settings.GPT_SUMMARY_MAX_TOKENS
+            ))
             
             logger.info('Resumen ejecutivo generado')
             
@@ -150,6 +197,33 @@ Genera el resumen en formato JSON."""
             logger.error(f'Error al generar resumen: {str(e)}')
             raise AnalysisError(f"Error al generar resumen: {str(e)}")
     
+    def _get_or_generate_summary(self, transcription: str) -> Dict:
+        """
+        Resumen ejecutivo, consultando antes la caché semántica si está
+        habilitada; un fallo de la caché no impide generar el resumen
+        """
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return self._generate_executive_summary(transcription)
+        
+        cache_semantica = SemanticCache(self.client, self.model)
+        try:
+            vector = cache_semantica.embedding(
+                self._canonicalizar(transcription, MAX_CARACTERES_RESUMEN)
+            )
+            resumen = cache_semantica.buscar(vector)
+            if resumen is not None:
+                return resumen
+        except Exception as e:
+            logger.warning(f'Caché semántica no disponible: {str(e)}')
+            return self._generate_executive_summary(transcription)
+        
+        resumen = self._generate_executive_summary(transcription)
+        try:
+            cache_semantica.guardar(vector, resumen)
+        except Exception as e:
+            logger.warning(f'No se pudo guardar en la caché semántica: {str(e)}')
+        return resumen
+    
     def _identify_important_segments(self, transcription: str) -> List[Dict]:
         """
         Identificar segmentos importantes con timestamps
@@ -164,15 +238,32 @@ Genera el resumen en formato JSON."""
             logger.info('Identificando segmentos importantes...')
             
             # Obtener transcripción con timestamps
-            transcripcion_obj = self.video.transcripcion
-            segmentos_con_timestamps = transcripcion_obj.transcripcion_con_timestamps
+            segmentos_con_timestamps = self._transcripcion.transcripcion_con_timestamps
             
             if not segmentos_con_timestamps:
                 logger.warning('No hay segmentos con timestamps')
                 return []
             
+            # En clips muy cortos no hay segmentos que destacar: se evita
+            # la llamada a GPT
+            duracion_total = (
+                max(s.get('fin', 0) for s in segmentos_con_timestamps)
+                - min(s.get('inicio', 0) for s in segmentos_con_timestamps)
+            )
+            if (len(segmentos_con_timestamps) < settings.ANALYSIS_MIN_TIMESTAMPS
+                    or duracion_total < settings.ANALYSIS_MIN_DURATION_SECS):
+                self._log_progress(
+                    'analisis_ia',
+                    'omitido',
+                    f'Identificación de segmentos omitida: {len(segmentos_con_timestamps)} '
+                    f'fragmentos, {int(duracion_total)} s de transcripción'
+                )
+                return []
+            
             # Crear texto con referencias de tiempo para GPT
-            texto_con_tiempos = self._format_transcription_with_times(segmentos_con_timestamps)
+            texto_con_tiempos = self._format_transcription_with_times(
+                segmentos_con_timestamps, MAX_CARACTERES_SEGMENTOS
+            )
             
             # Prompt para identificar segmentos
             system_prompt = """Eres un experto en identificar los momentos más importantes de clases universitarias.
@@ -208,24 +299,16 @@ Identifica entre 3 y 10 segmentos, priorizando calidad sobre cantidad."""
             
             user_prompt = f"""Analiza esta transcripción con timestamps e identifica los {min_segs}-{max_segs} segmentos MÁS IMPORTANTES:
 
-{texto_con_tiempos[:10000]}
+{texto_con_tiempos}
 
 Responde en formato JSON."""
 
             # Llamar a GPT
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=settings.GPT_TEMPERATURE,
-                max_tokens=settings.GPT_MAX_TOKENS,
-                response_format={"type": "json_object"}
-            )
-            
-            # Parsear respuesta
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(self._chat_json(
+                'gpt:seg:', system_prompt, user_prompt,
+                max_tokens=settings.GPT_SEGMENTS_MAX_TOKENS,
+                model=settings.GPT_SEGMENTS_MODEL
+            ))
             segmentos = result.get('segmentos', [])
             
             # Validar y limpiar segmentos
@@ -239,28 +322,105 @@ Responde en formato JSON."""
             logger.error(f'Error al identificar segmentos: {str(e)}')
             return []
     
-    def _format_transcription_with_times(self, segments: List[Dict]) -> str:
+    def _chat_json(self, prefijo: str, system_prompt: str, user_prompt: str,
+                   max_tokens: int = None, model: str = None) -> str:
+        """
+        Llamar a GPT pidiendo una respuesta JSON y devolver su contenido
+        
+        `max_tokens` y `model` permiten ajustar cada llamada; por defecto se
+        usan GPT_MAX_TOKENS y el modelo del servicio.
+        
+        Con temperatura 0 la respuesta se cachea por el hash exacto de la
+        petición, así que reprocesar la misma transcripción no vuelve a
+        llamar a la API.
+        
+        La respuesta se recibe en streaming: la conexión no queda inactiva
+        mientras se genera y una respuesta cortada por `max_tokens` se
+        detecta y no se guarda en caché.
+        """
+        parametros = {
+            'model': model or self.model,
+            'messages': [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            'temperature': settings.GPT_TEMPERATURE,
+            'max_tokens': max_tokens or settings.GPT_MAX_TOKENS,
+            'response_format': {"type": "json_object"}
+        }
+        
+        usar_cache = settings.GPT_TEMPERATURE == 0
+        if usar_cache:
+            clave = llm_cache.clave_llm(prefijo, **parametros)
+            contenido = llm_cache.obtener_respuesta(clave)
+            if contenido is not None:
+                logger.info(f'Respuesta de GPT obtenida de caché ({prefijo})')
+                return contenido
+        
+        partes = []
+        finish_reason = None
+        for chunk in self.client.chat.completions.create(**parametros, stream=True):
+            if not chunk.choices:
+                continue
+            partes.append(chunk.choices[0].delta.content or '')
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+        contenido = ''.join(partes)
+        
+        if finish_reason == 'length':
+            logger.warning(f'Respuesta de GPT cortada por max_tokens ({prefijo})')
+        elif usar_cache:
+            llm_cache.guardar_respuesta(clave, contenido, settings.LLM_CACHE_TTL)
+        
+        return contenido
+    
+    @staticmethod
+    def _canonicalizar(texto: str, limite: int) -> str:
+        """
+        Normalizar espacios y recortar en el último fin de oración antes de
+        `limite`, para que la misma transcripción produzca siempre el mismo
+        prompt (y la misma clave de caché)
+        """
+        texto = ' '.join(texto.split())
+        if len(texto) <= limite:
+            return texto
+        
+        recorte = texto[:limite]
+        fin_oracion = recorte.rfind('. ')
+        if fin_oracion > 0:
+            return recorte[:fin_oracion + 1]
+        return recorte
+    
+    def _format_transcription_with_times(self, segments: List[Dict], limite: int = None) -> str:
         """
         Formatear transcripción con timestamps para GPT
         
+        Con `limite`, el texto se corta en la última línea completa.
+        
         Args:
             segments: Lista de segmentos con timestamps
+            limite: Máximo de caracteres del texto resultante
         
         Returns:
             str: Texto formateado
         """
         formatted_lines = []
+        # Sin salto de línea antes de la primera línea
+        longitud = -1
+        
+        # Con miles de segmentos el bucle pesa: split/join en lugar de una
+        # expresión regular y formatear_mmss (divmod con lru_cache) en local
+        formatear = formatear_mmss
         
         for seg in segments:
-            inicio = seg.get('inicio', 0)
-            texto = seg.get('texto', '').strip()
+            texto = ' '.join(seg.get('texto', '').split())
+            linea = f"[{formatear(int(seg.get('inicio', 0)))}] {texto}"
             
-            # Formatear tiempo en MM:SS
-            minutos = int(inicio // 60)
-            segundos = int(inicio % 60)
-            tiempo_fmt = f"[{minutos:02d}:{segundos:02d}]"
+            # +1 por el salto de línea que une las líneas
+            longitud += len(linea) + 1
+            if limite is not None and longitud > limite:
+                break
             
-            formatted_lines.append(f"{tiempo_fmt} {texto}")
+            formatted_lines.append(linea)
         
         return "\n".join(formatted_lines)
     
@@ -322,12 +482,10 @@ Responde en formato JSON."""
                 logger.warning(f'Segmento inválido ignorado: {e}')
                 continue
         
-        # Ordenar por relevancia descendente
-        validados.sort(key=lambda x: x['relevancia'], reverse=True)
-        
-        # Limitar cantidad
+        # Los más relevantes primero, limitados a la cantidad máxima; igual
+        # que ordenar y recortar, sin ordenar la lista completa
         max_segments = settings.ANALYSIS_MAX_SEGMENTS
-        return validados[:max_segments]
+        return heapq.nlargest(max_segments, validados, key=lambda x: x['relevancia'])
     
     def _save_analysis(self, resumen_data: Dict):
         """
@@ -337,32 +495,30 @@ Responde en formato JSON."""
             resumen_data: Datos del resumen
         """
         try:
-            # Convertir listas a texto
-            temas = "\n".join([f"• {tema}" for tema in resumen_data.get('temas_principales', [])])
-            conclusiones = "\n".join([f"• {c}" for c in resumen_data.get('conclusiones_clave', [])])
-            puntos = "\n".join([f"• {p}" for p in resumen_data.get('puntos_importantes', [])])
+            # Las listas se guardan tal cual en campos JSON
+            temas = resumen_data.get('temas_principales', [])
+            conclusiones = resumen_data.get('conclusiones_clave', [])
+            puntos = resumen_data.get('puntos_importantes', [])
             
+            # cantidad_palabras la mantiene ResumenEjecutivo.save()
             resumen_completo = resumen_data.get('resumen_completo', '')
-            cantidad_palabras = len(resumen_completo.split())
             
             # Verificar si ya existe resumen
-            if hasattr(self.video, 'resumen_ejecutivo'):
-                resumen = self.video.resumen_ejecutivo
+            if self._resumen is not None:
+                resumen = self._resumen
                 resumen.resumen_completo = resumen_completo
                 resumen.temas_principales = temas
                 resumen.conclusiones_clave = conclusiones
                 resumen.puntos_importantes = puntos
-                resumen.cantidad_palabras = cantidad_palabras
                 resumen.modelo_ia_utilizado = self.model
                 resumen.save()
             else:
-                ResumenEjecutivo.objects.create(
+                self._resumen = ResumenEjecutivo.objects.create(
                     video=self.video,
                     resumen_completo=resumen_completo,
                     temas_principales=temas,
                     conclusiones_clave=conclusiones,
                     puntos_importantes=puntos,
-                    cantidad_palabras=cantidad_palabras,
                     modelo_ia_utilizado=self.model
                 )
             
@@ -372,6 +528,92 @@ Responde en formato JSON."""
             logger.error(f'Error al guardar resumen: {str(e)}')
             raise
     
+    def _save_segments(self, segmentos: List[Dict]):
+        """
+        Reemplazar los segmentos generados por IA del video por los
+        importantes, insertados en un único INSERT
+        
+        Los segmentos manuales o creados por la API no se tocan. Se llama
+        dentro de la transacción de analyze(), así que los archivos de los
+        segmentos reemplazados se borran solo si la transacción confirma.
+        
+        Args:
+            segmentos: Segmentos validados, ordenados por relevancia
+        """
+        anteriores = Segmento.objects.filter(video=self.video, generado_por_ia=True)
+        archivos = [
+            archivo
+            for segmento in anteriores.only('ruta_archivo_segmento', 'miniatura_url')
+            for archivo in (segmento.ruta_archivo_segmento, segmento.miniatura_url)
+            if archivo
+        ]
+        anteriores.delete()
+        Segmento.objects.bulk_create([
+            Segmento(
+                video=self.video,
+                titulo=seg['titulo'],
+                descripcion=seg['descripcion'],
+                timestamp_inicio_seg=seg['timestamp_inicio'],
+                timestamp_fin_seg=seg['timestamp_fin'],
+                duracion_seg=seg['duracion'],
+                orden=i,
+                relevancia_score=seg['relevancia'],
+                tipo_contenido=seg['tipo'],
+                generado_por_ia=True
+            )
+            for i, seg in enumerate(segmentos, 1)
+        ])
+        
+        # bulk_create no emite post_save: invalidar el detalle cacheado aquí
+        transaction.on_commit(lambda: self._limpiar_segmentos_reemplazados(archivos))
+        
+        logger.info(f'{len(segmentos)} segmentos guardados para video {self.video.id}')
+    
+    def _limpiar_segmentos_reemplazados(self, archivos: List):
+        """
+        Borrar los archivos de los segmentos reemplazados e invalidar el
+        detalle completo cacheado del video
+        
+        Args:
+            archivos: Archivos (FieldFile) de clips y miniaturas a borrar
+        """
+        for archivo in archivos:
+            try:
+                archivo.storage.delete(archivo.name)
+            except Exception as e:
+                logger.warning(f'No se pudo borrar {archivo.name}: {str(e)}')
+        
+        invalidar_video_completo(self.video.id)
+    
+    def _get_existing_analysis(self) -> Optional[Dict]:
+        """
+        Análisis ya guardado con el modelo actual, en el formato de analyze();
+        la lista de segmentos está vacía si solo se guardó el resumen
+        
+        Returns:
+            Optional[Dict]: Análisis existente o None si no hay resumen
+        """
+        if self._resumen is None or self._resumen.modelo_ia_utilizado != self.model:
+            return None
+        
+        segmentos = [
+            {
+                'titulo': seg.titulo,
+                'descripcion': seg.descripcion,
+                'timestamp_inicio': seg.timestamp_inicio_seg,
+                'timestamp_fin': seg.timestamp_fin_seg,
+                'duracion': seg.duracion_seg,
+                'relevancia': seg.relevancia_score,
+                'tipo': seg.tipo_contenido
+            }
+            for seg in self.video.segmentos.filter(generado_por_ia=True).order_by('orden')
+        ]
+        
+        return {
+            'resumen': self.get_existing_summary(),
+            'segmentos_importantes': segmentos
+        }
+    
     def get_existing_summary(self) -> Optional[Dict]:
         """
         Obtener resumen ejecutivo existente
@@ -380,13 +622,13 @@ Responde en formato JSON."""
             Optional[Dict]: Resumen existente o None
         """
         try:
-            if hasattr(self.video, 'resumen_ejecutivo'):
-                resumen = self.video.resumen_ejecutivo
+            if self._resumen is not None:
+                resumen = self._resumen
                 return {
                     'resumen_completo': resumen.resumen_completo,
-                    'temas_principales': resumen.temas_principales.split('\n'),
-                    'conclusiones_clave': resumen.conclusiones_clave.split('\n'),
-                    'puntos_importantes': resumen.puntos_importantes.split('\n'),
+                    'temas_principales': resumen.temas_principales,
+                    'conclusiones_clave': resumen.conclusiones_clave,
+                    'puntos_importantes': resumen.puntos_importantes,
                     'modelo_utilizado': resumen.modelo_ia_utilizado
                 }
             return None
@@ -394,15 +636,19 @@ Responde en formato JSON."""
             return None
     
     def _log_progress(self, etapa: str, estado: str, mensaje: str, error_detalle: str = None):
-        """Registrar progreso en la base de datos"""
+        """Registrar progreso; se inserta en la base de datos con flush_logs"""
+        self._logs.add(
+            video=self.video,
+            etapa=etapa,
+            estado=estado,
+            mensaje=mensaje,
+            error_detalle=error_detalle
+        )
+    
+    def flush_logs(self):
+        """Insertar en un único INSERT los logs registrados en la etapa"""
         try:
-            LogProcesamiento.objects.create(
-                video=self.video,
-                etapa=etapa,
-                estado=estado,
-                mensaje=mensaje,
-                error_detalle=error_detalle
-            )
+            self._logs.flush()
         except Exception as e:
             logger.error(f"Error al crear log: {str(e)}")
 
@@ -418,7 +664,9 @@ def analyze_video(video_id: int) -> Dict:
         Dict: Resultado del análisis
     """
     try:
-        video = Video.objects.get(id=video_id)
+        video = Video.objects.select_related(
+            'transcripcion', 'resumen_ejecutivo'
+        ).get(id=video_id)
         service = AnalysisService(video)
         return service.analyze()
     except Video.DoesNotExist:
@@ -1,11 +1,16 @@
 import ffmpeg
 from pathlib import Path
 from django.conf import settings
-from apps.videos.models import Video, LogProcesamiento
+from apps.videos.models import Video
+from apps.videos.services.log_buffer import LogBuffer
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Códecs que Whisper acepta tal cual, con la extensión del archivo de salida;
+# si el audio ya es mono a 16 kHz o menos se copia sin recodificar
+CODECS_COPIABLES = {'mp3': 'mp3', 'aac': 'm4a'}
+
 
 class AudioExtractionError(Exception):
     """Excepción personalizada para errores de extracción de audio"""
@@ -19,6 +24,7 @@ class AudioExtractor:
     
     def __init__(self, video: Video):
         self.video = video
+        self._logs = LogBuffer()
         self.audio_dir = settings.MEDIA_ROOT / 'audio'
         self.audio_dir.mkdir(exist_ok=True)
     
@@ -42,19 +48,25 @@ class AudioExtractor:
             if not video_path.exists():
                 raise AudioExtractionError(f"Archivo de video no existe: {video_path}")
             
-            # Definir ruta de salida
-            output_path = self.audio_dir / f'audio_{self.video.id}.mp3'
-            
-            # Extraer audio con FFmpeg
+            # Extraer audio con FFmpeg; -vn descarta el video: sin él, el
+            # muxer de MP3 toma la pista de video como carátula y FFmpeg
+            # decodifica el video completo
             stream = ffmpeg.input(str(video_path))
-            stream = ffmpeg.output(
-                stream,
-                str(output_path),
-                acodec='libmp3lame',
-                audio_bitrate='128k',
-                ar='16000',  # Sample rate 16kHz (óptimo para speech recognition)
-                ac=1  # Mono
-            )
+            extension_copia = self._extension_copia(video_path)
+            if extension_copia:
+                output_path = self.audio_dir / f'audio_{self.video.id}.{extension_copia}'
+                stream = ffmpeg.output(stream, str(output_path), acodec='copy', vn=None)
+            else:
+                output_path = self.audio_dir / f'audio_{self.video.id}.mp3'
+                stream = ffmpeg.output(
+                    stream,
+                    str(output_path),
+                    acodec='libmp3lame',
+                    audio_bitrate='128k',
+                    ar='16000',  # Sample rate 16kHz (óptimo para speech recognition)
+                    ac=1,  # Mono
+                    vn=None
+                )
             
             # Ejecutar con sobrescritura
             ffmpeg.run(stream, overwrite_output=True, quiet=True)
@@ -63,9 +75,6 @@ class AudioExtractor:
             if not output_path.exists():
                 raise AudioExtractionError("No se pudo crear el archivo de audio")
             
-            # Obtener información del audio
-            audio_info = self._get_audio_info(output_path)
-            
             self._log_progress(
                 'extraccion_audio',
                 'completado',
@@ -83,6 +92,25 @@ class AudioExtractor:
             error_msg = f"Error inesperado al extraer audio: {str(e)}"
             self._log_progress('extraccion_audio', 'error', error_msg, str(e))
             raise AudioExtractionError(error_msg)
+        
+        finally:
+            self.flush_logs()
+    
+    def _extension_copia(self, video_path: Path):
+        """
+        Extensión de salida si el audio del video puede copiarse sin
+        recodificar (MP3/AAC mono a 16 kHz o menos), o None
+        """
+        info = self._get_audio_info(video_path)
+        extension = CODECS_COPIABLES.get(info.get('codec'))
+        if not extension or info.get('channels') != 1:
+            return None
+        try:
+            if int(info.get('sample_rate') or 0) > 16000:
+                return None
+        except ValueError:
+            return None
+        return extension
     
     def _get_audio_info(self, audio_path: Path) -> dict:
         """
@@ -117,15 +145,19 @@ class AudioExtractor:
             return {}
     
     def _log_progress(self, etapa: str, estado: str, mensaje: str, error_detalle: str = None):
-        """Registrar progreso en la base de datos"""
+        """Registrar progreso; se inserta en la base de datos con flush_logs"""
+        self._logs.add(
+            video=self.video,
+            etapa=etapa,
+            estado=estado,
+            mensaje=mensaje,
+            error_detalle=error_detalle
+        )
+    
+    def flush_logs(self):
+        """Insertar en un único INSERT los logs registrados en la etapa"""
         try:
-            LogProcesamiento.objects.create(
-                video=self.video,
-                etapa=etapa,
-                estado=estado,
-                mensaje=mensaje,
-                error_detalle=error_detalle
-            )
+            self._logs.flush()
         except Exception as e:
             logger.error(f"Error al crear log: {str(e)}")
 
@@ -0,0 +1,15 @@
+from django.conf import settings
+
+
+def opciones_entrada(**opciones) -> dict:
+    """
+    Opciones para ffmpeg.input de una entrada cuyo video se decodifica
+    
+    Agrega -hwaccel si FFMPEG_HWACCEL está configurado. Sin
+    -hwaccel_output_format los cuadros decodificados vuelven a memoria del
+    sistema, así que los filtros y codificadores de CPU (libx264, mjpeg)
+    funcionan sin cambios.
+    """
+    if settings.FFMPEG_HWACCEL:
+        opciones['hwaccel'] = settings.FFMPEG_HWACCEL
+    return opciones
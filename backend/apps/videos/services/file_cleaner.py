@@ -1,5 +1,6 @@
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
 from django.conf import settings
@@ -16,6 +17,7 @@ class FileCleaner:
     def __init__(self):
         self.temp_dir = settings.TEMP_ROOT
         self.lifetime_hours = settings.TEMP_FILE_LIFETIME_HOURS
+        self.max_workers = settings.TEMP_CLEANUP_WORKERS
     
     def clean_old_files(self) -> dict:
         """
@@ -31,23 +33,29 @@ class FileCleaner:
             deleted_count = 0
             freed_space = 0
             cutoff_time = time.time() - (self.lifetime_hours * 3600)
+            candidatos = []
             
-            for file_path in self.temp_dir.iterdir():
-                if file_path.is_file():
-                    # Verificar antigüedad
-                    file_age = file_path.stat().st_mtime
+            with os.scandir(self.temp_dir) as entradas:
+                for entrada in entradas:
+                    if not entrada.is_file(follow_symlinks=False):
+                        continue
                     
-                    if file_age < cutoff_time:
-                        # Obtener tamaño antes de eliminar
-                        file_size = file_path.stat().st_size
-                        
-                        # Eliminar archivo
-                        file_path.unlink()
-                        
+                    # Un solo stat para antigüedad y tamaño
+                    info = entrada.stat(follow_symlinks=False)
+                    
+                    if info.st_mtime < cutoff_time:
+                        candidatos.append((entrada.path, entrada.name, info.st_size))
+            
+            # Los unlink dependen de la latencia del disco: se lanzan en paralelo
+            if candidatos:
+                workers = max(1, min(self.max_workers, len(candidatos)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    eliminados = list(executor.map(self._eliminar, candidatos))
+                
+                for (_, _, file_size), eliminado in zip(candidatos, eliminados):
+                    if eliminado:
                         deleted_count += 1
                         freed_space += file_size
-                        
-                        logger.info(f"Eliminado archivo temporal: {file_path.name}")
             
             freed_space_mb = round(freed_space / (1024 * 1024), 2)
             
@@ -65,6 +73,26 @@ class FileCleaner:
             logger.error(f"Error en limpieza de archivos: {str(e)}")
             return {'deleted_count': 0, 'freed_space_mb': 0, 'error': str(e)}
     
+    @staticmethod
+    def _eliminar(candidato) -> bool:
+        """
+        Eliminar un archivo candidato sin interrumpir al resto del lote
+        
+        Args:
+            candidato: Tupla (ruta, nombre, tamaño)
+        
+        Returns:
+            bool: True si se eliminó correctamente
+        """
+        ruta, nombre, _ = candidato
+        try:
+            os.unlink(ruta)
+            logger.info(f"Eliminado archivo temporal: {nombre}")
+            return True
+        except OSError as e:
+            logger.warning(f"No se pudo eliminar {nombre}: {str(e)}")
+            return False
+    
     def clean_file(self, file_path: Path) -> bool:
         """
         Eliminar un archivo específico
@@ -95,11 +123,26 @@ class FileCleaner:
         if not self.temp_dir.exists():
             return 0.0
         
-        total_size = sum(
-            f.stat().st_size for f in self.temp_dir.rglob('*') if f.is_file()
-        )
+        total_size = self._tamano_directorio(self.temp_dir)
         
         return round(total_size / (1024 * 1024), 2)
+    
+    @classmethod
+    def _tamano_directorio(cls, ruta) -> int:
+        """
+        Sumar en bytes el tamaño de los archivos bajo `ruta`, recursivamente.
+        
+        os.scandir reutiliza el stat de cada DirEntry en lugar de crear un
+        Path y volver a consultar el disco por cada archivo.
+        """
+        total = 0
+        with os.scandir(ruta) as entradas:
+            for entrada in entradas:
+                if entrada.is_file(follow_symlinks=False):
+                    total += entrada.stat(follow_symlinks=False).st_size
+                elif entrada.is_dir(follow_symlinks=False):
+                    total += cls._tamano_directorio(entrada.path)
+        return total
 
 
 def clean_temp_files() -> dict:
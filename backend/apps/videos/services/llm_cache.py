@@ -0,0 +1,35 @@
+from django.core.cache import cache
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def clave_llm(prefijo: str, **parametros) -> str:
+    """
+    Clave de caché para una llamada al modelo
+    
+    Es el SHA-256 de todos los parámetros que determinan la respuesta
+    (modelo, prompts, temperatura, tokens, formato), así que solo
+    coinciden llamadas idénticas.
+    """
+    payload = json.dumps(parametros, sort_keys=True, ensure_ascii=False)
+    return prefijo + hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def obtener_respuesta(clave: str):
+    """Respuesta cacheada, o None si no está o la caché no responde"""
+    try:
+        return cache.get(clave)
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
+        return None
+
+
+def guardar_respuesta(clave: str, valor, ttl: int):
+    """Guardar una respuesta; los fallos de la caché solo se registran"""
+    try:
+        cache.set(clave, valor, ttl)
+    except Exception as e:
+        logger.warning(f'Caché no disponible: {str(e)}')
@@ -0,0 +1,44 @@
+from apps.videos.models import LogProcesamiento
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LogBuffer:
+    """
+    Acumula logs de procesamiento y los inserta por lotes
+    
+    Uso:
+        with LogBuffer() as logs:
+            logs.add(video_id=video.pk, etapa='descarga', estado='completado', ...)
+    
+    Los logs se insertan al llegar a `tamano_lote` y al salir del bloque,
+    también si este termina con una excepción. Los servicios que lo usan
+    sin `with` llaman a flush() al terminar cada etapa.
+    """
+    
+    def __init__(self, tamano_lote: int = 500):
+        self.tamano_lote = tamano_lote
+        self.pendientes = []
+        self.total = 0
+    
+    def add(self, **campos):
+        """Agregar un log; inserta el lote si se llenó"""
+        self.pendientes.append(LogProcesamiento(**campos))
+        if len(self.pendientes) >= self.tamano_lote:
+            self.flush()
+    
+    def flush(self):
+        """Insertar los logs pendientes en un único INSERT"""
+        if not self.pendientes:
+            return
+        LogProcesamiento.objects.bulk_create(self.pendientes, batch_size=self.tamano_lote)
+        self.total += len(self.pendientes)
+        self.pendientes = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
@@ -0,0 +1,18 @@
+from functools import lru_cache
+from openai import OpenAI
+
+
+@lru_cache(maxsize=None)
+def _cliente(api_key: str) -> OpenAI:
+    return OpenAI(api_key=api_key)
+
+
+def obtener_cliente(api_key: str) -> OpenAI:
+    """
+    Cliente de OpenAI compartido por proceso
+    
+    Cada OpenAI() abre su propio pool de conexiones HTTP; reutilizar el
+    mismo cliente entre tareas del worker conserva las conexiones TLS
+    abiertas. Se crea al primer uso, ya dentro del proceso hijo de Celery.
+    """
+    return _cliente(api_key)
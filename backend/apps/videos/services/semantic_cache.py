@@ -0,0 +1,65 @@
+from django.conf import settings
+from apps.videos.models import CacheSemanticaResumen
+from typing import Dict, Optional
+import numpy as np
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """
+    Caché semántica de resúmenes ejecutivos
+    
+    Compara el embedding de una transcripción con los de resúmenes ya
+    generados por el mismo modelo; si la similitud coseno supera el umbral
+    se reutiliza el resumen en lugar de llamar a GPT. Los embeddings se
+    guardan normalizados, así que la similitud es un producto punto.
+    
+    Solo se reutiliza el resumen: los segmentos importantes dependen de los
+    timestamps de cada video y se calculan siempre.
+    """
+    
+    def __init__(self, client, modelo_ia: str):
+        self.client = client
+        self.modelo_ia = modelo_ia
+        self.umbral = settings.SEMANTIC_CACHE_UMBRAL
+    
+    def embedding(self, texto: str) -> np.ndarray:
+        """Embedding normalizado (float32) de un texto"""
+        response = self.client.embeddings.create(
+            model=settings.SEMANTIC_CACHE_EMBEDDING_MODEL,
+            input=texto
+        )
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
+    
+    def buscar(self, vector: np.ndarray) -> Optional[Dict]:
+        """Resumen del candidato más parecido, o None si ninguno llega al umbral"""
+        candidatos = list(
+            CacheSemanticaResumen.objects.filter(
+                modelo_ia=self.modelo_ia
+            ).values_list('embedding', 'resumen_json')[:settings.SEMANTIC_CACHE_MAX_CANDIDATOS]
+        )
+        if not candidatos:
+            return None
+        
+        matriz = np.stack([
+            np.frombuffer(embedding, dtype=np.float32) for embedding, _ in candidatos
+        ])
+        similitudes = matriz @ vector
+        mejor = int(np.argmax(similitudes))
+        
+        if similitudes[mejor] < self.umbral:
+            return None
+        
+        logger.info(f'Resumen reutilizado de caché semántica (similitud {similitudes[mejor]:.3f})')
+        return candidatos[mejor][1]
+    
+    def guardar(self, vector: np.ndarray, resumen: Dict):
+        """Registrar un resumen recién generado"""
+        CacheSemanticaResumen.objects.create(
+            modelo_ia=self.modelo_ia,
+            embedding=vector.tobytes(),
+            resumen_json=resumen
+        )
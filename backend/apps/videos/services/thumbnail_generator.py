@@ -1,8 +1,10 @@
 import ffmpeg
 from pathlib import Path
 from django.conf import settings
-from django.core.files import File
-from apps.videos.models import Video, LogProcesamiento
+from django.core.files.base import ContentFile
+from apps.videos.models import Video
+from apps.videos.services.log_buffer import LogBuffer
+from apps.videos.services.ffmpeg_opciones import opciones_entrada
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,6 +22,7 @@ class ThumbnailGenerator:
     
     def __init__(self, video: Video):
         self.video = video
+        self._logs = LogBuffer()
         self.thumbnail_dir = settings.MEDIA_ROOT / 'miniaturas'
         self.thumbnail_dir.mkdir(exist_ok=True)
     
@@ -32,7 +35,8 @@ class ThumbnailGenerator:
             timestamp: Segundo del video para capturar (None = primer frame)
         
         Returns:
-            Path: Ruta de la miniatura generada
+            Path: Ruta de la miniatura generada (relativa al storage si este
+                no es local)
         
         Raises:
             ThumbnailGenerationError: Si hay error en la generación
@@ -50,33 +54,47 @@ class ThumbnailGenerator:
             elif timestamp is None:
                 timestamp = 0
             
-            # Definir ruta de salida
-            output_path = self.thumbnail_dir / f'thumb_{self.video.id}.jpg'
+            # Nombre final en el storage del campo; FFmpeg escribe ahí
+            # directamente en lugar de generar una copia que luego se relee
+            miniatura = self.video.miniatura_url
+            nombre = miniatura.field.generate_filename(self.video, f'thumb_{self.video.id}.jpg')
+            output_path = self._ruta_local(miniatura.storage, nombre)
             
-            # Generar miniatura
-            stream = ffmpeg.input(str(video_path), ss=timestamp)
+            # Generar miniatura; -ss antes de -i ya salta al keyframe previo,
+            # y con -noaccurate_seek se usa ese keyframe en lugar de decodificar
+            # hasta el segundo exacto (basta para una miniatura)
+            stream = ffmpeg.input(
+                str(video_path),
+                **opciones_entrada(ss=timestamp, noaccurate_seek=None)
+            )
             stream = ffmpeg.output(
                 stream,
-                str(output_path),
+                str(output_path) if output_path else 'pipe:',
                 vframes=1,
                 format='image2',
                 vcodec='mjpeg',
                 **{'q:v': 2}  # Calidad (1-31, menor es mejor)
             )
             
-            ffmpeg.run(stream, overwrite_output=True, quiet=True)
-            
-            # Verificar que se creó la miniatura
-            if not output_path.exists():
-                raise ThumbnailGenerationError("No se pudo crear la miniatura")
+            if output_path:
+                output_path.parent.mkdir(parents=True, exist_ok=True)
+                ffmpeg.run(stream, overwrite_output=True, quiet=True)
+                
+                # Verificar que se creó la miniatura
+                if not output_path.exists():
+                    raise ThumbnailGenerationError("No se pudo crear la miniatura")
+            else:
+                # Storage remoto: la imagen sale por stdout y se sube sin
+                # pasar por un archivo local
+                imagen, _ = ffmpeg.run(stream, quiet=True)
+                if not imagen:
+                    raise ThumbnailGenerationError("No se pudo crear la miniatura")
+                nombre = miniatura.storage.save(nombre, ContentFile(imagen))
+                output_path = Path(nombre)
             
             # Actualizar modelo Video con la ruta de la miniatura
-            with open(output_path, 'rb') as f:
-                self.video.miniatura_url.save(
-                    output_path.name,
-                    File(f),
-                    save=True
-                )
+            miniatura.name = nombre
+            self.video.save(update_fields=['miniatura_url'])
             
             self._log_progress(
                 'generacion_miniatura',
@@ -95,6 +113,9 @@ class ThumbnailGenerator:
             error_msg = f"Error inesperado: {str(e)}"
             self._log_progress('generacion_miniatura', 'error', error_msg, str(e))
             raise ThumbnailGenerationError(error_msg)
+        
+        finally:
+            self.flush_logs()
     
     def generate_multiple(self, video_path: Path, count: int = 5) -> list[Path]:
         """
@@ -115,39 +136,62 @@ class ThumbnailGenerator:
         # Calcular intervalos
         interval = self.video.duracion_segundos // (count + 1)
         
-        for i in range(1, count + 1):
-            timestamp = interval * i
-            try:
-                output_path = self.thumbnail_dir / f'thumb_{self.video.id}_{i}.jpg'
-                
-                stream = ffmpeg.input(str(video_path), ss=timestamp)
-                stream = ffmpeg.output(
-                    stream,
-                    str(output_path),
-                    vframes=1,
-                    format='image2',
-                    vcodec='mjpeg',
-                    **{'q:v': 2}
-                )
-                
-                ffmpeg.run(stream, overwrite_output=True, quiet=True)
-                thumbnails.append(output_path)
-            
-            except Exception as e:
-                logger.error(f"Error generando miniatura {i}: {str(e)}")
+        # Un único proceso de FFmpeg con una entrada por miniatura: cada
+        # entrada hace su propio seek (-ss antes de -i) al keyframe más
+        # cercano, así que solo se decodifica un cuadro por miniatura
+        output_paths = [
+            self.thumbnail_dir / f'thumb_{self.video.id}_{i}.jpg'
+            for i in range(1, count + 1)
+        ]
+        outputs = [
+            ffmpeg.input(
+                str(video_path),
+                **opciones_entrada(ss=interval * i, noaccurate_seek=None)
+            )['v'].output(
+                str(output_path),
+                vframes=1,
+                format='image2',
+                vcodec='mjpeg',
+                **{'q:v': 2}
+            )
+            for i, output_path in enumerate(output_paths, start=1)
+        ]
         
+        # Descartar miniaturas de una ejecución anterior para no devolverlas
+        for output_path in output_paths:
+            output_path.unlink(missing_ok=True)
+        
+        try:
+            ffmpeg.run(ffmpeg.merge_outputs(*outputs), overwrite_output=True, quiet=True)
+        except Exception as e:
+            logger.error(f"Error generando miniaturas: {str(e)}")
+        
+        # Si FFmpeg falla a mitad se devuelven las miniaturas que alcanzó a escribir
+        thumbnails.extend(path for path in output_paths if path.exists())
         return thumbnails
     
+    @staticmethod
+    def _ruta_local(storage, nombre: str):
+        """Ruta en disco de `nombre`, o None si el storage no es local"""
+        try:
+            return Path(storage.path(nombre))
+        except NotImplementedError:
+            return None
+    
     def _log_progress(self, etapa: str, estado: str, mensaje: str, error_detalle: str = None):
-        """Registrar progreso"""
+        """Registrar progreso; se inserta en la base de datos con flush_logs"""
+        self._logs.add(
+            video=self.video,
+            etapa=etapa,
+            estado=estado,
+            mensaje=mensaje,
+            error_detalle=error_detalle
+        )
+    
+    def flush_logs(self):
+        """Insertar en un único INSERT los logs registrados en la etapa"""
         try:
-            LogProcesamiento.objects.create(
-                video=self.video,
-                etapa=etapa,
-                estado=estado,
-                mensaje=mensaje,
-                error_detalle=error_detalle
-            )
+            self._logs.flush()
         except Exception as e:
             logger.error(f"Error al crear log: {str(e)}")
 
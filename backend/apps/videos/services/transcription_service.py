@@ -1,15 +1,28 @@
-import whisper
-import torch
-from openai import OpenAI
+from faster_whisper import BatchedInferencePipeline, WhisperModel, decode_audio
+import ctranslate2
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Iterator, Tuple
 from django.conf import settings
-from apps.videos.models import Video, Transcripcion, LogProcesamiento
+import threading
+import time
+import gc
+from apps.videos.models import Video, Transcripcion
+from apps.videos.cache import (
+    guardar_transcripcion_parcial, borrar_transcripcion_parcial, invalidar_video_completo
+)
+from apps.videos.services.log_buffer import LogBuffer
+from apps.videos.services.openai_cliente import obtener_cliente
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Modelos locales cargados en este proceso, por (modelo, dispositivo,
+# tipo de cómputo): cada tarea del worker reutiliza el ya cargado
+_MODELOS: Dict[tuple, WhisperModel] = {}
+_MODELOS_LOCK = threading.Lock()
+
 
 class TranscriptionError(Exception):
     """Excepción personalizada para errores de transcripción"""
@@ -19,10 +32,14 @@ class TranscriptionError(Exception):
 class TranscriptionService:
     """
     Servicio para transcribir audio usando Whisper (Local o API)
+    
+    El modo local usa faster-whisper (CTranslate2) con pesos cuantizados
+    a int8 (int8_float16 en GPU).
     """
     
     def __init__(self, video: Video, mode: str = None):
         self.video = video
+        self._logs = LogBuffer()
         self.mode = mode or settings.WHISPER_MODE
         self.model = None
         self.model_name = settings.WHISPER_MODEL
@@ -32,7 +49,7 @@ class TranscriptionService:
         if self.mode == 'api':
             if not settings.OPENAI_API_KEY:
                 raise TranscriptionError("OPENAI_API_KEY no configurada")
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            self.openai_client = obtener_cliente(settings.OPENAI_API_KEY)
     
     def load_model(self):
         """
@@ -44,26 +61,61 @@ class TranscriptionService:
         
         try:
             if self.model is None:
-                logger.info(f'Cargando modelo Whisper local: {self.model_name}')
-                
                 # Verificar si CUDA está disponible
-                if self.device == 'cuda' and not torch.cuda.is_available():
+                if self.device == 'cuda' and not ctranslate2.get_cuda_device_count():
                     logger.warning('CUDA no disponible, usando CPU')
                     self.device = 'cpu'
                 
-                # Cargar modelo
-                self.model = whisper.load_model(
-                    self.model_name,
-                    device=self.device
+                compute_type = settings.WHISPER_COMPUTE_TYPE or (
+                    'int8_float16' if self.device == 'cuda' else 'int8'
                 )
                 
-                logger.info(f'Modelo Whisper cargado en {self.device}')
+                clave = (self.model_name, self.device, compute_type)
+                with _MODELOS_LOCK:
+                    self.model = _MODELOS.get(clave)
+                    if self.model is None:
+                        logger.info(f'Cargando modelo Whisper local: {self.model_name}')
+                        
+                        # Cargar modelo
+                        self.model = WhisperModel(
+                            self.model_name,
+                            device=self.device,
+                            compute_type=compute_type,
+                            download_root=settings.WHISPER_CACHE_DIR
+                        )
+                        _MODELOS[clave] = self.model
+                        
+                        # CTranslate2 usa el tipo soportado más cercano si el
+                        # hardware no admite el pedido ('int8' se informa
+                        # como 'int8_float32')
+                        compute_type_real = self.model.model.compute_type
+                        if not compute_type_real.startswith(compute_type):
+                            logger.warning(
+                                f'{compute_type} no soportado en {self.device}, '
+                                f'se usa {compute_type_real}'
+                            )
+                        
+                        logger.info(f'Modelo Whisper cargado en {self.device} ({compute_type_real})')
         
         except Exception as e:
             error_msg = f"Error al cargar modelo Whisper: {str(e)}"
             logger.error(error_msg)
             raise TranscriptionError(error_msg)
     
+    @classmethod
+    def unload_models(cls):
+        """
+        Liberar los modelos locales cargados en el proceso
+        
+        CTranslate2 libera la memoria (también la de GPU) al destruirse el
+        modelo; las instancias que aún lo referencien lo mantienen vivo.
+        """
+        with _MODELOS_LOCK:
+            cantidad = len(_MODELOS)
+            _MODELOS.clear()
+        gc.collect()
+        logger.info(f'{cantidad} modelos Whisper descargados')
+    
     def transcribe(self, audio_path: Path) -> Dict:
         """
         Transcribir audio a texto (usando local o API según configuración)
@@ -122,6 +174,11 @@ class TranscriptionService:
             self._log_progress('transcripcion', 'error', error_msg, str(e))
             logger.error(error_msg)
             raise TranscriptionError(error_msg)
+        
+        finally:
+            self.flush_logs()
+            if self.mode != 'api':
+                borrar_transcripcion_parcial(self.video.id)
     
     def _transcribe_with_api(self, audio_path: Path) -> Dict:
         """
@@ -183,30 +240,110 @@ class TranscriptionService:
         try:
             logger.info('Usando modelo local de Whisper')
             
-            # Cargar modelo si no está cargado
-            if self.model is None:
-                self.load_model()
-            
-            # Opciones de transcripción
-            options = {
-                'language': settings.WHISPER_LANGUAGE,
-                'task': 'transcribe',
-                'verbose': False,
-                'word_timestamps': True,
-            }
+            segments, info = self.transcribe_stream(audio_path)
             
-            # Transcribir
-            result = self.model.transcribe(
-                str(audio_path),
-                **options
-            )
+            # Los segmentos ya confirmados se publican en caché cada
+            # TRANSCRIPCION_PARCIAL_INTERVALO segundos para mostrar avance;
+            # la versión publicada (sin palabras) se arma una vez por segmento
+            segmentos = []
+            parcial = []
+            ultima_publicacion = time.monotonic()
+            for segmento in segments:
+                segmentos.append(segmento)
+                parcial.append({
+                    'inicio': segmento['start'],
+                    'fin': segmento['end'],
+                    'texto': segmento['text'].strip()
+                })
+                if time.monotonic() - ultima_publicacion >= settings.TRANSCRIPCION_PARCIAL_INTERVALO:
+                    guardar_transcripcion_parcial(self.video.id, parcial)
+                    ultima_publicacion = time.monotonic()
             
-            return result
+            # Mismo formato que la respuesta de la API
+            return {
+                'text': ''.join(segmento['text'] for segmento in segmentos),
+                'language': info.language,
+                'duration': info.duration,
+                'segments': segmentos
+            }
         
         except Exception as e:
             logger.error(f'Error en transcripción local: {str(e)}')
             raise TranscriptionError(f"Error en transcripción local: {str(e)}")
     
+    def transcribe_stream(self, audio_path: Path) -> Tuple[Iterator[Dict], object]:
+        """
+        Transcribir con el modelo local entregando los segmentos a medida
+        que se decodifican
+        
+        Cada segmento del archivo se decodifica una sola vez y no se revisa
+        después, así que todo lo entregado ya es definitivo.
+        
+        Args:
+            audio_path: Ruta del archivo de audio
+        
+        Returns:
+            Tuple: (generador de segmentos en el formato de la API, con las
+                palabras como objetos Word de faster-whisper; info con
+                idioma y duración)
+        """
+        # La decodificación del audio (CPU) se hace en un hilo mientras se
+        # carga el modelo (disco y GPU); con el modelo ya en caché solo se
+        # decodifica
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            futuro_audio = executor.submit(decode_audio, str(audio_path))
+            
+            # Cargar modelo si no está cargado
+            if self.model is None:
+                self.load_model()
+            
+            audio = futuro_audio.result()
+        
+        # Opciones de transcripción; el VAD divide el audio en fragmentos
+        # de hasta 30 s separados por silencios, que se transcriben por
+        # lotes en paralelo. Los timestamps ya vienen referidos al audio
+        # completo. Con un silencio mínimo corto los tramos de voz son más
+        # pequeños, los fragmentos se llenan más cerca de los 30 s (menos
+        # pasadas del codificador, que siempre procesa 30 s) y las pausas
+        # entre fragmentos se descartan
+        options = {
+            'language': settings.WHISPER_LANGUAGE,
+            'task': 'transcribe',
+            'word_timestamps': True,
+            'without_timestamps': False,
+            'vad_filter': True,
+            'vad_parameters': {
+                'min_silence_duration_ms': settings.WHISPER_VAD_MIN_SILENCE_MS,
+                'speech_pad_ms': settings.WHISPER_VAD_SPEECH_PAD_MS,
+            },
+            'batch_size': self._batch_size(),
+        }
+        
+        # Transcribir; los segmentos se generan al recorrerlos
+        pipeline = BatchedInferencePipeline(model=self.model)
+        segments, info = pipeline.transcribe(
+            audio,
+            **options
+        )
+        
+        segmentos = (
+            {
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'avg_logprob': segment.avg_logprob,
+                'words': segment.words or []
+            }
+            for segment in segments
+        )
+        return segmentos, info
+    
+    def _batch_size(self) -> int:
+        """Fragmentos por lote: WHISPER_BATCH_SIZE o uno según el dispositivo"""
+        if settings.WHISPER_BATCH_SIZE:
+            return settings.WHISPER_BATCH_SIZE
+        return 16 if self.device == 'cuda' else 8
+    
     def _process_transcription(self, result: Dict) -> Dict:
         """
         Procesar resultado de Whisper y extraer información relevante
@@ -217,21 +354,19 @@ class TranscriptionService:
         # Idioma detectado
         idioma = result.get('language', 'unknown')
         
-        # Segmentos con timestamps
+        # Segmentos con timestamps; las palabras van aparte en columnas
+        # paralelas para no repetir las claves en cada una
         segmentos = []
-        for segment in result.get('segments', []):
-            seg_data = {
+        palabras = {'segmento': [], 'palabra': [], 'inicio': [], 'fin': [], 'probabilidad': []}
+        for indice, segment in enumerate(result.get('segments', [])):
+            segmentos.append({
                 'inicio': segment.get('start', 0),
                 'fin': segment.get('end', 0),
-                'texto': segment.get('text', '').strip(),
-                'palabras': []
-            }
+                'texto': segment.get('text', '').strip()
+            })
             
             # Extraer palabras si están disponibles
-            if 'words' in segment:
-                seg_data['palabras'] = self._extract_words(segment)
-            
-            segmentos.append(seg_data)
+            self._extract_words(segment, indice, palabras)
         
         # Calcular precisión estimada
         precision = self._calculate_precision(result)
@@ -241,20 +376,27 @@ class TranscriptionService:
             'idioma': idioma,
             'precision_estimada': precision,
             'segmentos': segmentos,
+            'palabras': palabras if palabras['palabra'] else None,
             'duracion': result.get('duration', 0),
         }
     
-    def _extract_words(self, segment: Dict) -> List[Dict]:
-        """Extraer palabras individuales con timestamps"""
-        words = []
-        for word in segment.get('words', []):
-            words.append({
-                'palabra': word.get('word', '').strip(),
-                'inicio': word.get('start', 0),
-                'fin': word.get('end', 0),
-                'probabilidad': word.get('probability', 0)
-            })
-        return words
+    def _extract_words(self, segment: Dict, indice: int, palabras: Dict[str, List]):
+        """
+        Añadir las palabras del segmento a las columnas de palabras
+        
+        Las palabras se leen tal como las entrega el modelo (objetos Word de
+        faster-whisper o TranscriptionWord de la API, que no trae
+        probabilidad), sin copiarlas antes a diccionarios.
+        """
+        words = segment.get('words') or []
+        palabras['segmento'].extend([indice] * len(words))
+        palabras['palabra'].extend([word.word.strip() for word in words])
+        # Centésimas de segundo bastan y acortan el JSON
+        palabras['inicio'].extend([round(word.start, 2) for word in words])
+        palabras['fin'].extend([round(word.end, 2) for word in words])
+        palabras['probabilidad'].extend([
+            round(getattr(word, 'probability', 0), 3) for word in words
+        ])
     
     def _calculate_precision(self, result: Dict) -> float:
         """Calcular precisión estimada de la transcripción"""
@@ -282,24 +424,23 @@ class TranscriptionService:
             elif self.mode == 'api':
                 modelo_usado = f"whisper-api-{settings.WHISPER_API_MODEL}"
             
-            # Verificar si ya existe transcripción
-            if hasattr(self.video, 'transcripcion'):
-                transcripcion = self.video.transcripcion
-                transcripcion.contenido_completo = data['contenido_completo']
-                transcripcion.idioma_detectado = data['idioma']
-                transcripcion.precision_estimada = data['precision_estimada']
-                transcripcion.transcripcion_con_timestamps = data['segmentos']
-                transcripcion.modelo_utilizado = modelo_usado
-                transcripcion.save()
+            campos = {
+                'contenido_completo': data['contenido_completo'],
+                'idioma_detectado': data['idioma'],
+                'precision_estimada': data['precision_estimada'],
+                'transcripcion_con_timestamps': data['segmentos'],
+                'palabras': data.get('palabras'),
+                'modelo_utilizado': modelo_usado,
+            }
+            
+            # Si ya existe transcripción se reescribe con un único UPDATE,
+            # sin cargar la fila anterior (que puede ser muy pesada)
+            actualizadas = Transcripcion.objects.filter(video=self.video).update(**campos)
+            if actualizadas:
+                # update() no emite post_save
+                invalidar_video_completo(self.video.id)
             else:
-                Transcripcion.objects.create(
-                    video=self.video,
-                    contenido_completo=data['contenido_completo'],
-                    idioma_detectado=data['idioma'],
-                    precision_estimada=data['precision_estimada'],
-                    transcripcion_con_timestamps=data['segmentos'],
-                    modelo_utilizado=modelo_usado
-                )
+                Transcripcion.objects.create(video=self.video, **campos)
             
             logger.info(f'Transcripción guardada para video {self.video.id}')
         
@@ -320,20 +461,14 @@ class TranscriptionService:
             if self.model is None:
                 self.load_model()
             
-            # Cargar primeros 30 segundos
-            audio = whisper.load_audio(str(audio_path))
-            audio = whisper.pad_or_trim(audio)
-            
-            # Hacer mel spectrogram
-            mel = whisper.log_mel_spectrogram(audio).to(self.model.device)
-            
-            # Detectar idioma
-            _, probs = self.model.detect_language(mel)
-            detected_language = max(probs, key=probs.get)
+            # transcribe() detecta el idioma con los primeros 30 segundos al
+            # llamarse; los segmentos no se recorren, así que no se transcribe
+            _, info = self.model.transcribe(str(audio_path))
+            detected_language = info.language
             
             logger.info(
                 f'Idioma detectado: {detected_language} '
-                f'(confianza: {probs[detected_language]:.2%})'
+                f'(confianza: {info.language_probability:.2%})'
             )
             
             return detected_language
@@ -352,15 +487,19 @@ class TranscriptionService:
             return None
     
     def _log_progress(self, etapa: str, estado: str, mensaje: str, error_detalle: str = None):
-        """Registrar progreso en la base de datos"""
+        """Registrar progreso; se inserta en la base de datos con flush_logs"""
+        self._logs.add(
+            video=self.video,
+            etapa=etapa,
+            estado=estado,
+            mensaje=mensaje,
+            error_detalle=error_detalle
+        )
+    
+    def flush_logs(self):
+        """Insertar en un único INSERT los logs registrados en la etapa"""
         try:
-            LogProcesamiento.objects.create(
-                video=self.video,
-                etapa=etapa,
-                estado=estado,
-                mensaje=mensaje,
-                error_detalle=error_detalle
-            )
+            self._logs.flush()
         except Exception as e:
             logger.error(f"Error al crear log: {str(e)}")
 
@@ -1,8 +1,10 @@
 import os
 import yt_dlp
 from pathlib import Path
+from typing import Optional
 from django.conf import settings
-from apps.videos.models import Video, LogProcesamiento
+from apps.videos.models import Video
+from apps.videos.services.log_buffer import LogBuffer
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,15 +22,23 @@ class VideoDownloader:
     
     def __init__(self, video: Video):
         self.video = video
+        self._logs = LogBuffer()
         self.temp_dir = settings.TEMP_ROOT
         self.temp_dir.mkdir(exist_ok=True)
     
-    def download(self) -> Path:
+    def download(self, solo_audio: bool = False) -> Path:
         """
         Descargar video desde la URL
         
+        Con solo_audio se descarga únicamente la mejor pista de audio y
+        yt-dlp la convierte con FFmpeg al WAV mono de 16 kHz que usa
+        Whisper, sin escribir el video en disco ni extraer el audio después.
+        
+        Args:
+            solo_audio: Descargar solo el audio (flujo de solo transcripción)
+        
         Returns:
-            Path: Ruta del archivo descargado
+            Path: Ruta del archivo descargado (el WAV con solo_audio)
         
         Raises:
             VideoDownloadError: Si hay error en la descarga
@@ -51,16 +61,36 @@ class VideoDownloader:
                 'quiet': False,
                 'no_warnings': False,
             }
+            if solo_audio:
+                ydl_opts.update({
+                    'format': 'bestaudio/best',
+                    'postprocessors': [{
+                        'key': 'FFmpegExtractAudio',
+                        'preferredcodec': 'wav',
+                    }],
+                    'postprocessor_args': {
+                        'extractaudio': ['-ar', '16000', '-ac', '1'],
+                    },
+                })
             
             # Descargar video
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(self.video.url_original, download=True)
                 
-                # Obtener ruta del archivo descargado
-                downloaded_file = Path(ydl.prepare_filename(info))
+                # Obtener ruta del archivo descargado; tras la conversión
+                # yt-dlp deja la ruta final en requested_downloads
+                if solo_audio:
+                    descargas = info.get('requested_downloads') or [{}]
+                    downloaded_file = Path(
+                        descargas[0].get('filepath')
+                        or Path(ydl.prepare_filename(info)).with_suffix('.wav')
+                    )
+                else:
+                    downloaded_file = Path(ydl.prepare_filename(info))
                 
-                # Actualizar información del video
-                self._update_video_info(info, downloaded_file)
+                # Actualizar información del video (el tamaño del WAV no
+                # es el del video)
+                self._update_video_info(info, None if solo_audio else downloaded_file)
                 
                 self._log_progress('descarga', 'completado', f'Video descargado: {downloaded_file}')
                 
@@ -75,6 +105,9 @@ class VideoDownloader:
             error_msg = f"Error inesperado en descarga: {str(e)}"
             self._log_progress('descarga', 'error', error_msg, str(e))
             raise VideoDownloadError(error_msg)
+        
+        finally:
+            self.flush_logs()
     
     def get_video_info(self, url: str) -> dict:
         """
@@ -136,17 +169,16 @@ class VideoDownloader:
         except Exception as e:
             return False, f"URL inválida: {str(e)}"
     
-    def _update_video_info(self, info: dict, file_path: Path):
+    def _update_video_info(self, info: dict, file_path: Optional[Path]):
         """Actualizar información del video en la base de datos"""
         try:
-            # Obtener tamaño del archivo
-            file_size_mb = file_path.stat().st_size / (1024 * 1024)
-            
             # Actualizar modelo
             self.video.titulo = info.get('title', self.video.titulo)
             self.video.duracion_segundos = info.get('duration', 0)
             self.video.formato = info.get('ext', 'mp4')
-            self.video.tamano_mb = round(file_size_mb, 2)
+            if file_path is not None:
+                file_size_mb = file_path.stat().st_size / (1024 * 1024)
+                self.video.tamano_mb = round(file_size_mb, 2)
             self.video.metadata_json = {
                 'resolucion': f"{info.get('width', 0)}x{info.get('height', 0)}",
                 'fps': info.get('fps', 0),
@@ -185,15 +217,19 @@ class VideoDownloader:
             return int(rate_str)
     
     def _log_progress(self, etapa: str, estado: str, mensaje: str, error_detalle: str = None):
-        """Registrar progreso en la base de datos"""
+        """Registrar progreso; se inserta en la base de datos con flush_logs"""
+        self._logs.add(
+            video=self.video,
+            etapa=etapa,
+            estado=estado,
+            mensaje=mensaje,
+            error_detalle=error_detalle
+        )
+    
+    def flush_logs(self):
+        """Insertar en un único INSERT los logs registrados en la etapa"""
         try:
-            LogProcesamiento.objects.create(
-                video=self.video,
-                etapa=etapa,
-                estado=estado,
-                mensaje=mensaje,
-                error_detalle=error_detalle
-            )
+            self._logs.flush()
         except Exception as e:
             logger.error(f"Error al crear log: {str(e)}")
 
@@ -4,6 +4,7 @@ from typing import List, Dict, Optional
 from django.conf import settings
 from django.core.files import File
 from apps.videos.models import Video, Segmento, LogProcesamiento
+from apps.videos.services.ffmpeg_opciones import opciones_entrada
 import logging
 
 logger = logging.getLogger(__name__)
@@ -121,7 +122,7 @@ class VideoSegmentationService:
             logger.info(f'Recortando segmento: {inicio}s por {duracion}s')
             
             # Recortar con FFmpeg
-            stream = ffmpeg.input(str(video_path), ss=inicio, t=duracion)
+            stream = ffmpeg.input(str(video_path), **opciones_entrada(ss=inicio, t=duracion))
             
             # Configurar output con re-encoding para garantizar compatibilidad
             stream = ffmpeg.output(
@@ -177,8 +178,12 @@ class VideoSegmentationService:
             # Capturar frame del medio del segmento
             timestamp = segmento.timestamp_inicio_seg + (segmento.duracion_seg / 2)
             
-            # Generar miniatura
-            stream = ffmpeg.input(str(video_path), ss=timestamp)
+            # Generar miniatura; con -noaccurate_seek se toma el keyframe
+            # previo al timestamp sin decodificar hasta el segundo exacto
+            stream = ffmpeg.input(
+                str(video_path),
+                **opciones_entrada(ss=timestamp, noaccurate_seek=None)
+            )
             stream = ffmpeg.output(
                 stream,
                 str(thumbnail_path),
@@ -257,7 +262,7 @@ class VideoSegmentationService:
             output_path = self.segments_dir / output_name
             duracion = end - start
             
-            stream = ffmpeg.input(str(video_path), ss=start, t=duracion)
+            stream = ffmpeg.input(str(video_path), **opciones_entrada(ss=start, t=duracion))
             stream = ffmpeg.output(
                 stream,
                 str(output_path),
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.videos.cache import invalidar_video_completo
+from apps.videos.models import (
+    Video, Segmento, Transcripcion, ResumenEjecutivo, EtiquetaVideo
+)
+
+
+@receiver(post_save, sender=Video)
+@receiver(post_delete, sender=Video)
+def invalidar_cache_video(sender, instance, **kwargs):
+    """Invalidar el detalle completo cacheado al modificar el video"""
+    invalidar_video_completo(instance.pk)
+
+
+@receiver(post_save, sender=Segmento)
+@receiver(post_delete, sender=Segmento)
+@receiver(post_save, sender=Transcripcion)
+@receiver(post_delete, sender=Transcripcion)
+@receiver(post_save, sender=ResumenEjecutivo)
+@receiver(post_delete, sender=ResumenEjecutivo)
+@receiver(post_save, sender=EtiquetaVideo)
+@receiver(post_delete, sender=EtiquetaVideo)
+def invalidar_cache_relacion_video(sender, instance, **kwargs):
+    """Invalidar el detalle completo cacheado al modificar sus relaciones"""
+    invalidar_video_completo(instance.video_id)
@@ -1,4 +1,5 @@
 from celery import shared_task, chain, group
+from celery.signals import worker_process_shutdown
 from celery.utils.log import get_task_logger
 from django.utils import timezone
 from pathlib import Path
@@ -6,7 +7,9 @@ from apps.videos.services.transcription_service import (
     TranscriptionService,
     TranscriptionError
 )
-from apps.videos.models import Video, LogProcesamiento, Segmento
+from apps.videos.models import Video, LogProcesamiento
+from apps.videos.serializers import VideoCompleteSerializer
+from apps.videos.cache import guardar_video_completo
 from apps.videos.services import (
     VideoDownloader,
     AudioExtractor,
@@ -28,13 +31,23 @@ from apps.videos.services.video_segmentation_service import (
 logger = get_task_logger(__name__)
 
 
+@worker_process_shutdown.connect
+def liberar_modelos_whisper(**kwargs):
+    """
+    Liberar los modelos Whisper del proceso hijo que termina (al reciclarse
+    por max_tasks_per_child o al apagar el worker), incluida la memoria de GPU
+    """
+    TranscriptionService.unload_models()
+
+
 @shared_task(bind=True, max_retries=3)
-def descargar_video_task(self, video_id: int):
+def descargar_video_task(self, video_id: int, solo_audio: bool = False):
     """
     Tarea asíncrona para descargar un video
     
     Args:
         video_id: ID del video a descargar
+        solo_audio: Descargar solo el audio como WAV listo para Whisper
     
     Returns:
         str: Ruta del archivo descargado
@@ -51,7 +64,7 @@ def descargar_video_task(self, video_id: int):
         
         # Descargar video
         downloader = VideoDownloader(video)
-        video_path = downloader.download()
+        video_path = downloader.download(solo_audio=solo_audio)
         
         logger.info(f'Video {video_id} descargado: {video_path}')
         
@@ -297,6 +310,28 @@ def limpiar_archivos_temporales_task():
         raise
 
 
+@shared_task
+def renderizar_video_completo_task(video_id: int):
+    """
+    Serializar el detalle completo de un video y dejarlo en caché
+    
+    Se usa para videos con muchos segmentos, cuya serialización no
+    conviene hacer dentro de la petición HTTP.
+    
+    Args:
+        video_id: ID del video
+    """
+    try:
+        video = Video.objects.con_detalle_completo().get(id=video_id)
+        guardar_video_completo(video_id, VideoCompleteSerializer(video).data)
+        
+        logger.info(f'Detalle completo del video {video_id} cacheado')
+    
+    except Video.DoesNotExist:
+        logger.error(f'Video {video_id} no existe')
+        raise
+
+
 @shared_task
 def procesar_video_completo_task(video_id: int):
     """
@@ -319,7 +354,7 @@ def procesar_video_completo_task(video_id: int):
                     # 2a. Extraer audio
                     extraer_audio_task.s(video_id),
                     # 2b. Transcribir audio
-                    transcribir_audio_task.s(video_id),
+                    transcribir_audio_task.s(video_id=video_id),
                     # 2c. Analizar con IA
                     analizar_video_task.si(video_id)
                 ),
@@ -353,6 +388,62 @@ def procesar_video_completo_task(video_id: int):
         
         raise
 
+def _flujo_solo_transcripcion(video_id: int):
+    """
+    Construir la cadena del pipeline de solo transcripción
+    
+    Args:
+        video_id: ID del video a procesar
+    
+    Returns:
+        chain: Firma de la cadena, sin ejecutar
+    """
+    return chain(
+        # 1. Descargar audio (WAV mono 16 kHz)
+        descargar_video_task.s(video_id, solo_audio=True),
+        # 2. Transcribir audio (recibe la ruta del WAV como primer argumento)
+        transcribir_audio_task.s(video_id=video_id),
+        # 3. Analizar con IA
+        analizar_video_task.si(video_id),
+        # 4. Finalizar procesamiento
+        finalizar_procesamiento_task.si(video_id)
+    )
+
+
+@shared_task
+def procesar_solo_transcripcion_task(video_id: int):
+    """
+    Pipeline de solo transcripción:
+    Descarga de audio → Transcripción → Análisis → Finalizar
+    
+    yt-dlp descarga solo la pista de audio y la convierte al WAV de 16 kHz
+    de Whisper, así que no se escribe el video ni se extrae el audio en una
+    etapa aparte; a cambio no hay miniatura, clips ni video en media.
+    
+    Args:
+        video_id: ID del video a procesar
+    """
+    try:
+        logger.info(f'Iniciando procesamiento de solo transcripción del video {video_id}')
+        
+        result = _flujo_solo_transcripcion(video_id).apply_async()
+        
+        logger.info(f'Workflow de solo transcripción iniciado para video {video_id}: {result.id}')
+        
+        return result.id
+    
+    except Exception as e:
+        logger.error(f'Error al iniciar procesamiento del video {video_id}: {str(e)}')
+        
+        try:
+            video = Video.objects.get(id=video_id)
+            video.estado = 'error'
+            video.save()
+        except:
+            pass
+        
+        raise
+
 @shared_task(bind=True)
 def test_task(self, seconds: int = 5):
     """
@@ -379,13 +470,16 @@ def test_task(self, seconds: int = 5):
 
 
 @shared_task(bind=True, max_retries=2)
-def transcribir_audio_task(self, video_id: int, audio_path: str):
+def transcribir_audio_task(self, audio_path: str, video_id: int):
     """
     Tarea asíncrona para transcribir audio
     
+    La ruta va primero porque en una cadena Celery antepone el resultado
+    de la tarea anterior a los argumentos de la firma.
+    
     Args:
-        video_id: ID del video
         audio_path: Ruta del archivo de audio
+        video_id: ID del video
     
     Returns:
         dict: Datos de la transcripción
@@ -443,12 +537,13 @@ def transcribir_audio_task(self, video_id: int, audio_path: str):
         raise
 
 @shared_task(bind=True, max_retries=2)
-def analizar_video_task(self, video_id: int):
+def analizar_video_task(self, video_id: int, forzar: bool = False):
     """
     Tarea asíncrona para analizar video con IA
     
     Args:
         video_id: ID del video
+        forzar: Repetir el análisis aunque ya exista uno guardado
     
     Returns:
         dict: Resultado del análisis
@@ -456,32 +551,20 @@ def analizar_video_task(self, video_id: int):
     try:
         logger.info(f'Iniciando análisis IA del video {video_id}')
         
-        # Obtener video
-        video = Video.objects.get(id=video_id)
+        # Obtener video con las relaciones que usa el análisis
+        video = Video.objects.select_related(
+            'transcripcion', 'resumen_ejecutivo'
+        ).get(id=video_id)
         
         # Actualizar estado
         video.estado = 'analizando'
         video.save()
         
         # Analizar
+        # El servicio guarda el resumen y los segmentos en una transacción
         service = AnalysisService(video)
-        result = service.analyze()
-        
-        # Guardar segmentos importantes identificados
-        segmentos_guardados = 0
-        for i, seg_data in enumerate(result['segmentos_importantes'], 1):
-            Segmento.objects.create(
-                video=video,
-                titulo=seg_data['titulo'],
-                descripcion=seg_data['descripcion'],
-                timestamp_inicio_seg=seg_data['timestamp_inicio'],
-                timestamp_fin_seg=seg_data['timestamp_fin'],
-                duracion_seg=seg_data['duracion'],
-                orden=i,
-                relevancia_score=seg_data['relevancia'],
-                tipo_contenido=seg_data['tipo']
-            )
-            segmentos_guardados += 1
+        result = service.analyze(forzar=forzar)
+        segmentos_guardados = len(result['segmentos_importantes'])
         
         logger.info(f'Análisis completado para video {video_id}. {segmentos_guardados} segmentos guardados')
         
@@ -1,13 +1,39 @@
-from django.test import TestCase
+from unittest import mock
+import inspect
+from pathlib import Path
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from apps.videos.models import Video, Segmento
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.conf import settings
+from apps.videos.models import Video, Segmento, Transcripcion, ResumenEjecutivo
+from apps.videos.cache import (
+    leer_video_completo,
+    guardar_video_completo,
+    guardar_transcripcion_parcial,
+)
+from apps.videos.tasks.tasks import (
+    renderizar_video_completo_task,
+    procesar_solo_transcripcion_task,
+    transcribir_audio_task,
+    _flujo_solo_transcripcion,
+)
+from apps.videos.services import AnalysisService
 
 Usuario = get_user_model()
 
+# Hasher rápido: el KDF de producción domina el tiempo de los tests
+HASHERS_TESTS = ['django.contrib.auth.hashers.MD5PasswordHasher']
 
+# Caché en memoria: los tests no deben depender de Redis ni vaciar la
+# base de caché compartida de settings.CACHES
+CACHE_TESTS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(PASSWORD_HASHERS=HASHERS_TESTS, CACHES=CACHE_TESTS)
 class VideoAPITestCase(TestCase):
     """Tests para API de videos"""
     
@@ -52,6 +78,372 @@ class VideoAPITestCase(TestCase):
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['titulo'], 'Video de Prueba')
     
+    def test_listar_videos_sin_consultas_por_fila(self):
+        """Test que el listado no hace consultas adicionales por video"""
+        Transcripcion.objects.create(
+            video=self.video,
+            contenido_completo='Contenido',
+            transcripcion_con_timestamps=[],
+            modelo_utilizado='whisper'
+        )
+        for orden in (1, 2):
+            Segmento.objects.create(
+                video=self.video,
+                titulo=f'Segmento {orden}',
+                descripcion='Descripción',
+                timestamp_inicio_seg=0,
+                timestamp_fin_seg=300,
+                duracion_seg=300,
+                orden=orden,
+                relevancia_score=8.5
+            )
+        
+        url = reverse('videos:video-list')
+        with CaptureQueriesContext(connection) as consultas_un_video:
+            response = self.client.get(url)
+        
+        resultado = response.data['results'][0]
+        self.assertEqual(resultado['cantidad_segmentos'], 2)
+        self.assertTrue(resultado['tiene_transcripcion'])
+        self.assertFalse(resultado['tiene_resumen'])
+        
+        for i in range(3):
+            Video.objects.create(
+                usuario=self.usuario,
+                titulo=f'Otro Video {i}',
+                fuente='youtube',
+                estado='pendiente'
+            )
+        with CaptureQueriesContext(connection) as consultas_varios:
+            response = self.client.get(url)
+        
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertEqual(len(consultas_varios), len(consultas_un_video))
+    
+    def test_video_completo_consultas_fijas(self):
+        """Test que el detalle completo no consulta por cada segmento"""
+        url = reverse('videos:video-completo', args=[self.video.id])
+        
+        def crear_segmento(orden):
+            Segmento.objects.create(
+                video=self.video,
+                titulo=f'Segmento {orden}',
+                descripcion='Descripción',
+                timestamp_inicio_seg=0,
+                timestamp_fin_seg=300,
+                duracion_seg=300,
+                orden=orden,
+                relevancia_score=8.5
+            )
+        
+        crear_segmento(1)
+        with CaptureQueriesContext(connection) as consultas_un_segmento:
+            self.client.get(url)
+        
+        for orden in range(2, 6):
+            crear_segmento(orden)
+        with CaptureQueriesContext(connection) as consultas_varios:
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['segmentos']), 5)
+        self.assertEqual(response.data['segmentos'][0]['video_titulo'], 'Video de Prueba')
+        self.assertEqual(len(consultas_varios), len(consultas_un_segmento))
+    
+    def test_video_completo_cacheado_se_invalida(self):
+        """Test que el detalle completo se cachea y se invalida al guardar"""
+        url = reverse('videos:video-completo', args=[self.video.id])
+        with CaptureQueriesContext(connection) as consultas_primera:
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as consultas_cacheada:
+            self.client.get(url)
+        self.assertLess(len(consultas_cacheada), len(consultas_primera))
+        
+        self.video.titulo = 'Título actualizado'
+        self.video.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['titulo'], 'Título actualizado')
+    
+    def test_renderizar_video_completo_task_cachea_detalle(self):
+        """Test que la tarea deja el detalle completo listo en caché"""
+        renderizar_video_completo_task(self.video.id)
+        self.assertEqual(
+            leer_video_completo(self.video.id)['titulo'], 'Video de Prueba'
+        )
+        
+        url = reverse('videos:video-completo', args=[self.video.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['titulo'], 'Video de Prueba')
+    
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_analisis_existente_no_llama_a_openai(self):
+        """Test que un análisis ya guardado con el modelo actual se reutiliza"""
+        ResumenEjecutivo.objects.create(
+            video=self.video,
+            resumen_completo='Resumen',
+            temas_principales=['Tema'],
+            conclusiones_clave=['Conclusión'],
+            puntos_importantes=['Punto'],
+            modelo_ia_utilizado=settings.GPT_MODEL
+        )
+        Segmento.objects.create(
+            video=self.video,
+            titulo='Segmento 1',
+            descripcion='Descripción',
+            timestamp_inicio_seg=0,
+            timestamp_fin_seg=300,
+            duracion_seg=300,
+            orden=1,
+            relevancia_score=8.5,
+            generado_por_ia=True
+        )
+        
+        service = AnalysisService(self.video)
+        service.client = None
+        result = service.analyze()
+        
+        self.assertEqual(result['resumen']['resumen_completo'], 'Resumen')
+        self.assertEqual(result['segmentos_importantes'][0]['titulo'], 'Segmento 1')
+        self.assertEqual(Segmento.objects.filter(video=self.video).count(), 1)
+    
+    @override_settings(OPENAI_API_KEY='sk-test', GPT_TEMPERATURE=0)
+    def test_respuesta_gpt_identica_sale_de_cache(self):
+        """Test que con temperatura 0 una petición idéntica no vuelve a llamar a la API"""
+        chunk = mock.Mock()
+        chunk.choices = [mock.Mock(delta=mock.Mock(content='{"ok": true}'), finish_reason='stop')]
+        service = AnalysisService(self.video)
+        service.client = mock.Mock()
+        service.client.chat.completions.create.side_effect = lambda **kwargs: iter([chunk])
+        
+        for _ in range(2):
+            contenido = service._chat_json('test_llm:', 'Sistema', 'Usuario')
+            self.assertEqual(contenido, '{"ok": true}')
+        
+        service.client.chat.completions.create.assert_called_once()
+    
+    def test_cantidad_palabras_resumen_tras_actualizar(self):
+        """Test que cantidad_palabras se mantiene al crear y al actualizar el resumen"""
+        resumen = ResumenEjecutivo.objects.create(
+            video=self.video,
+            resumen_completo='uno dos tres',
+            modelo_ia_utilizado=settings.GPT_MODEL
+        )
+        self.assertEqual(resumen.cantidad_palabras, 3)
+        
+        resumen.resumen_completo = 'uno dos tres cuatro cinco'
+        resumen.save(update_fields=['resumen_completo'])
+        self.assertEqual(resumen.cantidad_palabras, 5)
+        resumen.refresh_from_db()
+        self.assertEqual(resumen.cantidad_palabras, 5)
+    
+    def _segmento_analisis(self, titulo):
+        return {
+            'titulo': titulo, 'descripcion': 'Descripción',
+            'timestamp_inicio': 0, 'timestamp_fin': 300, 'duracion': 300,
+            'relevancia': 8.5, 'tipo': 'concepto_clave'
+        }
+    
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_reanalisis_reemplaza_segmentos(self):
+        """Test que un análisis forzado reemplaza solo los segmentos generados por IA"""
+        Transcripcion.objects.create(
+            video=self.video,
+            contenido_completo='Contenido',
+            transcripcion_con_timestamps=[],
+            modelo_utilizado='whisper'
+        )
+        Segmento.objects.create(
+            video=self.video,
+            titulo='Manual',
+            descripcion='Descripción',
+            timestamp_inicio_seg=0,
+            timestamp_fin_seg=300,
+            duracion_seg=300,
+            orden=1,
+            relevancia_score=8.5
+        )
+        resumen = {
+            'resumen_completo': 'Resumen', 'temas_principales': [],
+            'conclusiones_clave': [], 'puntos_importantes': []
+        }
+        for _ in range(2):
+            service = AnalysisService(Video.objects.get(pk=self.video.pk))
+            with mock.patch.object(service, '_get_or_generate_summary', return_value=resumen), \
+                    mock.patch.object(service, '_identify_important_segments',
+                                      return_value=[self._segmento_analisis('Nuevo')]):
+                service.analyze(forzar=True)
+        
+        self.assertEqual(
+            sorted(Segmento.objects.filter(video=self.video).values_list('titulo', flat=True)),
+            ['Manual', 'Nuevo']
+        )
+    
+    @override_settings(OPENAI_API_KEY='sk-test')
+    def test_resumen_existente_sin_segmentos_no_regenera_resumen(self):
+        """Test que con resumen guardado y sin segmentos solo se piden los segmentos"""
+        Transcripcion.objects.create(
+            video=self.video,
+            contenido_completo='Contenido',
+            transcripcion_con_timestamps=[],
+            modelo_utilizado='whisper'
+        )
+        ResumenEjecutivo.objects.create(
+            video=self.video,
+            resumen_completo='Resumen',
+            temas_principales=['Tema'],
+            conclusiones_clave=['Conclusión'],
+            puntos_importantes=['Punto'],
+            modelo_ia_utilizado=settings.GPT_MODEL
+        )
+        
+        guardar_video_completo(self.video.id, {'titulo': 'Detalle anterior'})
+        
+        service = AnalysisService(Video.objects.get(pk=self.video.pk))
+        with mock.patch.object(service, '_get_or_generate_summary') as generar_resumen, \
+                mock.patch.object(service, '_identify_important_segments',
+                                  return_value=[self._segmento_analisis('Segmento 1')]), \
+                self.captureOnCommitCallbacks(execute=True):
+            result = service.analyze()
+        
+        generar_resumen.assert_not_called()
+        # bulk_create no emite post_save: la invalidación va en on_commit
+        self.assertIsNone(leer_video_completo(self.video.id))
+        self.assertEqual(result['resumen']['resumen_completo'], 'Resumen')
+        self.assertEqual(Segmento.objects.filter(video=self.video).count(), 1)
+    
+    def test_obtener_transcripcion_de_video(self):
+        """Test obtener la transcripción de un video"""
+        url = reverse('videos:video-transcripcion', args=[self.video.id])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        
+        Transcripcion.objects.create(
+            video=self.video,
+            contenido_completo='Contenido',
+            transcripcion_con_timestamps=[],
+            modelo_utilizado='whisper'
+        )
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['contenido_completo'], 'Contenido')
+        self.assertEqual(response.data['video_titulo'], 'Video de Prueba')
+    
+    def test_palabras_transcripcion_comprimidas(self):
+        """Test que las palabras se guardan comprimidas y se leen intactas"""
+        palabras = {
+            'segmento': [0, 0], 'palabra': ['Hola', 'mundo'],
+            'inicio': [0.0, 0.5], 'fin': [0.5, 1.0], 'probabilidad': [0.99, 0.95]
+        }
+        transcripcion = Transcripcion.objects.create(
+            video=self.video,
+            contenido_completo='Hola mundo',
+            transcripcion_con_timestamps=[{'inicio': 0.0, 'fin': 1.0, 'texto': 'Hola mundo'}],
+            palabras=palabras,
+            modelo_utilizado='whisper'
+        )
+        transcripcion.refresh_from_db()
+        self.assertEqual(transcripcion.palabras, palabras)
+    
+    def test_obtener_transcripcion_parcial_en_curso(self):
+        """Test que mientras se transcribe se devuelve lo ya transcrito"""
+        Video.objects.filter(pk=self.video.pk).update(estado='transcribiendo')
+        guardar_transcripcion_parcial(
+            self.video.id, [{'inicio': 0, 'fin': 4, 'texto': 'Hola'}]
+        )
+        
+        url = reverse('videos:video-transcripcion', args=[self.video.id])
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['parcial'])
+        self.assertEqual(response.data['transcripcion_con_timestamps'][0]['texto'], 'Hola')
+    
+    @mock.patch('apps.videos.views.video_views.procesar_video_completo_task')
+    def test_procesar_video_pendiente(self, procesar_task):
+        """Test que procesar reclama el video y encola el pipeline"""
+        Video.objects.filter(pk=self.video.pk).update(estado='pendiente')
+        procesar_task.delay.return_value.id = 'tarea'
+        
+        url = reverse('videos:video-procesar', args=[self.video.id])
+        response = self.client.post(url, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        procesar_task.delay.assert_called_once_with(self.video.id)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.estado, 'procesando')
+    
+    @mock.patch('apps.videos.views.video_views.procesar_video_completo_task')
+    @mock.patch('apps.videos.views.video_views.procesar_solo_transcripcion_task')
+    def test_procesar_solo_transcripcion(self, solo_transcripcion_task, procesar_task):
+        """Test que solo_transcripcion encola el pipeline que descarga solo el audio"""
+        Video.objects.filter(pk=self.video.pk).update(estado='pendiente')
+        solo_transcripcion_task.delay.return_value.id = 'tarea'
+        
+        url = reverse('videos:video-procesar', args=[self.video.id])
+        response = self.client.post(url, {'solo_transcripcion': True}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        solo_transcripcion_task.delay.assert_called_once_with(self.video.id)
+        procesar_task.delay.assert_not_called()
+    
+    @mock.patch('apps.videos.views.video_views.procesar_video_completo_task')
+    def test_procesar_video_ya_reclamado(self, procesar_task):
+        """Test que si otra petición reclamó el video antes se responde 409"""
+        Video.objects.filter(pk=self.video.pk).update(estado='pendiente')
+        
+        # Otra petición lo pasa a 'procesando' entre la lectura y el UPDATE
+        url = reverse('videos:video-procesar', args=[self.video.id])
+        with mock.patch('django.db.models.query.QuerySet.update', return_value=0):
+            response = self.client.post(url, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        procesar_task.delay.assert_not_called()
+    
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True, CELERY_TASK_EAGER_PROPAGATES=True)
+    @mock.patch('apps.videos.tasks.tasks.AnalysisService')
+    @mock.patch('apps.videos.tasks.tasks.TranscriptionService')
+    @mock.patch('apps.videos.tasks.tasks.VideoDownloader')
+    def test_pipeline_solo_transcripcion_pasa_ruta_a_transcripcion(self, downloader, transcription, analysis):
+        """Test que la cadena entrega el WAV descargado a la transcripción"""
+        downloader.return_value.download.return_value = '/tmp/audio/video.wav'
+        transcription.return_value.transcribe.return_value = {
+            'idioma': 'es',
+            'precision_estimada': 0.9,
+            'contenido_completo': 'hola mundo',
+        }
+        analysis.return_value.analyze.return_value = {'segmentos_importantes': []}
+        
+        procesar_solo_transcripcion_task.delay(self.video.id)
+        
+        downloader.return_value.download.assert_called_once_with(solo_audio=True)
+        transcription.assert_called_once()
+        self.assertEqual(transcription.call_args.args[0].id, self.video.id)
+        transcription.return_value.transcribe.assert_called_once_with(Path('/tmp/audio/video.wav'))
+        analysis.return_value.analyze.assert_called_once_with(forzar=False)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.estado, 'completado')
+    
+    def test_flujo_solo_transcripcion_argumentos(self):
+        """Test que cada tarea de la cadena recibe sus argumentos en el parámetro correcto"""
+        flujo = _flujo_solo_transcripcion(self.video.id)
+        descarga, transcripcion, analisis, finalizacion = flujo.tasks
+        
+        self.assertEqual(descarga.args, (self.video.id,))
+        self.assertEqual(descarga.kwargs, {'solo_audio': True})
+        
+        # Celery antepone el resultado de la descarga a los argumentos parciales
+        argumentos = inspect.signature(transcribir_audio_task.run).bind(
+            '/tmp/audio/video.wav', *transcripcion.args, **transcripcion.kwargs
+        ).arguments
+        self.assertEqual(argumentos['audio_path'], '/tmp/audio/video.wav')
+        self.assertEqual(argumentos['video_id'], self.video.id)
+        
+        for firma in (analisis, finalizacion):
+            self.assertTrue(firma.immutable)
+            self.assertEqual(firma.args, (self.video.id,))
+    
     def test_crear_video(self):
         """Test crear nuevo video"""
         url = reverse('videos:video-list')
@@ -67,6 +459,20 @@ class VideoAPITestCase(TestCase):
         self.assertEqual(Video.objects.count(), 2)
         self.assertEqual(response.data['titulo'], 'Nuevo Video')
     
+    def test_crear_video_fuente_invalida(self):
+        """Test crear video con una fuente inválida"""
+        url = reverse('videos:video-list')
+        data = {
+            'titulo': 'Nuevo Video',
+            'fuente': 'dailymotion',
+            'url_original': 'https://youtube.com/watch?v=nuevo'
+        }
+        
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data['fuente'][0].startswith('Fuente inválida.'))
+    
     def test_obtener_video_detalle(self):
         """Test obtener detalle de un video"""
         url = reverse('videos:video-detail', args=[self.video.id])
@@ -142,6 +548,7 @@ class VideoAPITestCase(TestCase):
         self.assertEqual(response.data[0]['titulo'], 'Segmento 1')
 
 
+@override_settings(PASSWORD_HASHERS=HASHERS_TESTS, CACHES=CACHE_TESTS)
 class SegmentoAPITestCase(TestCase):
     """Tests para API de segmentos"""
     
@@ -234,6 +641,50 @@ class SegmentoAPITestCase(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
+    def test_crear_segmentos_bulk(self):
+        """Test crear varios segmentos de un video en una petición"""
+        url = reverse('videos:video-segmentos-bulk', args=[self.video.id])
+        data = [
+            {
+                'titulo': f'Segmento {orden}',
+                'descripcion': 'Descripción',
+                'timestamp_inicio_seg': orden * 300,
+                'timestamp_fin_seg': orden * 300 + 300,
+                'orden': orden,
+                'relevancia_score': 10,
+                'tipo_contenido': 'concepto_clave'
+            }
+            for orden in range(2, 6)
+        ]
+        
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['creados'], 4)
+        self.assertEqual(self.video.segmentos.count(), 5)
+        self.assertEqual(
+            self.video.segmentos.get(orden=2).duracion_seg, 300
+        )
+    
+    def test_crear_segmentos_bulk_invalido_no_crea_ninguno(self):
+        """Test que un segmento inválido descarta toda la carga"""
+        url = reverse('videos:video-segmentos-bulk', args=[self.video.id])
+        valido = {
+            'titulo': 'Segmento Válido',
+            'descripcion': 'Descripción',
+            'timestamp_inicio_seg': 300,
+            'timestamp_fin_seg': 600,
+            'orden': 2,
+            'relevancia_score': 10,
+            'tipo_contenido': 'concepto_clave'
+        }
+        invalido = dict(valido, timestamp_inicio_seg=600, timestamp_fin_seg=300)
+        
+        response = self.client.post(url, [valido, invalido], format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.video.segmentos.count(), 1)
+    
     def test_segmentos_mas_relevantes(self):
         """Test obtener segmentos más relevantes"""
         url = reverse('videos:segmento-mas-relevantes')
@@ -243,6 +694,7 @@ class SegmentoAPITestCase(TestCase):
         self.assertTrue(len(response.data) > 0)
 
 
+@override_settings(PASSWORD_HASHERS=HASHERS_TESTS, CACHES=CACHE_TESTS)
 class PermisosPropietarioTestCase(TestCase):
     """Tests para permisos de propietario"""
     
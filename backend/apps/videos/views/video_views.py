@@ -4,8 +4,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.db.models import Count
 from apps.videos.services import VideoDownloader, VideoDownloadError
-from apps.videos.models import Video, Segmento, Transcripcion, ResumenEjecutivo
+from apps.videos.cache import (
+    leer_video_completo,
+    guardar_video_completo,
+    marcar_video_completo_pendiente,
+    invalidar_video_completo,
+    leer_transcripcion_parcial,
+)
+from apps.videos.models import (
+    Video, Segmento, Transcripcion, ResumenEjecutivo, formatear_hhmmss
+)
 from apps.videos.serializers import (
     VideoListSerializer,
     VideoDetailSerializer,
@@ -14,13 +24,29 @@ from apps.videos.serializers import (
     VideoCompleteSerializer,
     SegmentoListSerializer,
     SegmentoDetailSerializer,
+    SegmentoCreateSerializer,
     TranscripcionSerializer,
     ResumenEjecutivoSerializer,
 )
 from apps.users.permissions import IsOwnerOrAdmin, IsDocenteOrAdmin
-from apps.videos.tasks.tasks import procesar_video_completo_task,logger,analizar_video_task,segmentar_video_task
+from apps.videos.tasks.tasks import procesar_video_completo_task,procesar_solo_transcripcion_task,logger,analizar_video_task,segmentar_video_task,renderizar_video_completo_task
+from django.conf import settings
 from django.http import FileResponse, Http404
 
+# Columnas que usan los serializers de listado; metadata_json, el vector de
+# búsqueda y las rutas de archivo no se leen de la base de datos
+CAMPOS_LISTA_VIDEO = (
+    'id', 'titulo', 'usuario', 'fuente', 'estado', 'duracion_segundos',
+    'fecha_subida', 'miniatura_url',
+    'usuario__id', 'usuario__username', 'usuario__first_name',
+    'usuario__last_name', 'usuario__email',
+)
+CAMPOS_LISTA_SEGMENTO = (
+    'id', 'video', 'titulo', 'descripcion', 'timestamp_inicio_seg',
+    'timestamp_fin_seg', 'duracion_seg', 'orden', 'relevancia_score',
+    'tipo_contenido', 'miniatura_url', 'video__titulo',
+)
+
 class VideoViewSet(viewsets.ModelViewSet):
     """
     ViewSet para CRUD de videos
@@ -44,11 +70,33 @@ class VideoViewSet(viewsets.ModelViewSet):
         Filtrar videos según el usuario
         - Admin ve todos los videos
         - Docente solo ve sus propios videos
+        
+        En el listado, el conteo de segmentos y la existencia de
+        transcripción/resumen se resuelven en la misma consulta; en
+        'transcripcion' y 'resumen' la relación que se serializa se carga
+        junto con el video; 'reanalizar' solo consulta si existe; en
+        'completo' solo se cuentan los segmentos, el detalle se carga al
+        serializarlo
         """
         user = self.request.user
         if user.rol == 'admin':
-            return Video.objects.all().select_related('usuario')
-        return Video.objects.filter(usuario=user).select_related('usuario')
+            queryset = Video.objects.all().select_related('usuario')
+        else:
+            queryset = Video.objects.filter(usuario=user).select_related('usuario')
+        
+        if self.action == 'list':
+            queryset = queryset.only(*CAMPOS_LISTA_VIDEO).annotate(
+                cantidad_segmentos=Count('segmentos')
+            ).con_estado_procesado()
+        elif self.action == 'completo':
+            queryset = queryset.annotate(cantidad_segmentos=Count('segmentos'))
+        elif self.action == 'reanalizar':
+            queryset = queryset.con_estado_procesado()
+        elif self.action == 'transcripcion':
+            queryset = queryset.select_related('transcripcion')
+        elif self.action == 'resumen':
+            queryset = queryset.select_related('resumen_ejecutivo')
+        return queryset
     
     def get_serializer_class(self):
         """Retornar serializer según la acción"""
@@ -78,9 +126,34 @@ class VideoViewSet(viewsets.ModelViewSet):
         Endpoint para obtener video con todas sus relaciones
         GET /api/videos/{id}/completo/
         """
+        # get_object aplica los permisos; las relaciones solo se cargan si
+        # el detalle no está en caché
         video = self.get_object()
-        serializer = VideoCompleteSerializer(video)
-        return Response(serializer.data)
+        data = leer_video_completo(video.pk)
+        if data is not None:
+            return Response(data)
+        
+        # Los videos con muchos segmentos se serializan en Celery; el
+        # cliente vuelve a consultar esta misma URL hasta recibir 200
+        if video.cantidad_segmentos > settings.VIDEO_COMPLETO_SEGMENTOS_ASYNC:
+            try:
+                if marcar_video_completo_pendiente(video.pk):
+                    renderizar_video_completo_task.delay(video.pk)
+                return Response(
+                    {'detail': 'El detalle del video se está generando. Consulte de nuevo en unos segundos.'},
+                    status=status.HTTP_202_ACCEPTED,
+                    headers={
+                        'Location': request.build_absolute_uri(),
+                        'Retry-After': '2'
+                    }
+                )
+            except Exception as e:
+                logger.warning(f'No se pudo encolar el detalle del video {video.pk}: {str(e)}')
+        
+        completo = Video.objects.con_detalle_completo().get(pk=video.pk)
+        data = VideoCompleteSerializer(completo).data
+        guardar_video_completo(video.pk, data)
+        return Response(data)
     
     @action(detail=True, methods=['get'])
     def segmentos(self, request, pk=None):
@@ -93,6 +166,30 @@ class VideoViewSet(viewsets.ModelViewSet):
         serializer = SegmentoListSerializer(segmentos, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['post'], url_path='segmentos/bulk')
+    def segmentos_bulk(self, request, pk=None):
+        """
+        Crear varios segmentos de un video en una sola petición
+        POST /api/videos/{id}/segmentos/bulk/
+        
+        Recibe una lista de segmentos sin el campo 'video'; se validan todos
+        antes de insertar y se insertan en lotes dentro de una transacción.
+        """
+        video = self.get_object()
+        serializer = SegmentoCreateSerializer(
+            data=request.data,
+            many=True,
+            context={'request': request, 'video': video}
+        )
+        serializer.is_valid(raise_exception=True)
+        segmentos = serializer.save()
+        invalidar_video_completo(video.pk)
+        
+        return Response(
+            {'creados': len(segmentos)},
+            status=status.HTTP_201_CREATED
+        )
+    
     @action(detail=True, methods=['get'])
     def transcripcion(self, request, pk=None):
         """
@@ -104,6 +201,19 @@ class VideoViewSet(viewsets.ModelViewSet):
             serializer = TranscripcionSerializer(video.transcripcion)
             return Response(serializer.data)
         except Transcripcion.DoesNotExist:
+            # Transcripción local en curso: se devuelve lo ya transcrito
+            parcial = None
+            if video.estado == 'transcribiendo':
+                parcial = leer_transcripcion_parcial(video.id)
+            if parcial is not None:
+                return Response(
+                    {
+                        'video': video.id,
+                        'parcial': True,
+                        'transcripcion_con_timestamps': parcial
+                    },
+                    status=status.HTTP_202_ACCEPTED
+                )
             return Response(
                 {'detail': 'Este video no tiene transcripción.'},
                 status=status.HTTP_404_NOT_FOUND
@@ -157,14 +267,217 @@ class VideoViewSet(viewsets.ModelViewSet):
         )
         stats['duracion_total_segundos'] = total_segundos
         
-        # Formatear duración total
-        horas = total_segundos // 3600
-        minutos = (total_segundos % 3600) // 60
-        segundos = total_segundos % 60
-        stats['duracion_total_formateada'] = f"{horas:02d}:{minutos:02d}:{segundos:02d}"
+        stats['duracion_total_formateada'] = formatear_hhmmss(total_segundos)
         
         return Response(stats)
     
+    @action(detail=False, methods=['post'])
+    def validar_url(self, request):
+        """
+        Validar URL de video antes de crear
+        POST /api/videos/videos/validar_url/
+        
+        Body: {"url": "https://youtube.com/..."}
+        """
+        url = request.data.get('url')
+        
+        if not url:
+            return Response(
+                {'error': 'URL es requerida'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Crear video temporal para validar
+        temp_video = Video(url_original=url)
+        downloader = VideoDownloader(temp_video)
+        
+        is_valid, message = downloader.validate_url(url)
+        
+        if is_valid:
+            # Obtener información del video
+            info = downloader.get_video_info(url)
+            
+            return Response({
+                'valid': True,
+                'message': message,
+                'info': info
+            }, status=status.HTTP_200_OK)
+        else:
+            return Response({
+                'valid': False,
+                'message': message
+            }, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=True, methods=['post'])
+    def procesar(self, request, pk=None):
+        """
+        Iniciar procesamiento asíncrono de un video
+        POST /api/videos/videos/{id}/procesar/
+        
+        Con {"solo_transcripcion": true} solo se descarga el audio y se
+        transcribe y analiza (sin miniatura ni segmentación)
+        """
+        video = self.get_object()
+        
+        # Verificar que el video esté en estado pendiente
+        if video.estado != 'pendiente':
+            return Response(
+                {'error': f'El video está en estado "{video.estado}" y no puede ser procesado'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Verificar que tenga URL
+        if not video.url_original:
+            return Response(
+                {'error': 'El video no tiene URL para procesar'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Reclamar el video con un UPDATE condicional: si llegan dos peticiones a
+        # la vez solo una lo pasa de 'pendiente' a 'procesando' y encola el
+        # pipeline, sin bloquear la fila mientras se encola la tarea
+        reclamado = Video.objects.filter(pk=video.pk, estado='pendiente').update(estado='procesando')
+        if not reclamado:
+            return Response(
+                {'error': 'El video ya está siendo procesado'},
+                status=status.HTTP_409_CONFLICT
+            )
+        video.estado = 'procesando'
+        invalidar_video_completo(video.pk)
+        
+        try:
+            # Iniciar tarea asíncrona
+            if request.data.get('solo_transcripcion') in (True, 'true', '1'):
+                task = procesar_solo_transcripcion_task.delay(video.id)
+            else:
+                task = procesar_video_completo_task.delay(video.id)
+            
+            return Response({
+                'message': 'Procesamiento iniciado',
+                'video_id': video.id,
+                'task_id': task.id,
+                'estado': video.estado
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        except Exception as e:
+            logger.error(f'Error al iniciar procesamiento: {str(e)}')
+            # Devolver el video a 'pendiente' para poder reintentar
+            Video.objects.filter(pk=video.pk, estado='procesando').update(estado='pendiente')
+            invalidar_video_completo(video.pk)
+            return Response(
+                {'error': f'Error al iniciar procesamiento: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['get'])
+    def estado_procesamiento(self, request, pk=None):
+        """
+        Obtener estado del procesamiento de un video
+        GET /api/videos/videos/{id}/estado_procesamiento/
+        """
+        video = self.get_object()
+        
+        # Obtener logs de procesamiento
+        logs = video.logs.all().order_by('-timestamp')[:10]
+        
+        logs_data = [{
+            'etapa': log.etapa,
+            'estado': log.estado,
+            'mensaje': log.mensaje,
+            'timestamp': log.timestamp,
+            'duracion_ms': log.duracion_ms
+        } for log in logs]
+        
+        data = {
+            'video_id': video.id,
+            'titulo': video.titulo,
+            'estado': video.estado,
+            'fecha_subida': video.fecha_subida,
+            'fecha_procesamiento': video.fecha_procesamiento,
+            'logs': logs_data
+        }
+        
+        # Mientras se transcribe en modo local se incluye lo ya transcrito
+        if video.estado == 'transcribiendo':
+            data['transcripcion_parcial'] = leer_transcripcion_parcial(video.id) or []
+        
+        return Response(data, status=status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['post'])
+    def reanalizar(self, request, pk=None):
+        """
+        Re-analizar un video con IA
+        POST /api/videos/videos/{id}/reanalizar/
+        """
+        video = self.get_object()
+        
+        # Verificar que tenga transcripción (anotada en get_queryset)
+        if not video.tiene_transcripcion:
+            return Response(
+                {'error': 'El video no tiene transcripción. Transcríbalo primero.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Iniciar tarea de análisis, sin reutilizar el análisis guardado
+            task = analizar_video_task.delay(video.id, forzar=True)
+            
+            return Response({
+                'message': 'Re-análisis iniciado',
+                'video_id': video.id,
+                'task_id': task.id
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        except Exception as e:
+            logger.error(f'Error al iniciar re-análisis: {str(e)}')
+            return Response(
+                {'error': f'Error al iniciar re-análisis: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
+    @action(detail=True, methods=['post'])
+    def resegmentar(self, request, pk=None):
+        """
+        Re-segmentar un video
+        POST /api/videos/videos/{id}/resegmentar/
+        """
+        video = self.get_object()
+        
+        # Verificar que tenga segmentos identificados
+        if not video.segmentos.exists():
+            return Response(
+                {'error': 'El video no tiene segmentos identificados. Analice el video primero.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Verificar que tenga archivo
+        if not video.ruta_video_completo:
+            return Response(
+                {'error': 'El video no tiene archivo. Procese el video primero.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Iniciar tarea de segmentación
+            task = segmentar_video_task.delay(
+                video.id,
+                str(video.ruta_video_completo.path)
+            )
+            
+            return Response({
+                'message': 'Re-segmentación iniciada',
+                'video_id': video.id,
+                'task_id': task.id,
+                'segmentos_a_procesar': video.segmentos.count()
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        except Exception as e:
+            logger.error(f'Error al iniciar re-segmentación: {str(e)}')
+            return Response(
+                {'error': f'Error al iniciar re-segmentación: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
 #crear vistas para segmento
 
 class SegmentoViewSet(viewsets.ModelViewSet):
@@ -188,13 +501,19 @@ class SegmentoViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         """
         Filtrar segmentos según el usuario
+        
+        El listado solo necesita el título del video, así que no se
+        trae su usuario ni el resto de sus columnas
         """
         user = self.request.user
         if user.rol == 'admin':
-            return Segmento.objects.all().select_related('video', 'video__usuario')
-        return Segmento.objects.filter(
-            video__usuario=user
-        ).select_related('video', 'video__usuario')
+            queryset = Segmento.objects.all()
+        else:
+            queryset = Segmento.objects.filter(video__usuario=user)
+        
+        if self.action == 'list':
+            return queryset.select_related('video').only(*CAMPOS_LISTA_SEGMENTO)
+        return queryset.select_related('video', 'video__usuario')
     
     def get_serializer_class(self):
         """Retornar serializer según la acción"""
@@ -213,6 +532,35 @@ class SegmentoViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(segmentos, many=True)
         return Response(serializer.data)
     
+    @action(detail=True, methods=['get'])
+    def descargar(self, request, pk=None):
+        """
+        Descargar archivo de segmento
+        GET /api/videos/segmentos/{id}/descargar/
+        """
+        segmento = self.get_object()
+        
+        # Verificar que tenga archivo
+        if not segmento.ruta_archivo_segmento:
+            raise Http404("Segmento sin archivo. Re-segmente el video.")
+        
+        try:
+            # Retornar archivo
+            response = FileResponse(
+                segmento.ruta_archivo_segmento.open('rb'),
+                content_type='video/mp4'
+            )
+            response['Content-Disposition'] = f'attachment; filename="{segmento.titulo}.mp4"'
+            
+            return response
+        
+        except Exception as e:
+            logger.error(f'Error al descargar segmento: {str(e)}')
+            return Response(
+                {'error': 'Error al descargar segmento'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
 #crear vistas para transcripcion y resumen ejecutivo si es necesario
 
 class TranscripcionViewSet(viewsets.ModelViewSet):
@@ -253,230 +601,3 @@ class ResumenEjecutivoViewSet(viewsets.ModelViewSet):
         return ResumenEjecutivo.objects.filter(
             video__usuario=user
         ).select_related('video', 'video__usuario')
-    
-# Agregar al VideoViewSet:
-
-@action(detail=False, methods=['post'])
-def validar_url(self, request):
-    """
-    Validar URL de video antes de crear
-    POST /api/videos/videos/validar_url/
-    
-    Body: {"url": "https://youtube.com/..."}
-    """
-    url = request.data.get('url')
-    
-    if not url:
-        return Response(
-            {'error': 'URL es requerida'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Crear video temporal para validar
-    temp_video = Video(url_original=url)
-    downloader = VideoDownloader(temp_video)
-    
-    is_valid, message = downloader.validate_url(url)
-    
-    if is_valid:
-        # Obtener información del video
-        info = downloader.get_video_info(url)
-        
-        return Response({
-            'valid': True,
-            'message': message,
-            'info': info
-        }, status=status.HTTP_200_OK)
-    else:
-        return Response({
-            'valid': False,
-            'message': message
-        }, status=status.HTTP_400_BAD_REQUEST)
-
-
-
-@action(detail=True, methods=['post'])
-def procesar(self, request, pk=None):
-    """
-    Iniciar procesamiento asíncrono de un video
-    POST /api/videos/videos/{id}/procesar/
-    """
-    video = self.get_object()
-    
-    # Verificar que el video esté en estado pendiente
-    if video.estado != 'pendiente':
-        return Response(
-            {'error': f'El video está en estado "{video.estado}" y no puede ser procesado'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Verificar que tenga URL
-    if not video.url_original:
-        return Response(
-            {'error': 'El video no tiene URL para procesar'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    try:
-        # Iniciar tarea asíncrona
-        task = procesar_video_completo_task.delay(video.id)
-        
-        # Actualizar estado
-        video.estado = 'procesando'
-        video.save()
-        
-        return Response({
-            'message': 'Procesamiento iniciado',
-            'video_id': video.id,
-            'task_id': task.id,
-            'estado': video.estado
-        }, status=status.HTTP_202_ACCEPTED)
-    
-    except Exception as e:
-        logger.error(f'Error al iniciar procesamiento: {str(e)}')
-        return Response(
-            {'error': f'Error al iniciar procesamiento: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-@action(detail=True, methods=['get'])
-def estado_procesamiento(self, request, pk=None):
-    """
-    Obtener estado del procesamiento de un video
-    GET /api/videos/videos/{id}/estado_procesamiento/
-    """
-    video = self.get_object()
-    
-    # Obtener logs de procesamiento
-    logs = video.logs.all().order_by('-timestamp')[:10]
-    
-    logs_data = [{
-        'etapa': log.etapa,
-        'estado': log.estado,
-        'mensaje': log.mensaje,
-        'timestamp': log.timestamp,
-        'duracion_ms': log.duracion_ms
-    } for log in logs]
-    
-    return Response({
-        'video_id': video.id,
-        'titulo': video.titulo,
-        'estado': video.estado,
-        'fecha_subida': video.fecha_subida,
-        'fecha_procesamiento': video.fecha_procesamiento,
-        'logs': logs_data
-    }, status=status.HTTP_200_OK)
-
-@action(detail=True, methods=['post'])
-def reanalizar(self, request, pk=None):
-    """
-    Re-analizar un video con IA
-    POST /api/videos/videos/{id}/reanalizar/
-    """
-    video = self.get_object()
-    
-    # Verificar que tenga transcripción
-    if not hasattr(video, 'transcripcion'):
-        return Response(
-            {'error': 'El video no tiene transcripción. Transcríbalo primero.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    try:
-        # Iniciar tarea de análisis
-        task = analizar_video_task.delay(video.id)
-        
-        return Response({
-            'message': 'Re-análisis iniciado',
-            'video_id': video.id,
-            'task_id': task.id
-        }, status=status.HTTP_202_ACCEPTED)
-    
-    except Exception as e:
-        logger.error(f'Error al iniciar re-análisis: {str(e)}')
-        return Response(
-            {'error': f'Error al iniciar re-análisis: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-@action(detail=True, methods=['post'])
-def resegmentar(self, request, pk=None):
-    """
-    Re-segmentar un video
-    POST /api/videos/videos/{id}/resegmentar/
-    """
-    video = self.get_object()
-    
-    # Verificar que tenga segmentos identificados
-    if not video.segmentos.exists():
-        return Response(
-            {'error': 'El video no tiene segmentos identificados. Analice el video primero.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    # Verificar que tenga archivo
-    if not video.ruta_video_completo:
-        return Response(
-            {'error': 'El video no tiene archivo. Procese el video primero.'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    try:
-        # Iniciar tarea de segmentación
-        task = segmentar_video_task.delay(
-            video.id,
-            str(video.ruta_video_completo.path)
-        )
-        
-        return Response({
-            'message': 'Re-segmentación iniciada',
-            'video_id': video.id,
-            'task_id': task.id,
-            'segmentos_a_procesar': video.segmentos.count()
-        }, status=status.HTTP_202_ACCEPTED)
-    
-    except Exception as e:
-        logger.error(f'Error al iniciar re-segmentación: {str(e)}')
-        return Response(
-            {'error': f'Error al iniciar re-segmentación: {str(e)}'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
-
-@action(detail=True, methods=['get'])
-def descargar_segmento(self, request, pk=None):
-    """
-    Obtener URL de descarga de un segmento específico
-    GET /api/videos/segmentos/{id}/descargar/
-    
-    Nota: Este endpoint va en SegmentoViewSet
-    """
-    # Se implementará en SegmentoViewSet
-    pass
-@action(detail=True, methods=['get'])
-def descargar(self, request, pk=None):
-    """
-    Descargar archivo de segmento
-    GET /api/videos/segmentos/{id}/descargar/
-    """
-    segmento = self.get_object()
-    
-    # Verificar que tenga archivo
-    if not segmento.ruta_archivo_segmento:
-        raise Http404("Segmento sin archivo. Re-segmente el video.")
-    
-    try:
-        # Retornar archivo
-        response = FileResponse(
-            segmento.ruta_archivo_segmento.open('rb'),
-            content_type='video/mp4'
-        )
-        response['Content-Disposition'] = f'attachment; filename="{segmento.titulo}.mp4"'
-        
-        return response
-    
-    except Exception as e:
-        logger.error(f'Error al descargar segmento: {str(e)}')
-        return Response(
-            {'error': 'Error al descargar segmento'},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
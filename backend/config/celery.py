@@ -20,6 +20,10 @@ app.conf.beat_schedule = {
         'task': 'apps.videos.tasks.limpiar_archivos_temporales_task',
         'schedule': crontab(hour=3, minute=0),  # Diario a las 3:00 AM
     },
+    'volcar-ultimos-accesos': {
+        'task': 'apps.users.tasks.tasks.volcar_ultimos_accesos_task',
+        'schedule': 60.0,  # Cada minuto
+    },
 }
 
 
@@ -101,6 +101,16 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': config('CACHE_REDIS_URL', default='redis://localhost:6379/1'),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -153,6 +163,9 @@ MAX_VIDEO_DURATION_SECONDS = config('MAX_VIDEO_DURATION_SECONDS', default=10800,
 # Configuración de FFmpeg
 FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
 FFPROBE_BINARY = config('FFPROBE_BINARY', default='ffprobe')
+# Decodificación por hardware para recortes y miniaturas: 'auto' (usa la
+# disponible o vuelve a software), 'cuda', 'vaapi', 'qsv'; vacío la desactiva
+FFMPEG_HWACCEL = config('FFMPEG_HWACCEL', default='')
 
 
 # Configuración de yt-dlp
@@ -161,6 +174,8 @@ YT_DLP_RATE_LIMIT = config('YT_DLP_RATE_LIMIT', default='1M')  # 1MB/s
 
 # Tiempo de vida de archivos temporales (en horas)
 TEMP_FILE_LIFETIME_HOURS = config('TEMP_FILE_LIFETIME_HOURS', default=24, cast=int)
+# Hilos usados para eliminar archivos temporales en paralelo
+TEMP_CLEANUP_WORKERS = config('TEMP_CLEANUP_WORKERS', default=16, cast=int)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
@@ -170,11 +185,15 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.users.authentication.JWTRolAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.users.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'apps.videos.pagination.CustomPageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
@@ -228,6 +247,31 @@ SPECTACULAR_SETTINGS = {
 # Custom User Model
 AUTH_USER_MODEL = 'users.Usuario'
 
+AUTHENTICATION_BACKENDS = [
+    'apps.users.backends.UsuarioLoginBackend',
+]
+
+# Intentos de login fallidos por IP/usuario antes de bloquear temporalmente
+LOGIN_MAX_INTENTOS_FALLIDOS = config('LOGIN_MAX_INTENTOS_FALLIDOS', default=5, cast=int)
+LOGIN_BLOQUEO_SEGUNDOS = config('LOGIN_BLOQUEO_SEGUNDOS', default=60, cast=int)
+
+# Vigencia del detalle completo de video cacheado; se invalida al guardar el
+# video o sus relaciones, el plazo acota lo que escriben bulk_create/update
+VIDEO_COMPLETO_CACHE_SEGUNDOS = config('VIDEO_COMPLETO_CACHE_SEGUNDOS', default=300, cast=int)
+
+# Videos con más segmentos que este umbral serializan su detalle completo en
+# Celery; mientras tanto el endpoint responde 202 y el cliente reintenta
+VIDEO_COMPLETO_SEGMENTOS_ASYNC = config('VIDEO_COMPLETO_SEGMENTOS_ASYNC', default=200, cast=int)
+VIDEO_COMPLETO_PENDIENTE_SEGUNDOS = config('VIDEO_COMPLETO_PENDIENTE_SEGUNDOS', default=60, cast=int)
+
+# Transcripción local parcial publicada en caché mientras avanza: cada
+# cuántos segundos se actualiza y cuánto dura si el worker se detiene
+TRANSCRIPCION_PARCIAL_INTERVALO = config('TRANSCRIPCION_PARCIAL_INTERVALO', default=5, cast=int)
+TRANSCRIPCION_PARCIAL_SEGUNDOS = config('TRANSCRIPCION_PARCIAL_SEGUNDOS', default=60 * 60, cast=int)
+
+# Filas por INSERT en la carga masiva de segmentos
+SEGMENTO_BULK_BATCH_SIZE = config('SEGMENTO_BULK_BATCH_SIZE', default=500, cast=int)
+
 # Configuración de Logging
 LOGGING = {
     'version': 1,
@@ -297,11 +341,16 @@ CELERY_TASK_DEFAULT_RETRY_DELAY = 60  # 1 minuto
 
 # Configuración de workers
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
-CELERY_WORKER_MAX_TASKS_PER_CHILD = 50
+# Cada proceso hijo conserva el modelo de Whisper cargado entre tareas; al
+# reciclarse se vuelve a cargar, así que el límite debe amortizar esa carga
+CELERY_WORKER_MAX_TASKS_PER_CHILD = config('CELERY_WORKER_MAX_TASKS_PER_CHILD', default=50, cast=int)
 
 # Configuración de beat (tareas programadas)
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Buffer en Redis para el último acceso de usuarios (se vuelca en lote)
+ULTIMO_ACCESO_REDIS_URL = config('ULTIMO_ACCESO_REDIS_URL', default=CELERY_BROKER_URL)
+
 # OpenAI API Configuration
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
@@ -309,7 +358,16 @@ OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 WHISPER_MODE = config('WHISPER_MODE', default='api')  # 'local' o 'api'
 WHISPER_MODEL = config('WHISPER_MODEL', default='base')  # Para local
 WHISPER_DEVICE = config('WHISPER_DEVICE', default='cpu')
-WHISPER_COMPUTE_TYPE = config('WHISPER_COMPUTE_TYPE', default='float32')
+# Tipo de cómputo de CTranslate2; vacío = int8_float16 en GPU e int8 en CPU
+WHISPER_COMPUTE_TYPE = config('WHISPER_COMPUTE_TYPE', default='')
+# Carpeta de descarga de los modelos locales (None = caché de Hugging Face)
+WHISPER_CACHE_DIR = config('WHISPER_CACHE_DIR', default=None)
+# Fragmentos de audio transcritos en paralelo por lote (0 = según dispositivo)
+WHISPER_BATCH_SIZE = config('WHISPER_BATCH_SIZE', default=0, cast=int)
+# VAD previo a Whisper: silencio mínimo para cortar y margen que se conserva
+# alrededor de cada tramo de voz
+WHISPER_VAD_MIN_SILENCE_MS = config('WHISPER_VAD_MIN_SILENCE_MS', default=500, cast=int)
+WHISPER_VAD_SPEECH_PAD_MS = config('WHISPER_VAD_SPEECH_PAD_MS', default=200, cast=int)
 WHISPER_LANGUAGE = config('WHISPER_LANGUAGE', default=None)
 
 # Para API de OpenAI
@@ -323,7 +381,26 @@ TRANSCRIPTION_MIN_SILENCE_LEN = config('TRANSCRIPTION_MIN_SILENCE_LEN', default=
 GPT_MODEL = config('GPT_MODEL', default='gpt-4o-mini')  # gpt-4o-mini, gpt-4o, gpt-4-turbo
 GPT_MAX_TOKENS = config('GPT_MAX_TOKENS', default=2000, cast=int)
 GPT_TEMPERATURE = config('GPT_TEMPERATURE', default=0.3, cast=float)
+# Límite de tokens de respuesta de cada llamada del análisis
+GPT_SUMMARY_MAX_TOKENS = config('GPT_SUMMARY_MAX_TOKENS', default=900, cast=int)
+GPT_SEGMENTS_MAX_TOKENS = config('GPT_SEGMENTS_MAX_TOKENS', default=1600, cast=int)
+# Modelo para identificar segmentos (tarea extractiva, admite uno más barato)
+GPT_SEGMENTS_MODEL = config('GPT_SEGMENTS_MODEL', default=GPT_MODEL)
+
+# Caché de respuestas de GPT por hash exacto de la petición; solo se usa con
+# GPT_TEMPERATURE = 0, cuando la respuesta es reproducible
+LLM_CACHE_TTL = config('LLM_CACHE_TTL', default=60 * 60 * 24 * 7, cast=int)
+
+# Caché semántica: reutiliza el resumen de una clase casi idéntica (similitud
+# coseno de los embeddings de la transcripción >= umbral)
+SEMANTIC_CACHE_ENABLED = config('SEMANTIC_CACHE_ENABLED', default=False, cast=bool)
+SEMANTIC_CACHE_EMBEDDING_MODEL = config('SEMANTIC_CACHE_EMBEDDING_MODEL', default='text-embedding-3-small')
+SEMANTIC_CACHE_UMBRAL = config('SEMANTIC_CACHE_UMBRAL', default=0.95, cast=float)
+SEMANTIC_CACHE_MAX_CANDIDATOS = config('SEMANTIC_CACHE_MAX_CANDIDATOS', default=5000, cast=int)
 
 # Configuración de análisis
 ANALYSIS_MIN_SEGMENTS = config('ANALYSIS_MIN_SEGMENTS', default=3, cast=int)
-ANALYSIS_MAX_SEGMENTS = config('ANALYSIS_MAX_SEGMENTS', default=10, cast=int)
\ No newline at end of file
+ANALYSIS_MAX_SEGMENTS = config('ANALYSIS_MAX_SEGMENTS', default=10, cast=int)
+# Por debajo de estos mínimos no se pide a GPT identificar segmentos
+ANALYSIS_MIN_TIMESTAMPS = config('ANALYSIS_MIN_TIMESTAMPS', default=10, cast=int)
+ANALYSIS_MIN_DURATION_SECS = config('ANALYSIS_MIN_DURATION_SECS', default=120, cast=int)
\ No newline at end of file